@@ -2,18 +2,26 @@
 MindWorx SOR Automation - Flask API Backend
 Connects Python logic to Next.js frontend
 """
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request, stream_with_context
 from flask_cors import CORS
 from datetime import datetime
+import json
 import sys
 import os
+import threading
 
 # Add parent directory to path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.dashboard_db import dashboard_db
+from src.dashboard_db import dashboard_db, encode_cursor, decode_cursor
 from src.moodle_service import moodle_service
 from src.config import config
+from src.scoring import score_one, score_results
+from src.search import search_index
+from src.cache import metadata_cache
+from src.job_queue import job_queue
+from src.pipeline import RERENDER_STATUSES
+from src.events import event_hub
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for Next.js frontend
@@ -35,46 +43,124 @@ def get_stats():
 
 # ===== SOR Requests =====
 
+def _format_request(req):
+    """JSON shape of a request row in list and change-feed responses"""
+    return {
+        'id': req['id'],
+        'learner_name': req['learner_name'],
+        'learner_email': req.get('learner_email', ''),
+        'learner_id': req.get('learner_id'),
+        'status': req['status'],
+        'overall_score': float(req['overall_score']) if req.get('overall_score') else None,
+        'pdf_path': req.get('pdf_path'),
+        'signature_request_id': req.get('signature_request_id'),
+        'created_at': req['created_at'].isoformat() if req['created_at'] else None,
+        'updated_at': req['updated_at'].isoformat() if req['updated_at'] else None,
+    }
+
+
 @app.route('/api/requests', methods=['GET'])
 def get_requests():
-    """Get all SOR requests with optional filtering"""
+    """Get a page of SOR requests; filters, sort and cursor pagination run in SQL"""
     try:
         status = request.args.get('status', None)
         search = request.args.get('search', None)
-        limit = request.args.get('limit', 100, type=int)
+        limit = min(max(request.args.get('limit', 100, type=int), 1), 500)
+        sort = request.args.get('sort', 'updated_at')
+        cursor = request.args.get('cursor') or None
+
+        # Taken before the read so /api/requests/changes can't miss a write made during it
+        changes_cursor = encode_cursor(*dashboard_db.change_watermark())
+
+        try:
+            created_from = datetime.fromisoformat(request.args['created_from']) if request.args.get('created_from') else None
+            created_to = datetime.fromisoformat(request.args['created_to']) if request.args.get('created_to') else None
+            requests_data, next_cursor = dashboard_db.list_sor_requests(
+                status=status if status and status != 'all' else None,
+                search=search,
+                created_from=created_from,
+                created_to=created_to,
+                sort=sort,
+                limit=limit,
+                cursor=cursor
+            )
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        formatted = [_format_request(req) for req in requests_data]
 
-        requests_data = dashboard_db.get_all_sor_requests(limit=limit)
+        return jsonify({
+            'success': True,
+            'data': formatted,
+            'count': len(formatted),
+            'next_cursor': next_cursor,
+            'changes_cursor': changes_cursor
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        # Apply filters
-        if status and status != 'all':
-            requests_data = [r for r in requests_data if r['status'] == status]
 
-        if search:
-            search_lower = search.lower()
-            requests_data = [r for r in requests_data if
-                search_lower in r['learner_name'].lower() or
-                search_lower in (r.get('learner_email') or '').lower()]
+@app.route('/api/requests/changes', methods=['GET'])
+def get_request_changes():
+    """
+    Requests modified since the client's watermark, oldest first. Pass the
+    changes_cursor from GET /api/requests (or the cursor from the previous
+    call); without one the feed starts from now.
+    """
+    try:
+        limit = min(max(request.args.get('limit', 500, type=int), 1), 1000)
+        cursor = request.args.get('cursor') or None
+        if not cursor:
+            return jsonify({'success': True, 'data': [], 'count': 0, 'has_more': False,
+                            'cursor': encode_cursor(*dashboard_db.change_watermark())})
+
+        try:
+            since, last_id = decode_cursor(cursor)
+        except ValueError as e:
+            return jsonify({'success': False, 'error': str(e)}), 400
+
+        rows, watermark, has_more = dashboard_db.get_changes_since(since, last_id, limit=limit)
+        return jsonify({
+            'success': True,
+            'data': [_format_request(req) for req in rows],
+            'count': len(rows),
+            'has_more': has_more,
+            'cursor': encode_cursor(*watermark)
+        })
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        # Format for JSON
-        formatted = []
-        for req in requests_data:
-            formatted.append({
-                'id': req['id'],
-                'learner_name': req['learner_name'],
-                'learner_email': req.get('learner_email', ''),
-                'learner_id': req.get('learner_id'),
-                'status': req['status'],
-                'overall_score': float(req['overall_score']) if req.get('overall_score') else None,
-                'pdf_path': req.get('pdf_path'),
-                'signature_request_id': req.get('signature_request_id'),
-                'created_at': req['created_at'].isoformat() if req['created_at'] else None,
-                'updated_at': req['updated_at'].isoformat() if req['updated_at'] else None,
-            })
+
+_search_refresh_lock = threading.Lock()
+
+
+@app.route('/api/requests/search', methods=['GET'])
+def search_requests():
+    """Typeahead search by learner name or email"""
+    try:
+        term = request.args.get('q', '')
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 100)
+
+        if config.SEARCH_INDEX_ENABLED:
+            if search_index.is_stale(config.SEARCH_INDEX_REFRESH_SECONDS) and _search_refresh_lock.acquire(blocking=False):
+                try:
+                    search_index.refresh(dashboard_db)
+                finally:
+                    _search_refresh_lock.release()
+            rows = search_index.search(term, limit) if term.strip() else []
+        else:
+            rows = dashboard_db.search_sor_requests(term, limit=limit)
 
         return jsonify({
             'success': True,
-            'data': formatted,
-            'count': len(formatted)
+            'data': [{
+                'id': r['id'],
+                'learner_name': r['learner_name'],
+                'learner_email': r.get('learner_email', ''),
+                'status': r['status'],
+                'updated_at': r['updated_at'].isoformat() if r.get('updated_at') else None,
+            } for r in rows],
+            'count': len(rows)
         })
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -82,12 +168,9 @@ def get_requests():
 
 @app.route('/api/requests', methods=['POST'])
 def create_request():
-    """Create a new SOR request and automatically process the full workflow"""
+    """Create a new SOR request and queue the full workflow for the background worker"""
     try:
         from src.database import db
-        from src.pdf_generator import generate_sor_pdf
-        from src.signature_service import signature_service
-        from src.moodle_upload import upload_to_assignment_direct
 
         data = request.get_json() or {}
         learner_name = data.get('learner_name')
@@ -98,35 +181,26 @@ def create_request():
         if not learner_name or not learner_id:
             return jsonify({'success': False, 'error': 'Learner name and Moodle User ID are required'}), 400
 
-        # Fetch quiz results from Moodle database
-        results = db.fetch_results(learner_name)
+        try:
+            learner_id = int(learner_id)
+        except (TypeError, ValueError):
+            return jsonify({'success': False, 'error': 'Moodle User ID must be a number'}), 400
+
+        # Fetch quiz results from Moodle database (by user ID: indexed, unlike a name match)
+        results = db.fetch_results_by_id(learner_id)
 
         if not results:
             return jsonify({
                 'success': False,
-                'error': f'No quiz results found for "{learner_name}". Make sure the learner has completed the required quizzes.'
+                'error': f'No quiz results found for "{learner_name}" (user ID {learner_id}). Make sure the learner has completed the required quizzes.'
             }), 400
 
-        # Calculate overall score using weights from config
-        total_weighted_score = 0
-        total_weight = 0
-
-        for result in results:
-            quiz_id = result['quiz_id']
-            if quiz_id in config.QUIZ_WEIGHTS:
-                weight = config.QUIZ_WEIGHTS[quiz_id]
-                total_marks = float(result['total_marks']) if result['total_marks'] else 0
-                learner_score = float(result['learner_score']) if result['learner_score'] else 0
-                if total_marks > 0:
-                    percentage = (learner_score / total_marks) * 100
-                    total_weighted_score += percentage * weight
-                    total_weight += weight
-
-        overall_score = round(total_weighted_score / total_weight, 2) if total_weight > 0 else 0
+        # Calculate overall score the same way the SOR PDF does
+        overall_score = score_one(results)
 
         # Create the SOR request in dashboard database
         sor_id = dashboard_db.create_sor_request(
-            learner_id=int(learner_id),
+            learner_id=learner_id,
             learner_name=learner_name,
             learner_email=learner_email or '',
             overall_score=overall_score
@@ -137,95 +211,19 @@ def create_request():
 
         dashboard_db.log_action(sor_id, 'request_created', f'SOR request created with score: {overall_score}%', 'success')
 
-        workflow_status = {
-            'request_created': True,
-            'pdf_generated': False,
-            'signature_sent': False,
-            'uploaded': False
+        request_data = {
+            'id': sor_id,
+            'learner_name': learner_name,
+            'overall_score': overall_score,
+            'quiz_count': len(results)
         }
-        error_message = None
-
-        # Auto-process the full workflow if enabled
-        if auto_process:
-            # Step 1: Generate PDF
-            try:
-                # Fetch full learner data from Moodle database for PDF generation
-                learner_data = db.fetch_all_learner_data(learner_name)
-
-                if not learner_data:
-                    raise Exception(f"Could not fetch learner data for '{learner_name}'")
-
-                # Generate PDF output path
-                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                pdf_output_dir = os.path.join(os.path.expanduser("~"), "Downloads", "MindWorx_SOR_PDFs")
-                os.makedirs(pdf_output_dir, exist_ok=True)
-                pdf_output_path = os.path.join(pdf_output_dir, f"SOR_{learner_name.replace(' ', '_')}_{timestamp}.pdf")
-
-                # Generate PDF with correct arguments
-                pdf_path = generate_sor_pdf(learner_name, learner_data, pdf_output_path)
-
-                if pdf_path:
-                    dashboard_db.update_sor_request(sor_id, {'pdf_path': pdf_path, 'status': 'pdf_generated'})
-                    dashboard_db.log_action(sor_id, 'pdf_generated', f'PDF generated: {pdf_path}', 'success')
-                    workflow_status['pdf_generated'] = True
-
-                    # Step 2: Send for Signature (if not skipping)
-                    if not config.SKIP_SIGNATURE and learner_email:
-                        try:
-                            sig_result = signature_service.send_for_signature(
-                                pdf_path,
-                                learner_name,
-                                learner_email
-                            )
-
-                            if sig_result:
-                                dashboard_db.update_sor_request(sor_id, {
-                                    'status': 'signature_sent',
-                                    'signature_request_id': sig_result
-                                })
-                                dashboard_db.log_action(sor_id, 'signature_sent', f'Sent for e-signature (ID: {sig_result})', 'success')
-                                workflow_status['signature_sent'] = True
-                            else:
-                                dashboard_db.log_action(sor_id, 'signature_failed', 'Failed to send for signature', 'failed')
-                        except Exception as sig_err:
-                            dashboard_db.log_action(sor_id, 'signature_error', str(sig_err), 'failed')
-                    else:
-                        # Skip signature - go directly to upload
-                        try:
-                            upload_result = upload_to_assignment_direct(
-                                pdf_path,
-                                learner_name,
-                                int(learner_id),
-                                config.ASSIGNMENT_COURSEMODULE_ID
-                            )
-
-                            if upload_result:
-                                dashboard_db.update_sor_request(sor_id, {'status': 'uploaded'})
-                                dashboard_db.log_action(sor_id, 'uploaded', 'Uploaded to Moodle (signature skipped)', 'success')
-                                workflow_status['uploaded'] = True
-                            else:
-                                dashboard_db.log_action(sor_id, 'upload_failed', 'Failed to upload to Moodle', 'failed')
-                        except Exception as upload_err:
-                            dashboard_db.log_action(sor_id, 'upload_error', str(upload_err), 'failed')
-                else:
-                    dashboard_db.log_action(sor_id, 'pdf_failed', 'Failed to generate PDF', 'failed')
-                    error_message = 'Failed to generate PDF'
-            except Exception as pdf_err:
-                dashboard_db.log_action(sor_id, 'pdf_error', str(pdf_err), 'failed')
-                error_message = f'PDF generation error: {str(pdf_err)}'
 
-        return jsonify({
-            'success': True,
-            'message': 'SOR request created and processing started',
-            'data': {
-                'id': sor_id,
-                'learner_name': learner_name,
-                'overall_score': overall_score,
-                'quiz_count': len(results),
-                'workflow_status': workflow_status,
-                'error': error_message
-            }
-        })
+        if not auto_process:
+            return jsonify({'success': True, 'message': 'SOR request created', 'data': request_data})
+
+        # PDF, signature and upload run in the worker; the workflow sends e-mail, so no automatic retries
+        return _queued('request_workflow', {'sor_id': sor_id}, sor_id,
+                       'SOR request created and processing started', max_attempts=1, data=request_data)
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -237,11 +235,11 @@ def get_learner_grades(learner_id):
     try:
         from src.database import db
 
+        # The name is only displayed; results are always looked up by ID
         learner_name = request.args.get('name', '')
 
         if not learner_name:
-            # Try to get learner name from Moodle
-            user = moodle_service.get_user_by_id(learner_id)
+            user = db.fetch_learner_by_id(learner_id) or moodle_service.get_user_by_id(learner_id)
             if user:
                 learner_name = f"{user.get('firstname', '')} {user.get('lastname', '')}".strip()
 
@@ -249,7 +247,7 @@ def get_learner_grades(learner_id):
             return jsonify({'success': False, 'error': 'Could not find learner'}), 404
 
         # Fetch quiz results
-        results = db.fetch_results(learner_name)
+        results = db.fetch_results_by_id(learner_id)
 
         if not results:
             return jsonify({
@@ -263,33 +261,14 @@ def get_learner_grades(learner_id):
             })
 
         # Format quiz results
-        quizzes = []
-        total_weighted_score = 0
-        total_weight = 0
-
-        for result in results:
-            quiz_id = result['quiz_id']
-            # Convert Decimal to float for calculations
-            learner_score = float(result['learner_score']) if result['learner_score'] else 0
-            total_marks = float(result['total_marks']) if result['total_marks'] else 0
-            percentage = 0
-            if total_marks > 0:
-                percentage = round((learner_score / total_marks) * 100, 2)
-
-            quizzes.append({
-                'quiz_id': quiz_id,
-                'topic_name': result['topic_name'],
-                'score': learner_score,
-                'total_marks': total_marks,
-                'percentage': percentage
-            })
-
-            if quiz_id in config.QUIZ_WEIGHTS:
-                weight = config.QUIZ_WEIGHTS[quiz_id]
-                total_weighted_score += percentage * weight
-                total_weight += weight
-
-        overall_score = round(total_weighted_score / total_weight, 2) if total_weight > 0 else 0
+        rows, overall_score, _ = score_results(results, {})
+        quizzes = [{
+            'quiz_id': row['quiz_id'],
+            'topic_name': row['topic_name'],
+            'score': row['learner_score'],
+            'total_marks': row['total_marks'],
+            'percentage': row['Achievement: Percentage']
+        } for row in rows]
 
         return jsonify({
             'success': True,
@@ -345,42 +324,15 @@ def get_request(request_id):
 
 @app.route('/api/requests/<int:request_id>/generate-pdf', methods=['POST'])
 def generate_pdf(request_id):
-    """Generate PDF for a request"""
+    """Queue PDF generation for a request"""
     try:
-        from src.pdf_generator import generate_sor_pdf
-        from src.database import db
-
         req = dashboard_db.get_sor_request(request_id)
         if not req:
             return jsonify({'success': False, 'error': 'Request not found'}), 404
+        if req['status'] not in RERENDER_STATUSES:
+            return jsonify({'success': False, 'error': f"Cannot regenerate the PDF while the request is {req['status']}"}), 409
 
-        learner_name = req['learner_name']
-
-        # Fetch full learner data from Moodle database for PDF generation
-        learner_data = db.fetch_all_learner_data(learner_name)
-
-        if not learner_data:
-            return jsonify({'success': False, 'error': f"Could not fetch learner data for '{learner_name}'"}), 400
-
-        # Generate PDF output path
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        pdf_output_dir = os.path.join(os.path.expanduser("~"), "Downloads", "MindWorx_SOR_PDFs")
-        os.makedirs(pdf_output_dir, exist_ok=True)
-        pdf_output_path = os.path.join(pdf_output_dir, f"SOR_{learner_name.replace(' ', '_')}_{timestamp}.pdf")
-
-        # Generate PDF with correct arguments
-        pdf_path = generate_sor_pdf(learner_name, learner_data, pdf_output_path)
-
-        if pdf_path:
-            dashboard_db.update_sor_request(request_id, {'pdf_path': pdf_path, 'status': 'pdf_generated'})
-            dashboard_db.log_action(request_id, 'pdf_generated', f'PDF generated: {pdf_path}', 'success')
-            return jsonify({
-                'success': True,
-                'message': 'PDF generated successfully',
-                'pdf_path': pdf_path
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Failed to generate PDF'}), 500
+        return _queued('generate_pdf', {'sor_id': request_id}, request_id, 'PDF generation queued')
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -388,10 +340,8 @@ def generate_pdf(request_id):
 
 @app.route('/api/requests/<int:request_id>/send-signature', methods=['POST'])
 def send_for_signature(request_id):
-    """Send document for signature"""
+    """Queue sending the document for signature"""
     try:
-        from src.signature_service import signature_service
-
         req = dashboard_db.get_sor_request(request_id)
         if not req:
             return jsonify({'success': False, 'error': 'Request not found'}), 404
@@ -399,26 +349,8 @@ def send_for_signature(request_id):
         if not req.get('pdf_path'):
             return jsonify({'success': False, 'error': 'No PDF generated yet'}), 400
 
-        # Send for signature
-        result = signature_service.send_for_signature(
-            req['pdf_path'],
-            req['learner_name'],
-            req.get('learner_email')
-        )
-
-        if result:
-            dashboard_db.update_sor_request(request_id, {
-                'status': 'signature_sent',
-                'signature_request_id': result
-            })
-            dashboard_db.log_action(request_id, 'signature_sent', f'Sent for signature (ID: {result})', 'success')
-            return jsonify({
-                'success': True,
-                'message': 'Sent for signature successfully',
-                'signature_request_id': result
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Failed to send for signature'}), 500
+        # A retry after a lost response could e-mail the learner twice
+        return _queued('send_signature', {'sor_id': request_id}, request_id, 'Signature request queued', max_attempts=1)
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -426,10 +358,8 @@ def send_for_signature(request_id):
 
 @app.route('/api/requests/<int:request_id>/upload-moodle', methods=['POST'])
 def upload_to_moodle(request_id):
-    """Upload signed document to Moodle"""
+    """Queue upload of the signed document to Moodle"""
     try:
-        from src.moodle_upload import upload_to_assignment_direct
-
         req = dashboard_db.get_sor_request(request_id)
         if not req:
             return jsonify({'success': False, 'error': 'Request not found'}), 404
@@ -437,22 +367,25 @@ def upload_to_moodle(request_id):
         if req['status'] not in ['signed', 'pdf_generated']:
             return jsonify({'success': False, 'error': 'Document not ready for upload'}), 400
 
-        # Upload to Moodle
-        result = upload_to_assignment_direct(
-            req.get('pdf_path'),
-            req['learner_name'],
-            req.get('learner_id'),
-            config.ASSIGNMENT_COURSEMODULE_ID
-        )
+        return _queued('upload_moodle', {'sor_id': request_id}, request_id, 'Moodle upload queued')
 
-        if result:
-            dashboard_db.log_action(request_id, 'uploaded', 'Uploaded to Moodle', 'success')
-            return jsonify({
-                'success': True,
-                'message': 'Uploaded to Moodle successfully'
-            })
-        else:
-            return jsonify({'success': False, 'error': 'Failed to upload to Moodle'}), 500
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/requests/<int:request_id>/resume', methods=['POST'])
+def resume_request(request_id):
+    """Queue a failed or stuck request to continue from its last completed stage"""
+    try:
+        req = dashboard_db.get_sor_request(request_id)
+        if not req:
+            return jsonify({'success': False, 'error': 'Request not found'}), 404
+
+        if req['status'] == 'uploaded':
+            return jsonify({'success': False, 'error': 'Request is already complete'}), 400
+
+        # Resuming from pdf_generated sends the signature e-mail, so no automatic retries
+        return _queued('resume_request', {'sor_id': request_id}, request_id, 'Resume queued', max_attempts=1)
 
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
@@ -507,60 +440,180 @@ def sync_grade(request_id):
 
 @app.route('/api/process-pending', methods=['POST'])
 def process_pending():
-    """Process all pending requests"""
+    """Queue processing of all pending requests"""
     try:
-        from src.main import process_pending_requests
-        result = process_pending_requests()
-        return jsonify({
-            'success': True,
-            'message': 'Processing completed',
-            'result': result
-        })
+        return _queued('process_pending', {}, None, 'Processing queued')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/check-signatures', methods=['POST'])
 def check_signatures():
-    """Check all pending signatures"""
+    """Queue a check of all pending signatures"""
     try:
-        from src.main import check_signature_status
-        result = check_signature_status()
-        return jsonify({
-            'success': True,
-            'message': 'Signature check completed',
-            'result': result
-        })
+        # With callbacks enabled, polling only reconciles requests whose callback is overdue
+        min_age = config.SIGNATURE_RECONCILE_MINUTES if config.SIGNATURE_WEBHOOK_ENABLED else 0
+        min_age = request.args.get('min_age_minutes', min_age, type=int)
+        return _queued('check_signatures', {'min_age_minutes': min_age}, None, 'Signature check queued')
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
 @app.route('/api/bulk-sync-grades', methods=['POST'])
 def bulk_sync_grades():
-    """Sync all grades to Moodle"""
+    """Queue a sync of all grades to Moodle"""
     try:
-        requests_data = dashboard_db.get_all_sor_requests(limit=1000)
-        uploaded = [r for r in requests_data if r['status'] == 'uploaded' and r.get('overall_score')]
+        return _queued('bulk_sync_grades', {}, None, 'Grade sync queued')
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        if not uploaded:
-            return jsonify({'success': True, 'message': 'No grades to sync', 'synced': 0})
 
-        assignment_info = moodle_service.get_assignment_info(config.ASSIGNMENT_COURSEMODULE_ID)
-        if not assignment_info:
-            return jsonify({'success': False, 'error': 'Assignment not found'}), 404
+# ===== Background Jobs =====
+
+def _queued(job_type, payload, sor_request_id, message, max_attempts=None, data=None):
+    """Enqueue a job and answer 202 with where to follow it"""
+    job_id = job_queue.enqueue(job_type, payload, sor_request_id=sor_request_id, max_attempts=max_attempts)
+    if not job_id:
+        return jsonify({'success': False, 'error': 'Failed to queue job'}), 500
+    return jsonify({
+        'success': True,
+        'message': message,
+        'job_id': job_id,
+        'status_url': f'/api/jobs/{job_id}',
+        'data': data
+    }), 202
+
+
+def _format_job(job):
+    return {
+        'id': job['id'],
+        'job_type': job['job_type'],
+        'sor_request_id': job.get('sor_request_id'),
+        'status': job['status'],
+        'attempts': job['attempts'],
+        'max_attempts': job['max_attempts'],
+        'progress': job.get('progress'),
+        'result': job.get('result'),
+        'error': job.get('last_error'),
+        'created_at': job['created_at'].isoformat() if job.get('created_at') else None,
+        'started_at': job['started_at'].isoformat() if job.get('started_at') else None,
+        'finished_at': job['finished_at'].isoformat() if job.get('finished_at') else None,
+    }
+
+
+@app.route('/api/jobs/<int:job_id>', methods=['GET'])
+def get_job(job_id):
+    """Job status and progress"""
+    try:
+        job = job_queue.get_job(job_id)
+        if not job:
+            return jsonify({'success': False, 'error': 'Job not found'}), 404
+        return jsonify({'success': True, 'data': _format_job(job)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
 
-        grades = [{'userid': r['learner_id'], 'grade': float(r['overall_score'])} for r in uploaded]
-        result = moodle_service.bulk_grade_submissions(assignment_info.get('id'), grades)
 
-        return jsonify({
-            'success': True,
-            'message': f"Synced {result['success_count']}/{result['total_processed']} grades",
-            'result': result
-        })
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    """Recent jobs, optionally filtered by status or SOR request"""
+    try:
+        jobs = job_queue.list_jobs(
+            status=request.args.get('status'),
+            sor_request_id=request.args.get('sor_request_id', type=int),
+            limit=min(request.args.get('limit', 50, type=int), 500)
+        )
+        return jsonify({'success': True, 'data': [_format_job(j) for j in jobs], 'count': len(jobs)})
+    except Exception as e:
+        return jsonify({'success': False, 'error': str(e)}), 500
+
+
+@app.route('/api/jobs/<int:job_id>/retry', methods=['POST'])
+def retry_job(job_id):
+    """Requeue a dead-lettered job"""
+    try:
+        if not job_queue.retry(job_id):
+            return jsonify({'success': False, 'error': 'Only dead jobs can be retried'}), 400
+        return jsonify({'success': True, 'message': 'Job requeued', 'job_id': job_id}), 202
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+# ===== Webhooks =====
+
+# Dropbox Sign treats any other response body as a failed delivery and retries
+DROPBOX_SIGN_CALLBACK_ACK = 'Hello API Event Received'
+
+
+@app.route('/api/webhooks/dropbox-sign', methods=['POST'])
+def dropbox_sign_callback():
+    """Receive Dropbox Sign callback events and continue the signed request"""
+    from src.signature_service import verify_callback_event
+
+    if not config.SIGNATURE_WEBHOOK_ENABLED:
+        return jsonify({'success': False, 'error': 'Not found'}), 404
+
+    try:
+        # Account callbacks arrive as multipart form data with a 'json' field
+        raw = request.form.get('json') or request.get_data(as_text=True)
+        payload = json.loads(raw or '{}')
+    except ValueError:
+        return jsonify({'success': False, 'error': 'Invalid callback payload'}), 400
+
+    event = payload.get('event') or {}
+    if not verify_callback_event(event):
+        return jsonify({'success': False, 'error': 'Invalid event hash'}), 401
+
+    event_type = event.get('event_type')
+    if event_type == 'signature_request_all_signed':
+        sig_id = (payload.get('signature_request') or {}).get('signature_request_id')
+        req = dashboard_db.get_sor_request_by_signature_id(sig_id) if sig_id else None
+
+        if req and req['status'] == 'signature_sent':
+            dashboard_db.log_action(req['id'], 'signature_callback', f'Dropbox Sign callback received: {event_type}', 'success')
+            # Download + upload can take a while (the file may 409 until ready); the worker
+            # retries with backoff, so ack immediately
+            job_queue.enqueue('complete_signed', {'sor_id': req['id']}, sor_request_id=req['id'])
+
+    return DROPBOX_SIGN_CALLBACK_ACK, 200
+
+
+# ===== Live Updates =====
+
+@app.route('/api/events', methods=['GET'])
+def stream_events():
+    """
+    Server-Sent Events stream of request status transitions and stat deltas
+    (see src/events.py). Every open stream shares the process's one change-feed
+    watcher. Reconnecting clients send Last-Event-ID and get the events they
+    missed, or a resync event if those are gone.
+    """
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    sub = event_hub.subscribe(last_event_id)
+
+    def generate():
+        try:
+            # Tell EventSource how long to wait before reconnecting
+            yield "retry: 3000\n\n"
+            while not sub.lagged:
+                frame = sub.get(timeout=config.EVENTS_HEARTBEAT_SECONDS)
+                yield frame if frame is not None else ": keepalive\n\n"
+            yield 'event: resync\ndata: {"reason": "client fell behind"}\n\n'
+        finally:
+            # Runs when the client disconnects (the next write fails) or the stream ends
+            event_hub.unsubscribe(sub)
+
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
+
+@app.route('/api/events/stats', methods=['GET'])
+def get_event_stats():
+    """Connected event-stream clients and watcher counters"""
+    return jsonify({'success': True, 'data': event_hub.get_stats()})
+
+
 # ===== System Info =====
 
 @app.route('/api/health', methods=['GET'])
@@ -573,6 +626,26 @@ def health_check():
     })
 
 
+@app.route('/api/cache', methods=['GET'])
+def get_cache_stats():
+    """Metadata cache hit/miss counters"""
+    return jsonify({'success': True, 'data': metadata_cache.get_stats()})
+
+
+@app.route('/api/audit/stats', methods=['GET'])
+def get_audit_stats():
+    """Audit writer queue depth and flush latency"""
+    return jsonify({'success': True, 'data': dashboard_db.audit.get_stats()})
+
+
+@app.route('/api/cache/clear', methods=['POST'])
+def clear_cache():
+    """Invalidate cached Moodle metadata (all keys, or the ones listed in "keys")"""
+    keys = (request.get_json(silent=True) or {}).get('keys') or []
+    metadata_cache.invalidate(*keys)
+    return jsonify({'success': True, 'message': 'Cache cleared', 'data': metadata_cache.get_stats()})
+
+
 @app.route('/api/config', methods=['GET'])
 def get_config():
     """Get system configuration (non-sensitive)"""
@@ -0,0 +1,106 @@
+"""
+Micro-benchmark: database handshakes per processed SOR request
+Replays the DashboardDB call sequence of one process_pending_requests item
+against a fake MySQL server, with and without the shared connection pool and
+the batched audit writer.
+
+Usage: python bench_connection_pool.py [requests] [handshake_ms]
+"""
+import sys
+import time
+import pymysql
+from src.db_pool import pool
+from src.dashboard_db import dashboard_db
+
+
+class FakeCursor:
+    lastrowid = 1
+    rowcount = 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, params=None):
+        pass
+
+    def executemany(self, sql, params):
+        pass
+
+    def fetchone(self):
+        return {'total': 0, 'count': 0}
+
+    def fetchall(self):
+        return []
+
+
+class FakeConnection:
+    """Stands in for a pymysql connection; each instance is one TCP+auth handshake"""
+    handshakes = 0
+    open = True
+
+    def __init__(self, **kwargs):
+        FakeConnection.handshakes += 1
+        time.sleep(HANDSHAKE_MS / 1000)
+
+    def cursor(self):
+        return FakeCursor()
+
+    def ping(self, reconnect=False):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def one_request(sor_id):
+    """Same DashboardDB calls as one successful process_pending_requests item"""
+    dashboard_db.log_action(sor_id, 'validation_passed', 'Validation passed', 'success')
+    dashboard_db.transition(sor_id, 'pdf_generated', {'pdf_path': '/tmp/x.pdf'},
+                            'pdf_generated', 'PDF generated: /tmp/x.pdf', from_status='pending')
+    dashboard_db.transition(sor_id, 'signature_sent', {'signature_request_id': 'abc'},
+                            'signature_sent', 'Signature request sent (ID: abc)', from_status='pdf_generated')
+    dashboard_db.flush_audit()
+
+
+def run(label, n):
+    FakeConnection.handshakes = 0
+    start = time.perf_counter()
+    for i in range(n):
+        one_request(i)
+    elapsed = time.perf_counter() - start
+    print(f"{label:<10} {FakeConnection.handshakes / n:>8.2f} handshakes/request   {elapsed * 1000 / n:>8.2f} ms/request")
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    HANDSHAKE_MS = float(sys.argv[2]) if len(sys.argv) > 2 else 5.0
+
+    pymysql.connect = FakeConnection
+
+    print("=" * 60)
+    print(f"Connection pool benchmark ({n} requests, {HANDSHAKE_MS} ms per handshake)")
+    print("=" * 60)
+
+    # Before: a fresh connection per DashboardDB call, one INSERT per audit entry
+    pooled_get_connection = dashboard_db.get_connection
+    dashboard_db.get_connection = dashboard_db.audit.get_connection = lambda: pymysql.connect(**pool.connect_kwargs)
+    dashboard_db.audit.enabled = False
+    run("unpooled", n)
+
+    # After: connections borrowed from the shared pool
+    dashboard_db.get_connection = dashboard_db.audit.get_connection = pooled_get_connection
+    run("pooled", n)
+
+    # Pooled, with audit entries batched and flushed once per request
+    dashboard_db.audit.enabled = True
+    run("batched", n)
+    print(f"\nPool stats: {pool.get_stats()}")
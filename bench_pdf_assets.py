@@ -0,0 +1,83 @@
+"""
+Benchmark: per-PDF render time with and without the image asset cache
+Renders synthetic learners with the configured logo/stamp/cover (or
+generated placeholder images when none are configured).
+
+Usage: python bench_pdf_assets.py [pdfs]
+"""
+import os
+import statistics
+import sys
+import tempfile
+import time
+from PIL import Image
+from src.config import config
+from src.pdf_generator import asset_cache, generate_sor_pdf, validate_image_path
+
+
+def sample_learner_data(n: int = 1) -> dict:
+    """Synthetic learner data shaped like DatabaseManager.fetch_all_learner_data"""
+    sections = {12: 'Knowledge Modules', 13: 'Knowledge Modules', 14: 'Knowledge Modules', 15: 'Knowledge Modules',
+                16: 'Knowledge Modules', 17: 'Practical Skill Modules', 18: 'Practical Skill Modules', 19: 'Practical Skill Modules',
+                20: 'Work Experience Modules', 21: 'Work Experience Modules', 22: 'Work Experience Modules', 23: 'Work Experience Modules'}
+    return {
+        'learner': {'id': 1000 + n, 'firstname': 'Bench', 'lastname': f'Learner{n}', 'email': f'bench{n}@example.com'},
+        'profile': {'Registration Number': f'REG{n:05d}', 'Learner Number': f'L{n:05d}', 'Date of Birth': '2000-01-01'},
+        'provider_info': {},
+        'section_1_name': 'Knowledge Modules',
+        'quiz_section_map': {q: {'section_number': 1, 'section_name': name} for q, name in sections.items()},
+        'results': [{'learner_name': f'Bench Learner{n}', 'quiz_id': q, 'topic_name': f'Topic {q}',
+                     'learner_score': float((q * 7 + n) % 10), 'total_marks': 10.0} for q in sections],
+        'emp_fields': [{'id': 1, 'name': 'Employer'}],
+    }
+
+
+def ensure_images(tmp_dir):
+    """Use configured images, or write placeholder PNG/JPEGs of realistic size"""
+    paths = {}
+    for name, path, size, fmt in [('LOGO', config.LOGO_PATH, (1200, 600), 'PNG'),
+                                  ('STAMP', config.STAMP_PATH, (800, 800), 'PNG'),
+                                  ('COVER', config.COVER_PATH, (2480, 3508), 'JPEG')]:
+        if not path:
+            path = os.path.join(tmp_dir, f"{name.lower()}.{fmt.lower()}")
+            Image.new('RGB', size, (242, 101, 34)).save(path, fmt)
+        paths[name] = path
+    config.LOGO_PATH_VALID = validate_image_path(paths['LOGO'], 'LOGO')
+    config.STAMP_PATH_VALID = validate_image_path(paths['STAMP'], 'STAMP')
+    config.COVER_PATH_VALID = validate_image_path(paths['COVER'], 'COVER')
+
+
+def run(label, n, out_dir):
+    timings = []
+    for i in range(n):
+        start = time.perf_counter()
+        generate_sor_pdf(f'Bench Learner{i}', sample_learner_data(i), os.path.join(out_dir, f'{label}_{i}.pdf'))
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ensure_images(tmp_dir)
+
+        # Keep the render loop quiet so print() doesn't dominate the timings
+        devnull = open(os.devnull, 'w')
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            asset_cache.enabled = False
+            uncached = run('uncached', n, tmp_dir)
+            asset_cache.enabled = True
+            asset_cache.clear()
+            cached = run('cached', n, tmp_dir)
+        finally:
+            sys.stdout = stdout
+            devnull.close()
+
+    print("=" * 60)
+    print(f"PDF render benchmark ({n} PDFs)")
+    print("=" * 60)
+    for label, timings in [('uncached', uncached), ('cached', cached)]:
+        print(f"{label:<10} mean {statistics.mean(timings):8.1f} ms   median {statistics.median(timings):8.1f} ms")
+    print(f"\nAsset cache stats: {asset_cache.stats}")
@@ -0,0 +1,125 @@
+"""
+Benchmark: learner search at 100k sor_requests rows
+In-memory: linear substring scan vs the trigram index, plus an incremental
+refresh. With --db, also loads the rows into a scratch copy of sor_requests
+and times LIKE '%term%' against the FULLTEXT and prefix query paths.
+
+Usage: python bench_search.py [rows] [--db]
+"""
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from src.search import TrigramIndex, search_clause
+
+FIRST = ['Thabo', 'Lerato', 'Sipho', 'Naledi', 'Johan', 'Anele', 'Pieter', 'Zanele', 'Kagiso', 'Ayesha',
+         'Michael', 'Nomsa', 'Ruan', 'Palesa', 'Themba', 'Chantel', 'Bongani', 'Fatima', 'Werner', 'Lindiwe']
+LAST = ['Mokoena', 'Nkosi', 'van der Merwe', 'Dlamini', 'Botha', 'Naidoo', 'Khumalo', 'Pillay', 'Smith',
+        'Mahlangu', 'Pretorius', 'Molefe', 'Jacobs', 'Zulu', 'Ndlovu', 'Coetzee', 'Sithole', 'Adams']
+TERMS = ['th', 'nko', 'lerato', 'van der', 'pillay', 'mokoena7', '@example', 'zzq']
+SCRATCH_TABLE = 'sor_requests_search_bench'
+
+
+def make_rows(n, seed=1234):
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    rows = []
+    for i in range(1, n + 1):
+        first, last = rng.choice(FIRST), rng.choice(LAST)
+        rows.append({
+            'id': i,
+            'learner_id': 10000 + i,
+            'learner_name': f"{first} {last}",
+            'learner_email': f"{first}.{last.replace(' ', '')}{rng.randint(1, 999)}@example.com".lower(),
+            'status': 'pending',
+            'updated_at': start + timedelta(seconds=i * 37),
+        })
+    return rows
+
+
+def timed(fn, repeat=20):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings), result
+
+
+def linear_scan(rows, term):
+    term = term.lower()
+    return [r['id'] for r in rows
+            if term in r['learner_name'].lower() or term in (r['learner_email'] or '').lower()]
+
+
+def bench_memory(rows):
+    index = TrigramIndex()
+    start = time.perf_counter()
+    index.rebuild(rows)
+    build_ms = (time.perf_counter() - start) * 1000
+    print(f"Trigram index build: {build_ms:.0f} ms ({index.stats['trigrams']} trigrams)")
+
+    print(f"\n{'term':<12} {'matches':>8} {'scan ms':>9} {'index ms':>9}")
+    for term in TERMS:
+        scan_ms, expected = timed(lambda: linear_scan(rows, term), repeat=5)
+        index_ms, ids = timed(lambda: index.search_ids(term, limit=20))
+        # Synthetic updated_at grows with id, so newest-first means highest ids
+        assert ids == sorted(expected, reverse=True)[:20], term
+        print(f"{term:<12} {len(expected):>8} {scan_ms:>9.2f} {index_ms:>9.2f}")
+
+    # Incremental refresh: 100 renamed rows
+    changed = [dict(r, learner_name=r['learner_name'] + ' Jr', updated_at=r['updated_at'] + timedelta(days=3650))
+               for r in rows[:100]]
+    start = time.perf_counter()
+    index.upsert(changed)
+    print(f"\nIncremental upsert of {len(changed)} rows: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+def bench_db(rows):
+    from src.db_pool import pool
+
+    with pool.connection() as conn, conn.cursor() as cur:
+        print(f"\nLoading {len(rows)} rows into {SCRATCH_TABLE}...")
+        cur.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+        cur.execute(f"CREATE TABLE {SCRATCH_TABLE} LIKE sor_requests")
+        cur.execute(f"SHOW INDEX FROM {SCRATCH_TABLE}")
+        indexes = {r['Key_name'] for r in cur.fetchall()}
+        try:
+            if 'idx_learner_name' not in indexes:
+                cur.execute(f"ALTER TABLE {SCRATCH_TABLE} ADD INDEX idx_learner_name (learner_name), ADD INDEX idx_learner_email (learner_email)")
+            sql = f"INSERT INTO {SCRATCH_TABLE} (id, learner_id, learner_name, learner_email, status, updated_at) VALUES (%s, %s, %s, %s, %s, %s)"
+            for i in range(0, len(rows), 5000):
+                cur.executemany(sql, [(r['id'], r['learner_id'], r['learner_name'], r['learner_email'], r['status'], r['updated_at'])
+                                      for r in rows[i:i + 5000]])
+                conn.commit()
+            if 'ft_learner' not in indexes:
+                cur.execute(f"ALTER TABLE {SCRATCH_TABLE} ADD FULLTEXT INDEX ft_learner (learner_name, learner_email) WITH PARSER ngram")
+            cur.execute(f"ANALYZE TABLE {SCRATCH_TABLE}")
+            cur.fetchall()
+
+            def run(clause, params):
+                cur.execute(f"SELECT id FROM {SCRATCH_TABLE} WHERE {clause} ORDER BY created_at DESC LIMIT 20", params)
+                return cur.fetchall()
+
+            print(f"\n{'term':<12} {'LIKE %t% ms':>12} {'indexed ms':>11}  path")
+            for term in TERMS:
+                like_ms, _ = timed(lambda: run("(learner_name LIKE %s OR learner_email LIKE %s)", [f"%{term}%"] * 2), repeat=5)
+                indexed_ms, _ = timed(lambda: run(*search_clause(term)), repeat=5)
+                path = 'prefix' if len(term) < 2 else 'fulltext'
+                print(f"{term:<12} {like_ms:>12.2f} {indexed_ms:>11.2f}  {path}")
+        finally:
+            cur.execute(f"DROP TABLE IF EXISTS {SCRATCH_TABLE}")
+
+
+if __name__ == "__main__":
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    n = int(args[0]) if args else 100_000
+
+    print("=" * 60)
+    print(f"Learner search benchmark ({n} rows)")
+    print("=" * 60)
+    rows = make_rows(n)
+    bench_memory(rows)
+    if '--db' in sys.argv:
+        bench_db(rows)
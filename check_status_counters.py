@@ -0,0 +1,36 @@
+"""
+Consistency checker for the sor_status_counters table
+Compares the materialized per-status counts with sor_requests and, with
+--repair, rebuilds the counters from sor_requests.
+
+Usage: python check_status_counters.py [--repair]
+"""
+import sys
+from src.dashboard_db import dashboard_db
+
+if __name__ == "__main__":
+    repair = '--repair' in sys.argv
+
+    print("=" * 60)
+    print("SOR STATUS COUNTERS CHECK")
+    print("=" * 60)
+
+    result = dashboard_db.check_status_counters(repair=repair)
+    if 'error' in result:
+        sys.exit(1)
+
+    statuses = sorted(set(result['actual']) | set(result['counters']))
+    print(f"\n{'status':<16} {'actual':>8} {'counter':>8}")
+    for status in statuses:
+        actual = result['actual'].get(status, 0)
+        counter = result['counters'].get(status, 0)
+        flag = '' if actual == counter else '  <-- mismatch'
+        print(f"{status:<16} {actual:>8} {counter:>8}{flag}")
+
+    if result['consistent']:
+        print("\n✅ Counters match sor_requests")
+    elif repair:
+        print("\n✅ Counters rebuilt from sor_requests")
+    else:
+        print("\n❌ Counters out of step - rerun with --repair to rebuild")
+        sys.exit(1)
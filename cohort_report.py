@@ -0,0 +1,53 @@
+"""
+Cohort results report
+Loads every learner's counted quiz attempts for the course as one results
+matrix and prints overall-score statistics, the competency rate and a
+score histogram.
+
+Usage: python cohort_report.py [course_id] [best|latest]
+"""
+import sys
+import time
+from src.config import config
+from src.database import db
+from src.scoring import score_matrix, score_stats
+
+
+def print_report(course_id: int, policy: str = None):
+    started = time.perf_counter()
+    matrix = db.load_results_matrix(course_id, policy)
+    loaded = time.perf_counter()
+    overall = score_matrix(matrix)
+    stats = score_stats(overall)
+    scored = time.perf_counter()
+
+    learners, quizzes = matrix.shape
+    print(f"Loaded {learners} learners x {quizzes} quizzes ({matrix.attempted.sum()} attempts) "
+          f"in {loaded - started:.2f}s, scored in {(scored - loaded) * 1000:.1f}ms")
+    if not learners:
+        return
+
+    print(f"\nCompetent: {stats['competent']}/{stats['learners']} ({stats['competent_rate']:.1%})")
+    print(f"Mean {stats['mean']:.2f}%  Median {stats['median']:.2f}%  P10 {stats['p10']:.2f}%  P90 {stats['p90']:.2f}%")
+
+    print("\nOverall score distribution:")
+    counts, edges = stats['histogram']['counts'], stats['histogram']['edges']
+    widest = max(counts) or 1
+    for count, low, high in zip(counts, edges, edges[1:]):
+        print(f"  {low:>5.0f}-{high:<5.0f} {count:>6}  {'#' * round(40 * count / widest)}")
+
+    print("\nAttempt rate per quiz:")
+    for quiz_id, rate in zip(matrix.quiz_ids, matrix.attempted.mean(axis=0)):
+        print(f"  Quiz {quiz_id}: {rate:.1%}")
+
+
+if __name__ == "__main__":
+    course_id = int(sys.argv[1]) if len(sys.argv) > 1 else config.COURSE_ID
+    policy = sys.argv[2] if len(sys.argv) > 2 else None
+
+    print("=" * 60)
+    print(f"Cohort report for course {course_id}")
+    print("=" * 60)
+    if not db.test_connection():
+        sys.exit(1)
+    print_report(course_id, policy)
@@ -19,9 +19,86 @@ CREATE TABLE IF NOT EXISTS sor_requests (
     signed_at TIMESTAMP NULL,
     uploaded_at TIMESTAMP NULL,
     error_message TEXT,
+    pdf_contenthash CHAR(40) NULL,
+    pdf_filesize INT NULL,
+    pdf_fingerprint CHAR(64) NULL,
+    signed_contenthash CHAR(40) NULL,
+    uploaded_contenthash CHAR(40) NULL,
     INDEX idx_learner_id (learner_id),
     INDEX idx_status (status),
-    INDEX idx_created_at (created_at)
+    INDEX idx_created_at (created_at),
+    INDEX idx_signature_request_id (signature_request_id),
+    INDEX idx_updated_at_id (updated_at, id),
+    INDEX idx_status_updated_at_id (status, updated_at, id),
+    INDEX idx_status_created_at_id (status, created_at, id),
+    INDEX idx_status_signature_sent_at (status, signature_sent_at),
+    INDEX idx_learner_name (learner_name),
+    INDEX idx_learner_email (learner_email),
+    INDEX idx_pdf_fingerprint (pdf_fingerprint),
+    INDEX idx_pdf_contenthash (pdf_contenthash),
+    INDEX idx_signed_contenthash (signed_contenthash),
+    FULLTEXT INDEX ft_learner (learner_name, learner_email) WITH PARSER ngram
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Existing installs: index used by the Dropbox Sign callback lookup
+-- ALTER TABLE sor_requests ADD INDEX idx_signature_request_id (signature_request_id);
+
+-- Existing installs: indexes used by the paginated request list
+-- ALTER TABLE sor_requests ADD INDEX idx_updated_at_id (updated_at, id),
+--     ADD INDEX idx_status_updated_at_id (status, updated_at, id),
+--     ADD INDEX idx_status_created_at_id (status, created_at, id);
+
+-- Existing installs: overdue-signature count used by the dashboard stats
+-- ALTER TABLE sor_requests ADD INDEX idx_status_signature_sent_at (status, signature_sent_at);
+
+-- Existing installs: learner search (prefix path + ngram FULLTEXT, MySQL 5.7.6+)
+-- ALTER TABLE sor_requests ADD INDEX idx_learner_name (learner_name),
+--     ADD INDEX idx_learner_email (learner_email);
+-- ALTER TABLE sor_requests ADD FULLTEXT INDEX ft_learner (learner_name, learner_email) WITH PARSER ngram;
+
+-- Existing installs: artifact store metadata (ARTIFACT_STORE_ENABLED). Contenthashes
+-- are the SHA-1 of the PDF (Moodle's mdl_files.contenthash); pdf_fingerprint
+-- hashes the data the SOR was rendered from, so unchanged SORs aren't re-rendered
+-- ALTER TABLE sor_requests ADD COLUMN pdf_contenthash CHAR(40) NULL,
+--     ADD COLUMN pdf_filesize INT NULL,
+--     ADD COLUMN pdf_fingerprint CHAR(64) NULL,
+--     ADD COLUMN signed_contenthash CHAR(40) NULL,
+--     ADD COLUMN uploaded_contenthash CHAR(40) NULL,
+--     ADD INDEX idx_pdf_fingerprint (pdf_fingerprint),
+--     ADD INDEX idx_pdf_contenthash (pdf_contenthash),
+--     ADD INDEX idx_signed_contenthash (signed_contenthash);
+
+-- Per-status row counts for sor_requests, maintained by DashboardDB when
+-- STATUS_COUNTERS_ENABLED=true (check_status_counters.py verifies/rebuilds)
+CREATE TABLE IF NOT EXISTS sor_status_counters (
+    status VARCHAR(32) PRIMARY KEY,
+    count INT NOT NULL DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Durable job queue for the background worker (python -m src.worker).
+-- Claims use SELECT ... FOR UPDATE SKIP LOCKED, which needs MySQL 8.0+
+CREATE TABLE IF NOT EXISTS sor_jobs (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    job_type VARCHAR(64) NOT NULL,
+    sor_request_id INT NULL,
+    payload TEXT,
+    status ENUM('queued', 'running', 'succeeded', 'dead') DEFAULT 'queued',
+    attempts INT NOT NULL DEFAULT 0,
+    max_attempts INT NOT NULL DEFAULT 5,
+    run_after TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    locked_by VARCHAR(100),
+    lease_expires_at TIMESTAMP NULL,
+    progress VARCHAR(255),
+    result TEXT,
+    last_error TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    started_at TIMESTAMP NULL,
+    finished_at TIMESTAMP NULL,
+    INDEX idx_status_run_after (status, run_after, id),
+    INDEX idx_status_lease (status, lease_expires_at),
+    INDEX idx_sor_request_id (sor_request_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Table for audit logging
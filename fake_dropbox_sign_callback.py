@@ -0,0 +1,61 @@
+"""
+Fake Dropbox Sign callback
+Posts a signed sample event to the local API so the webhook route can be
+exercised without a real signature. The API needs SIGNATURE_WEBHOOK_ENABLED=true
+and DROPBOX_SIGN_API_KEY set.
+
+Usage: python fake_dropbox_sign_callback.py <signature_request_id> [event_type] [api_url]
+"""
+import hashlib
+import hmac
+import json
+import sys
+import time
+import requests
+from src.config import config
+
+
+def build_event(signature_request_id: str, event_type: str = 'signature_request_all_signed', api_key: str = None) -> dict:
+    """Build a callback payload shaped like Dropbox Sign's, with a valid event_hash"""
+    api_key = config.DROPBOX_SIGN_API_KEY if api_key is None else api_key
+    event_time = str(int(time.time()))
+    event_hash = hmac.new((api_key or '').encode(), (event_time + event_type).encode(), hashlib.sha256).hexdigest()
+    return {
+        'event': {
+            'event_time': event_time,
+            'event_type': event_type,
+            'event_hash': event_hash,
+            'event_metadata': {'related_signature_id': None, 'reported_for_account_id': 'local-fake'}
+        },
+        'signature_request': {
+            'signature_request_id': signature_request_id,
+            'is_complete': event_type == 'signature_request_all_signed'
+        }
+    }
+
+
+def post_event(payload: dict, api_url: str = 'http://localhost:5000'):
+    """Post the payload the way Dropbox Sign does: multipart form with a 'json' field"""
+    response = requests.post(f"{api_url}/api/webhooks/dropbox-sign", files={'json': (None, json.dumps(payload))}, timeout=10)
+    print(f"HTTP {response.status_code}: {response.text[:200]}")
+    return response
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2:
+        print(__doc__)
+        sys.exit(1)
+
+    sig_id = sys.argv[1]
+    event_type = sys.argv[2] if len(sys.argv) > 2 else 'signature_request_all_signed'
+    api_url = sys.argv[3] if len(sys.argv) > 3 else 'http://localhost:5000'
+
+    print("=" * 60)
+    print(f"Posting {event_type} for {sig_id} to {api_url}")
+    print("=" * 60)
+    post_event(build_event(sig_id, event_type), api_url)
+
+    print("\nTampered hash (expect 401):")
+    bad = build_event(sig_id, event_type)
+    bad['event']['event_hash'] = '0' * 64
+    post_event(bad, api_url)
@@ -48,6 +48,8 @@ def setup_database():
         print("  - sor_requests")
         print("  - sor_audit_log")
         print("  - sor_settings")
+        print("  - sor_status_counters")
+        print("  - sor_jobs")
 
         # Verify tables
         cursor.execute("SHOW TABLES LIKE 'sor_%'")
@@ -0,0 +1,211 @@
+"""
+Artifact store module for SOR Automation System
+Content-addressed storage for generated and signed SOR PDFs. Blobs are keyed
+by the SHA-1 contenthash Moodle uses and laid out like Moodle's filedir
+(filedir/<h[0:2]>/<h[2:4]>/<h>), so identical PDFs are stored once. The
+PDFs in the output directory are hardlinks to their blobs; blobs no
+sor_requests row references any more are removed by gc().
+
+Usage: python -m src.artifact_store [stats | gc [--dry-run]]
+"""
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import argparse
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from .config import config
+
+# Bytes read per hashing / copying step
+CHUNK_SIZE = 1 << 20
+
+
+def sha1_file(path) -> Tuple[str, int]:
+    """(SHA-1 hex digest, size) of a file, read in chunks rather than all at once"""
+    digest = hashlib.sha1()
+    size = 0
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+
+def _is_contenthash(value) -> bool:
+    return isinstance(value, str) and len(value) == 40 and all(c in '0123456789abcdef' for c in value)
+
+
+class ArtifactStore:
+    """
+    Blobs are written once and never modified: new content always arrives as
+    a new file that is renamed into place, and named copies are replaced by
+    renaming a fresh link over them, so a hardlinked output PDF never sees a
+    partial write.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.filedir = self.root / 'filedir'
+        self.tempdir = self.root / 'temp'
+        self.stats = {'stored': 0, 'deduplicated': 0, 'linked': 0, 'copied': 0}
+
+    def blob_path(self, contenthash: str) -> Path:
+        return self.filedir / contenthash[0:2] / contenthash[2:4] / contenthash
+
+    def has(self, contenthash: Optional[str]) -> bool:
+        return _is_contenthash(contenthash) and self.blob_path(contenthash).exists()
+
+    def staging_path(self, suffix: str = '.pdf') -> str:
+        """A fresh path on the store's filesystem to render or download into before put()"""
+        self.tempdir.mkdir(parents=True, exist_ok=True)
+        return str(self.tempdir / f"{uuid.uuid4().hex}{suffix}")
+
+    def put(self, path) -> Tuple[str, int]:
+        """
+        Move the file at path into the store and return (contenthash, size).
+        If the content is already stored the file is just removed.
+        """
+        contenthash, size = sha1_file(path)
+        blob = self.blob_path(contenthash)
+        if blob.exists():
+            os.remove(path)
+            # Fresh mtime so gc() leaves it alone until the new reference is saved
+            os.utime(blob)
+            self.stats['deduplicated'] += 1
+            return contenthash, size
+
+        blob.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(path, blob)
+        except OSError:
+            # path is on another filesystem
+            tmp = blob.with_name(f"{contenthash}.{uuid.uuid4().hex}.tmp")
+            shutil.copyfile(path, tmp)
+            os.replace(tmp, blob)
+            os.remove(path)
+        self.stats['stored'] += 1
+        return contenthash, size
+
+    def link(self, contenthash: str, dest) -> str:
+        """
+        Make dest a hardlink to the blob (a copy if the output directory is on
+        another filesystem), replacing whatever dest was. Returns dest.
+        """
+        blob = self.blob_path(contenthash)
+        dest = Path(dest)
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        tmp = dest.with_name(f".{dest.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            os.link(blob, tmp)
+            self.stats['linked'] += 1
+        except OSError:
+            shutil.copyfile(blob, tmp)
+            self.stats['copied'] += 1
+        try:
+            os.replace(tmp, dest)
+        except OSError:
+            os.remove(tmp)
+            raise
+        return str(dest)
+
+    def store_as(self, path, dest) -> Tuple[str, int]:
+        """put() the file at path and link the result to dest"""
+        contenthash, size = self.put(path)
+        self.link(contenthash, dest)
+        return contenthash, size
+
+    def usage(self) -> Dict:
+        """Blob count and bytes, and how many blobs still have a named link outside the store"""
+        blobs = total = linked = 0
+        for blob in self._blobs():
+            st = blob.stat()
+            blobs += 1
+            total += st.st_size
+            linked += st.st_nlink > 1
+        return {'blobs': blobs, 'bytes': total, 'linked': linked}
+
+    def gc(self, refcounts: Dict[str, int], grace_seconds: float = None, dry_run: bool = False) -> Dict:
+        """
+        Remove blobs with no references in refcounts ({contenthash: count})
+        and staging files, if older than grace_seconds so a render that has
+        not been checkpointed yet keeps its blob. A removed blob's disk space
+        is only freed once its named copies are gone too.
+        """
+        grace_seconds = config.ARTIFACT_GC_GRACE_SECONDS if grace_seconds is None else grace_seconds
+        cutoff = time.time() - grace_seconds
+        result = {'blobs': 0, 'referenced': 0, 'removed': 0, 'freed_bytes': 0, 'kept_recent': 0, 'temp_removed': 0}
+
+        for blob in self._blobs():
+            result['blobs'] += 1
+            if refcounts.get(blob.name, 0) > 0:
+                result['referenced'] += 1
+                continue
+            st = blob.stat()
+            if st.st_mtime > cutoff:
+                result['kept_recent'] += 1
+                continue
+            result['removed'] += 1
+            if st.st_nlink == 1:
+                result['freed_bytes'] += st.st_size
+            if not dry_run:
+                os.remove(blob)
+
+        if self.tempdir.exists():
+            for tmp in self.tempdir.iterdir():
+                if tmp.stat().st_mtime <= cutoff:
+                    result['temp_removed'] += 1
+                    if not dry_run:
+                        os.remove(tmp)
+        if not dry_run:
+            self._prune_dirs()
+        return result
+
+    def _blobs(self):
+        if not self.filedir.exists():
+            return
+        for blob in self.filedir.glob('??/??/*'):
+            if _is_contenthash(blob.name):
+                yield blob
+
+    def _prune_dirs(self):
+        for level in ('??/??', '??'):
+            for d in self.filedir.glob(level):
+                try:
+                    d.rmdir()
+                except OSError:
+                    pass
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Inspect or garbage-collect the SOR artifact store")
+    parser.add_argument('command', nargs='?', choices=('stats', 'gc'), default='stats')
+    parser.add_argument('--dry-run', action='store_true', help="report what gc would remove")
+    parser.add_argument('--grace-seconds', type=float, default=None, help="keep unreferenced blobs younger than this")
+    args = parser.parse_args(argv)
+
+    print(f"Artifact store: {artifact_store.root}")
+    if args.command == 'stats':
+        usage = artifact_store.usage()
+        print(f"   {usage['blobs']} blob(s), {usage['bytes'] / 1e6:.1f} MB, {usage['linked']} with named copies")
+        return 0
+
+    from .dashboard_db import dashboard_db
+    refcounts = dashboard_db.get_artifact_refcounts()
+    if refcounts is None:
+        print("[X] Could not read references from sor_requests; nothing removed")
+        return 1
+    result = artifact_store.gc(refcounts, args.grace_seconds, args.dry_run)
+    verb = 'Would remove' if args.dry_run else 'Removed'
+    print(f"   {result['blobs']} blob(s): {result['referenced']} referenced, {result['kept_recent']} too recent")
+    print(f"[OK] {verb} {result['removed']} blob(s) ({result['freed_bytes'] / 1e6:.1f} MB freed) "
+          f"and {result['temp_removed']} staging file(s)")
+    return 0
+
+
+# Create shared artifact store instance
+artifact_store = ArtifactStore(config.ARTIFACT_STORE_DIR)
+
+if __name__ == "__main__":
+    raise SystemExit(main())
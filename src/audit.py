@@ -0,0 +1,170 @@
+"""
+Audit module for SOR Automation System
+Buffered writer for sor_audit_log: entries are queued in memory and written
+with one multi-row INSERT per flush instead of a connect + commit per entry
+"""
+from collections import deque
+from typing import Dict, List, Tuple
+import atexit
+import threading
+import time
+import pymysql
+from .config import config
+from .db_pool import pool
+
+# Values of the sor_audit_log.status ENUM; anything else is logged as an error
+AUDIT_STATUSES = ('success', 'error', 'warning')
+
+# created_at is left to the column default, so every entry is stamped by the
+# database clock rather than whichever host logged it
+INSERT_AUDIT_SQL = """INSERT INTO sor_audit_log
+                      (sor_request_id, action, details, status, user)
+                      VALUES (%s, %s, %s, %s, %s)"""
+
+
+class AuditWriter:
+    """
+    Queues audit entries and flushes them when flush_size entries are
+    waiting, every flush_seconds, when a caller asks (stage boundaries), and
+    at interpreter exit. created_at is the database time of the write, so a
+    buffered entry's timestamp trails the event by up to flush_seconds (more
+    if a flush fails and is retried); entries still keep their logged order.
+
+    Error entries, sync=True calls and a disabled buffer write straight
+    through (after anything already queued, to keep the log in order).
+    """
+
+    def __init__(self, flush_size: int = 50, flush_seconds: float = 1.0, enabled: bool = True,
+                 max_buffer: int = 10000):
+        self.get_connection = pool.get_connection
+        self.flush_size = max(1, flush_size)
+        self.flush_seconds = flush_seconds
+        self.enabled = enabled
+        self.max_buffer = max_buffer
+        self._buffer: deque = deque()
+        self._buffer_lock = threading.Lock()
+        # Serialises flushes so batches reach the table in the order they were queued
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.stats = {'logged': 0, 'written': 0, 'flushes': 0, 'sync_writes': 0, 'failed_flushes': 0,
+                      'dropped': 0, 'last_flush_ms': None, 'max_flush_ms': 0.0, 'total_flush_ms': 0.0}
+        atexit.register(self.close)
+
+    def log(self, sor_id: int, action: str, details: str = None, status: str = 'success',
+            user: str = 'system', sync: bool = False) -> bool:
+        if status not in AUDIT_STATUSES:
+            status = 'error'
+        entry = (sor_id, action, details, status, user)
+        self.stats['logged'] += 1
+        if sync or status == 'error' or not self.enabled or self._stopped.is_set():
+            with self._buffer_lock:
+                self._buffer.append(entry)
+            self.stats['sync_writes'] += 1
+            return self.flush()
+
+        with self._buffer_lock:
+            self._buffer.append(entry)
+            depth = len(self._buffer)
+        self._ensure_thread()
+        if depth >= self.flush_size:
+            self._wake.set()
+        return True
+
+    def flush(self) -> bool:
+        """Write everything queued so far; False if the write failed (entries stay queued)"""
+        with self._flush_lock:
+            with self._buffer_lock:
+                if not self._buffer:
+                    return True
+                batch = list(self._buffer)
+                self._buffer.clear()
+
+            started = time.perf_counter()
+            try:
+                written = self._write(batch)
+            except Exception as e:
+                self.stats['failed_flushes'] += 1
+                print(f"❌ Error writing {len(batch)} audit entries: {e}")
+                self._requeue(batch)
+                return False
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            self.stats['flushes'] += 1
+            self.stats['written'] += written
+            self.stats['last_flush_ms'] = round(elapsed_ms, 2)
+            self.stats['max_flush_ms'] = round(max(self.stats['max_flush_ms'], elapsed_ms), 2)
+            self.stats['total_flush_ms'] += elapsed_ms
+            return True
+
+    def _write(self, batch: List[Tuple]) -> int:
+        """Insert a batch; returns how many entries were written"""
+        conn = self.get_connection()
+        try:
+            with conn.cursor() as cur:
+                try:
+                    # pymysql turns executemany on INSERT ... VALUES into multi-row INSERTs
+                    cur.executemany(INSERT_AUDIT_SQL, batch)
+                    conn.commit()
+                    return len(batch)
+                except (pymysql.IntegrityError, pymysql.DataError):
+                    # One bad row (e.g. its request was deleted) mustn't sink the whole batch
+                    conn.rollback()
+                    written = 0
+                    for entry in batch:
+                        try:
+                            cur.execute(INSERT_AUDIT_SQL, entry)
+                            written += 1
+                        except (pymysql.IntegrityError, pymysql.DataError) as e:
+                            print(f"❌ Skipping audit entry {entry[1]} for request {entry[0]}: {e}")
+                    conn.commit()
+                    return written
+        finally:
+            conn.close()
+
+    def _requeue(self, batch: List[Tuple]):
+        """Put a failed batch back in front of newer entries, dropping the oldest past max_buffer"""
+        with self._buffer_lock:
+            self._buffer.extendleft(reversed(batch))
+            while len(self._buffer) > self.max_buffer:
+                self._buffer.popleft()
+                self.stats['dropped'] += 1
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            with self._buffer_lock:
+                if self._thread is None or not self._thread.is_alive():
+                    self._thread = threading.Thread(target=self._run, name='audit-writer', daemon=True)
+                    self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_seconds)
+            self._wake.clear()
+            self.flush()
+
+    def close(self):
+        """Stop the background flusher and write whatever is left (registered with atexit)"""
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=5)
+        self.flush()
+
+    def get_stats(self) -> Dict:
+        flushes = self.stats['flushes']
+        return {
+            **self.stats,
+            'total_flush_ms': round(self.stats['total_flush_ms'], 2),
+            'avg_flush_ms': round(self.stats['total_flush_ms'] / flushes, 2) if flushes else None,
+            'queue_depth': len(self._buffer),
+            'enabled': self.enabled,
+            'flush_size': self.flush_size,
+            'flush_seconds': self.flush_seconds,
+        }
+
+
+# Create shared audit writer instance
+audit_writer = AuditWriter(flush_size=config.AUDIT_FLUSH_SIZE, flush_seconds=config.AUDIT_FLUSH_SECONDS,
+                           enabled=config.AUDIT_BUFFER_ENABLED)
@@ -0,0 +1,326 @@
+"""
+Bulk SOR generation for SOR Automation System
+Renders SORs for a whole intake: learners are picked by course, list or
+dashboard status, their data is prefetched in bulk, and rendering is
+sharded across worker processes. A manifest of content fingerprints lets a
+rerun skip learners whose SOR would come out unchanged.
+
+Usage: python -m src.bulk (--course ID | --learners A,B,... | --status STATUS)
+                          [--workers N] [--output DIR] [--force] [--template]
+"""
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from contextlib import redirect_stdout
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple, Union
+import argparse
+import io
+import json
+import os
+import re
+import time
+from .config import config, PDF_OUTPUT_DIR
+from .database import db
+from .pdf_generator import (content_fingerprint, generate_sor_pdf, validate_image_path,
+                            warm_render_worker)
+from .validation import validator
+
+MANIFEST_NAME = 'manifest.json'
+# Learners whose data is fetched per bulk query
+FETCH_SIZE = 200
+# Renders handed to a worker process at a time
+CHUNK_SIZE = 8
+# Seconds between manifest checkpoints while rendering
+MANIFEST_SAVE_SECONDS = 5
+
+LearnerKey = Union[int, str]
+
+
+def pdf_filename(learner: Dict) -> str:
+    """Deterministic file name: the same learner always maps to the same PDF"""
+    name = re.sub(r'[^A-Za-z0-9]+', '_', f"{learner['firstname']} {learner['lastname']}").strip('_')
+    return f"SOR_{learner['id']}_{name or 'learner'}.pdf"
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * pct // 100))
+    return sorted_values[int(rank) - 1]
+
+
+# ===== Learner selection =====
+
+def parse_learners(values: List[str]) -> List[LearnerKey]:
+    """Learner IDs and/or full names from comma-separated values; @path reads one per line"""
+    keys = []
+    for value in values:
+        if value.startswith('@'):
+            items = Path(value[1:]).read_text(encoding='utf-8').splitlines()
+        else:
+            items = value.split(',')
+        for item in (i.strip() for i in items):
+            if item:
+                keys.append(int(item) if item.isdigit() else item)
+    return list(dict.fromkeys(keys))
+
+
+def select_learners(course_id: int = None, learners: List[str] = None, status: str = None) -> List[LearnerKey]:
+    if learners:
+        return parse_learners(learners)
+    if status:
+        from .dashboard_db import dashboard_db
+        requests = dashboard_db.get_all_sor_requests(status=status, limit=100000)
+        return list(dict.fromkeys(int(r['learner_id']) if r.get('learner_id') else r['learner_name'] for r in requests))
+    return db.fetch_course_learner_ids(course_id)
+
+
+# ===== Manifest =====
+
+class Manifest:
+    """
+    {learner id: {fingerprint, file, rendered_at, render_ms}} for one output
+    directory, written atomically so an interrupted run can resume.
+    """
+
+    def __init__(self, output_dir: Path):
+        self.path = output_dir / MANIFEST_NAME
+        self.entries: Dict[str, Dict] = {}
+        if self.path.exists():
+            try:
+                self.entries = json.loads(self.path.read_text(encoding='utf-8'))
+            except (OSError, ValueError) as e:
+                print(f"[!] Ignoring unreadable manifest {self.path}: {e}")
+
+    def is_current(self, learner_id: int, fingerprint: str, pdf_path: Path) -> bool:
+        entry = self.entries.get(str(learner_id))
+        return bool(entry) and entry.get('fingerprint') == fingerprint and pdf_path.exists()
+
+    def record(self, learner_id: int, fingerprint: str, pdf_path: Path, render_ms: float):
+        self.entries[str(learner_id)] = {
+            'fingerprint': fingerprint,
+            'file': pdf_path.name,
+            'rendered_at': datetime.now().isoformat(timespec='seconds'),
+            'render_ms': round(render_ms, 1),
+        }
+
+    def save(self):
+        tmp = self.path.with_suffix('.tmp')
+        tmp.write_text(json.dumps(self.entries, indent=1, sort_keys=True), encoding='utf-8')
+        os.replace(tmp, self.path)
+
+
+# ===== Rendering =====
+
+def render_chunk(jobs: List[Tuple], quiet: bool = True) -> List[Tuple]:
+    """
+    Worker entry point: render each (learner_id, name, learner_data, pdf_path,
+    use_template) job and return (learner_id, render_ms, error) per job.
+    PDFs are written to a .part file and renamed, so a crash never leaves a
+    truncated PDF under the final name.
+    """
+    results = []
+    for learner_id, name, learner_data, pdf_path, use_template in jobs:
+        part_path = pdf_path + '.part'
+        started = time.perf_counter()
+        try:
+            if quiet:
+                with redirect_stdout(io.StringIO()):
+                    written = generate_sor_pdf(name, learner_data, part_path, use_template=use_template)
+            else:
+                written = generate_sor_pdf(name, learner_data, part_path, use_template=use_template)
+            if not written:
+                raise RuntimeError('render returned no file')
+            os.replace(part_path, pdf_path)
+            results.append((learner_id, (time.perf_counter() - started) * 1000, None))
+        except Exception as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            results.append((learner_id, (time.perf_counter() - started) * 1000, f"{type(e).__name__}: {e}"))
+    return results
+
+
+class BulkRun:
+    """One bulk generation run: prefetch, skip unchanged, render in shards, report"""
+
+    def __init__(self, output_dir: Path, workers: int = 1, force: bool = False, use_template: bool = None,
+                 chunk_size: int = CHUNK_SIZE, fetch_size: int = FETCH_SIZE, quiet: bool = True):
+        self.output_dir = Path(output_dir)
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.workers = max(1, workers)
+        self.force = force
+        self.use_template = config.PDF_TEMPLATE_MODE if use_template is None else use_template
+        self.chunk_size = max(1, chunk_size)
+        self.fetch_size = max(1, fetch_size)
+        self.quiet = quiet
+        self.manifest = Manifest(self.output_dir)
+        self.render_ms: List[float] = []
+        self.failures: Dict[LearnerKey, str] = {}
+        self.counts = {'selected': 0, 'rendered': 0, 'skipped': 0, 'failed': 0}
+        self._fingerprints: Dict[int, Tuple[str, Path]] = {}
+        self._last_save = time.monotonic()
+
+    def _fail(self, key: LearnerKey, error: str):
+        self.failures[key] = error
+        self.counts['failed'] += 1
+        print(f"[X] {key}: {error}")
+
+    def _collect(self, results: List[Tuple]):
+        for learner_id, render_ms, error in results:
+            if error:
+                self._fail(learner_id, error)
+                continue
+            fingerprint, pdf_path = self._fingerprints.pop(learner_id)
+            self.manifest.record(learner_id, fingerprint, pdf_path, render_ms)
+            self.render_ms.append(render_ms)
+            self.counts['rendered'] += 1
+        if time.monotonic() - self._last_save >= MANIFEST_SAVE_SECONDS:
+            self.manifest.save()
+            self._last_save = time.monotonic()
+
+    def _prepare(self, batch: List[LearnerKey]) -> List[Tuple]:
+        """Fetch a batch's learner data and turn the learners that need a new PDF into render jobs"""
+        data = db.fetch_all_learner_data_bulk(batch)
+        jobs = []
+        for key in batch:
+            learner_data = data.get(key)
+            if not learner_data:
+                self._fail(key, 'learner data not found')
+                continue
+            if validator.validate_all(learner_data).has_errors():
+                self._fail(key, 'validation errors')
+                continue
+
+            learner = learner_data['learner']
+            pdf_path = self.output_dir / pdf_filename(learner)
+            fingerprint = content_fingerprint(learner_data)
+            if not self.force and self.manifest.is_current(learner['id'], fingerprint, pdf_path):
+                self.counts['skipped'] += 1
+                continue
+            if learner['id'] in self._fingerprints:
+                # Listed twice (by name and by ID)
+                continue
+            self._fingerprints[learner['id']] = (fingerprint, pdf_path)
+            name = f"{learner['firstname']} {learner['lastname']}"
+            jobs.append((learner['id'], name, learner_data, str(pdf_path), self.use_template))
+        return jobs
+
+    def run(self, keys: List[LearnerKey]) -> Dict:
+        self.counts['selected'] = len(keys)
+        image_paths = (config.LOGO_PATH_VALID, config.STAMP_PATH_VALID, config.COVER_PATH_VALID)
+        pool = None
+        if self.workers > 1:
+            pool = ProcessPoolExecutor(max_workers=self.workers, initializer=warm_render_worker, initargs=image_paths)
+        else:
+            warm_render_worker(*image_paths)
+
+        fetch_seconds = 0.0
+        render_started = None
+        in_flight = set()
+        try:
+            for i in range(0, len(keys), self.fetch_size):
+                started = time.perf_counter()
+                jobs = self._prepare(keys[i:i + self.fetch_size])
+                fetch_seconds += time.perf_counter() - started
+                if jobs and render_started is None:
+                    render_started = time.perf_counter()
+
+                for j in range(0, len(jobs), self.chunk_size):
+                    chunk = jobs[j:j + self.chunk_size]
+                    if pool is None:
+                        self._collect(render_chunk(chunk, self.quiet))
+                        continue
+                    # Keep every worker busy but don't queue the whole intake's data at once
+                    while len(in_flight) >= self.workers * 2:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            self._collect(future.result())
+                    in_flight.add(pool.submit(render_chunk, chunk, self.quiet))
+                print(f"[>] {min(i + self.fetch_size, len(keys))}/{len(keys)} learners prepared, "
+                      f"{self.counts['rendered']} rendered, {self.counts['skipped']} unchanged")
+
+            for future in in_flight:
+                self._collect(future.result())
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+            self.manifest.save()
+
+        render_seconds = time.perf_counter() - render_started if render_started else 0.0
+        return self.summary(fetch_seconds, render_seconds)
+
+    def summary(self, fetch_seconds: float, render_seconds: float) -> Dict:
+        times = sorted(self.render_ms)
+        rendered = self.counts['rendered']
+        return {
+            **self.counts,
+            'workers': self.workers,
+            'output_dir': str(self.output_dir),
+            'fetch_seconds': round(fetch_seconds, 2),
+            'render_seconds': round(render_seconds, 2),
+            'pdfs_per_second': round(rendered / render_seconds, 2) if rendered and render_seconds else None,
+            'p50_ms': round(percentile(times, 50), 1) if times else None,
+            'p95_ms': round(percentile(times, 95), 1) if times else None,
+            'failures': self.failures,
+        }
+
+
+def print_summary(summary: Dict):
+    print("\n" + "=" * 60)
+    print("BULK GENERATION SUMMARY")
+    print("=" * 60)
+    print(f"Selected:   {summary['selected']}")
+    print(f"Rendered:   {summary['rendered']}")
+    print(f"Unchanged:  {summary['skipped']} (skipped)")
+    print(f"Failed:     {summary['failed']}")
+    print(f"Output:     {summary['output_dir']}")
+    print(f"Fetch:      {summary['fetch_seconds']:.2f}s")
+    if summary['rendered']:
+        print(f"Render:     {summary['render_seconds']:.2f}s on {summary['workers']} process(es)")
+        print(f"Throughput: {summary['pdfs_per_second']:.2f} PDFs/sec")
+        print(f"Per PDF:    p50 {summary['p50_ms']:.0f}ms, p95 {summary['p95_ms']:.0f}ms")
+    print("=" * 60)
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Generate SOR PDFs for many learners")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--course', type=int, help="every learner with a finished SOR quiz attempt in the course")
+    source.add_argument('--learners', nargs='+', help="user IDs and/or full names, comma-separated, or @file")
+    source.add_argument('--status', help="learners of dashboard requests with this status")
+    parser.add_argument('--workers', type=int, default=config.RENDER_PROCESSES, help="render processes")
+    parser.add_argument('--output', default=str(PDF_OUTPUT_DIR / 'bulk'), help="output directory")
+    parser.add_argument('--force', action='store_true', help="render even if the content is unchanged")
+    parser.add_argument('--template', action='store_true', default=None, help="use the cached static sections (PDF_TEMPLATE_MODE)")
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help="renders per worker task")
+    parser.add_argument('--limit', type=int, help="only the first N selected learners")
+    parser.add_argument('--verbose', action='store_true', help="show per-PDF render output")
+    args = parser.parse_args(argv)
+
+    if not db.test_connection():
+        return 1
+
+    config.LOGO_PATH_VALID = validate_image_path(config.LOGO_PATH, "LOGO")
+    config.STAMP_PATH_VALID = validate_image_path(config.STAMP_PATH, "STAMP")
+    config.COVER_PATH_VALID = validate_image_path(config.COVER_PATH, "COVER")
+
+    keys = select_learners(args.course, args.learners, args.status)
+    if args.limit:
+        keys = keys[:args.limit]
+    if not keys:
+        print("[!] No learners selected")
+        return 0
+
+    print("=" * 60)
+    print(f"Generating {len(keys)} SOR(s) with {args.workers} process(es) into {args.output}")
+    print("=" * 60)
+    bulk = BulkRun(Path(args.output), workers=args.workers, force=args.force, use_template=args.template,
+                   chunk_size=args.chunk_size, quiet=not args.verbose)
+    summary = bulk.run(keys)
+    print_summary(summary)
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,223 @@
+"""
+Cache module for SOR Automation System
+TTL + LRU cache for read-mostly Moodle metadata (employer fields, provider
+data, section modules, assignment info), with an in-process backend and a
+SQLite backend shared by every process on the machine
+"""
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+import copy
+import functools
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from .config import config
+
+_MISSING = object()
+
+
+class MemoryBackend:
+    """Thread-safe in-process store: OrderedDict in least-recently-used order"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            expires_at, value = entry
+            if expires_at <= time.time():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+        # Callers get their own copy, as they would from a fresh fetch
+        return copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, ttl: float):
+        with self._lock:
+            self._data[key] = (time.time() + ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+class SQLiteBackend:
+    """
+    Store in a SQLite file so the launcher's subprocesses (Tk dashboard,
+    CLI runs, API) share one cache. Values are pickled; LRU order is kept
+    in an accessed_at column.
+    """
+
+    def __init__(self, path: str, max_entries: int = 256):
+        self.path = path
+        self.max_entries = max_entries
+        self._local = threading.local()
+        self.evictions = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with self._conn() as conn:
+            conn.execute("""CREATE TABLE IF NOT EXISTS cache (
+                                key TEXT PRIMARY KEY,
+                                value BLOB NOT NULL,
+                                expires_at REAL NOT NULL,
+                                accessed_at REAL NOT NULL)""")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_accessed_at ON cache (accessed_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread (sqlite3 connections aren't shareable across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str):
+        now = time.time()
+        with self._conn() as conn:
+            row = conn.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return _MISSING
+            if row[1] <= now:
+                conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                return _MISSING
+            conn.execute("UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key))
+        return pickle.loads(row[0])
+
+    def set(self, key: str, value: Any, ttl: float):
+        now = time.time()
+        with self._conn() as conn:
+            conn.execute("INSERT OR REPLACE INTO cache (key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?)",
+                          (key, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL), now + ttl, now))
+            count = conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+            if count > self.max_entries:
+                conn.execute("DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY accessed_at LIMIT ?)",
+                             (count - self.max_entries,))
+                self.evictions += count - self.max_entries
+
+    def delete(self, key: str):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def clear(self):
+        with self._conn() as conn:
+            conn.execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._conn().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class TTLCache:
+    """
+    TTL cache over a pluggable backend with hit/miss counters.
+
+    Empty results ([], {}, None) are not cached by default, since the
+    wrapped fetches return them on errors and a failed lookup shouldn't
+    stick for the whole TTL.
+    """
+
+    def __init__(self, backend=None, default_ttl: float = 3600, enabled: bool = True):
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.default_ttl = default_ttl
+        self.enabled = enabled
+        self.stats = {'hits': 0, 'misses': 0, 'sets': 0, 'invalidations': 0}
+
+    def get(self, key: str, default: Any = None) -> Any:
+        value = self.backend.get(key) if self.enabled else _MISSING
+        if value is _MISSING:
+            self.stats['misses'] += 1
+            return default
+        self.stats['hits'] += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        if self.enabled:
+            self.backend.set(key, value, self.default_ttl if ttl is None else ttl)
+            self.stats['sets'] += 1
+
+    def get_or_load(self, key: str, loader: Callable[[], Any], ttl: Optional[float] = None, cache_empty: bool = False) -> Any:
+        value = self.backend.get(key) if self.enabled else _MISSING
+        if value is not _MISSING:
+            self.stats['hits'] += 1
+            return value
+        self.stats['misses'] += 1
+        value = loader()
+        if value or cache_empty:
+            self.set(key, value, ttl)
+        return value
+
+    def invalidate(self, *keys: str):
+        """Drop specific keys, or everything when called without keys"""
+        if keys:
+            for key in keys:
+                self.backend.delete(key)
+        else:
+            self.backend.clear()
+        self.stats['invalidations'] += 1
+
+    def cached(self, namespace: str, ttl: Optional[float] = None, cache_empty: bool = False):
+        """
+        Decorator for methods: the key is namespace plus the call's arguments
+        (self excluded), e.g. "assignment_info:42".
+        """
+        def decorator(func):
+            @functools.wraps(func)
+            def wrapper(obj, *args, **kwargs):
+                key = ":".join([namespace] + [repr(a) for a in args] + [f"{k}={v!r}" for k, v in sorted(kwargs.items())])
+                return self.get_or_load(key, lambda: func(obj, *args, **kwargs), ttl, cache_empty)
+            wrapper.cache_key = namespace
+            return wrapper
+        return decorator
+
+    def get_stats(self) -> Dict:
+        lookups = self.stats['hits'] + self.stats['misses']
+        return {
+            **self.stats,
+            'hit_rate': round(self.stats['hits'] / lookups, 3) if lookups else None,
+            'entries': len(self.backend),
+            'evictions': self.backend.evictions,
+            'backend': type(self.backend).__name__,
+        }
+
+
+def build_cache() -> TTLCache:
+    """Cache configured from CACHE_BACKEND (memory | sqlite | none)"""
+    backend_name = config.CACHE_BACKEND
+    if backend_name == 'sqlite':
+        try:
+            backend = SQLiteBackend(config.CACHE_PATH, config.CACHE_MAX_ENTRIES)
+        except (sqlite3.Error, OSError) as e:
+            print(f"[!] SQLite cache unavailable ({e}), using in-process cache")
+            backend = MemoryBackend(config.CACHE_MAX_ENTRIES)
+    else:
+        backend = MemoryBackend(config.CACHE_MAX_ENTRIES)
+    return TTLCache(backend, default_ttl=config.CACHE_TTL_SECONDS, enabled=backend_name != 'none')
+
+
+# Create shared metadata cache instance
+metadata_cache = build_cache()
+
+# Learner full name -> Moodle user ID. Kept apart from metadata_cache so a cohort
+# of names doesn't evict the metadata entries; IDs never change, so the TTL is long
+learner_id_cache = TTLCache(MemoryBackend(config.LEARNER_ID_CACHE_MAX_ENTRIES),
+                            default_ttl=config.LEARNER_ID_CACHE_TTL_SECONDS,
+                            enabled=config.CACHE_BACKEND != 'none')
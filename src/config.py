@@ -17,10 +17,19 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 PDF_OUTPUT_DIR = Path.home() / "Downloads" / "MindWorx_SOR_PDFs"
 PDF_OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-def get_pdf_output_path():
-    """Generate a new PDF output path with current timestamp"""
+def get_pdf_output_path(sor_id=None):
+    """Generate a new PDF output path with current timestamp
+
+    Pass the SOR request ID when several PDFs may be rendered in the same second.
+    """
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    return PDF_OUTPUT_DIR / f"MindWorx_Statement_of_Results_{timestamp}.pdf"
+    suffix = f"_{sor_id}" if sor_id is not None else ""
+    return PDF_OUTPUT_DIR / f"MindWorx_Statement_of_Results_{timestamp}{suffix}.pdf"
+
+def get_request_pdf_path(sor_id, signed=False):
+    """Stable output path for a request's SOR; with the artifact store a re-render replaces it"""
+    suffix = "_SIGNED" if signed else ""
+    return PDF_OUTPUT_DIR / f"MindWorx_Statement_of_Results_{sor_id}{suffix}.pdf"
 
 # For backward compatibility
 PDF_OUTPUT = get_pdf_output_path()
@@ -33,16 +42,79 @@ class Config:
     DB_NAME = os.getenv("DB_NAME")
     DB_PORT = int(os.getenv("DB_PORT", 3306))
 
+    # Connection pool
+    DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", 10))
+    DB_POOL_MAX_IDLE_SECONDS = int(os.getenv("DB_POOL_MAX_IDLE_SECONDS", 300))
+    DB_POOL_TIMEOUT_SECONDS = float(os.getenv("DB_POOL_TIMEOUT_SECONDS", 10))
+
     # Moodle
     MOODLE_URL = os.getenv("MOODLE_URL")
     MOODLE_TOKEN = os.getenv("MOODLE_TOKEN")
+    # Grades per local_sor_bulk_grade_submissions call, and parallel per-user calls when the plugin is unavailable
+    MOODLE_BULK_GRADE_CHUNK = int(os.getenv("MOODLE_BULK_GRADE_CHUNK", 50))
+    MOODLE_GRADE_CONCURRENCY = int(os.getenv("MOODLE_GRADE_CONCURRENCY", 4))
 
     # Dropbox Sign
     DROPBOX_SIGN_API_KEY = os.getenv("DROPBOX_SIGN_API_KEY")
+    # When enabled, signature completion is driven by the /api/webhooks/dropbox-sign
+    # callback and polling only reconciles requests older than the interval below
+    SIGNATURE_WEBHOOK_ENABLED = os.getenv("SIGNATURE_WEBHOOK_ENABLED", "false").lower() == "true"
+    SIGNATURE_RECONCILE_MINUTES = int(os.getenv("SIGNATURE_RECONCILE_MINUTES", 30))
+
+    # Outbound HTTP (Moodle, Dropbox Sign)
+    HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", 30))
+    HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", 3))
+    HTTP_BACKOFF_SECONDS = float(os.getenv("HTTP_BACKOFF_SECONDS", 0.5))
+    HTTP_MAX_PER_HOST = int(os.getenv("HTTP_MAX_PER_HOST", 8))
 
     # Workflow Options
     SKIP_SIGNATURE = os.getenv("SKIP_SIGNATURE", "false").lower() == "true"
 
+    # Worker-pool mode for process_pending_requests (1 = serial)
+    PROCESS_WORKERS = int(os.getenv("PROCESS_WORKERS", 1))
+    RENDER_PROCESSES = int(os.getenv("RENDER_PROCESSES") or os.cpu_count() or 1)
+
+    # Background jobs (sor_jobs table, run by python -m src.worker)
+    JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", 5))
+    JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", 300))
+    JOB_RETRY_BACKOFF_SECONDS = int(os.getenv("JOB_RETRY_BACKOFF_SECONDS", 30))
+    JOB_POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", 2))
+    JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", 2))
+
+    # Moodle metadata cache (employer fields, provider data, section modules,
+    # assignment info): memory = per process, sqlite = shared file, none = off
+    CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+    CACHE_PATH = os.getenv("CACHE_PATH") or str(BASE_DIR / ".cache" / "metadata.sqlite")
+    CACHE_TTL_SECONDS = float(os.getenv("CACHE_TTL_SECONDS", 3600))
+    CACHE_MAX_ENTRIES = int(os.getenv("CACHE_MAX_ENTRIES", 256))
+    LEARNER_ID_CACHE_MAX_ENTRIES = int(os.getenv("LEARNER_ID_CACHE_MAX_ENTRIES", 10000))
+    LEARNER_ID_CACHE_TTL_SECONDS = float(os.getenv("LEARNER_ID_CACHE_TTL_SECONDS", 86400))
+
+    # Read dashboard status counts from sor_status_counters (kept in step by
+    # DashboardDB writes; run check_status_counters.py --repair after enabling)
+    STATUS_COUNTERS_ENABLED = os.getenv("STATUS_COUNTERS_ENABLED", "false").lower() == "true"
+
+    # Quiz attempt counted per quiz when a learner has several: latest (last
+    # finished attempt), best (highest, Moodle's default grading method) or all
+    # rows. latest / best need MySQL 8.0+ (ROW_NUMBER); use all on MySQL 5.7
+    RESULTS_ATTEMPT_POLICY = os.getenv("RESULTS_ATTEMPT_POLICY", "latest").lower()
+
+    # Learner search: serve typeahead from an in-memory trigram index refreshed
+    # incrementally every SEARCH_INDEX_REFRESH_SECONDS (off = FULLTEXT queries only)
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "false").lower() == "true"
+    SEARCH_INDEX_REFRESH_SECONDS = float(os.getenv("SEARCH_INDEX_REFRESH_SECONDS", 5))
+
+    # Live updates (GET /api/events): one change-feed poll per API process fans
+    # out to every connected client; heartbeats keep idle proxies from closing streams
+    EVENTS_POLL_SECONDS = float(os.getenv("EVENTS_POLL_SECONDS", 2))
+    EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", 15))
+
+    # Audit log: queue entries and write them in multi-row INSERTs every
+    # AUDIT_FLUSH_SIZE entries / AUDIT_FLUSH_SECONDS (false = one INSERT per entry)
+    AUDIT_BUFFER_ENABLED = os.getenv("AUDIT_BUFFER_ENABLED", "true").lower() == "true"
+    AUDIT_FLUSH_SIZE = int(os.getenv("AUDIT_FLUSH_SIZE", 50))
+    AUDIT_FLUSH_SECONDS = float(os.getenv("AUDIT_FLUSH_SECONDS", 1.0))
+
     # Test settings
     TEST_LEARNER_NAME = "SOR POD Internal POD"
     MAX_SIGNATURE_WAIT_MINUTES = 60
@@ -50,6 +122,18 @@ class Config:
     MAX_DOWNLOAD_RETRIES = 5
     DOWNLOAD_RETRY_DELAY_SECONDS = 10
     ASSIGNMENT_COURSEMODULE_ID = 213
+    COURSE_ID = 8
+
+    # Render static SOR sections once and stitch per-learner pages around them (needs pypdf)
+    PDF_TEMPLATE_MODE = os.getenv("PDF_TEMPLATE_MODE", "false").lower() == "true"
+
+    # Content-addressed PDF store (needs the sor_requests artifact columns in
+    # database_schema.sql): one blob per SHA-1 under ARTIFACT_STORE_DIR/filedir,
+    # output PDFs hardlinked to it, unchanged SORs neither re-rendered nor re-uploaded
+    ARTIFACT_STORE_ENABLED = os.getenv("ARTIFACT_STORE_ENABLED", "false").lower() == "true"
+    ARTIFACT_STORE_DIR = os.getenv("ARTIFACT_STORE_DIR") or str(PDF_OUTPUT_DIR / ".store")
+    # Unreferenced blobs younger than this survive gc (their request may not be saved yet)
+    ARTIFACT_GC_GRACE_SECONDS = float(os.getenv("ARTIFACT_GC_GRACE_SECONDS", 3600))
 
     # Image paths (update if needed)
     LOGO_PATH = os.getenv('LOGO_PATH', '') or None
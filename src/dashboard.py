@@ -12,6 +12,10 @@ from .dashboard_db import dashboard_db
 from .config import config
 from .database import db
 from .moodle_service import moodle_service
+from .search import TrigramIndex
+
+# How often the dashboard polls the change feed; only changed rows are re-read and redrawn
+AUTO_REFRESH_MS = 15000
 
 class SORDashboard:
     def __init__(self, root):
@@ -465,35 +469,143 @@ class SORDashboard:
         # Double-click to view details
         self.tree.bind('<Double-1>', self.show_details)
 
-        # Store all data for filtering
-        self.all_requests = []
+        # Store all data for filtering, keyed by request ID so changes patch in place
+        self.requests_by_id = {}
+        self.search_index = TrigramIndex()
+        self.changes_watermark = None
+        self._refreshing = False
 
     def load_initial_data(self):
-        """Load initial data in background to prevent GUI freeze"""
-        def load_in_background():
-            self.refresh_data()
+        """Load initial data in background to prevent GUI freeze, then poll for changes"""
+        self.refresh_data(full=True)
+        self.root.after(AUTO_REFRESH_MS, self.auto_refresh)
+
+    def auto_refresh(self):
+        self.refresh_data()
+        self.root.after(AUTO_REFRESH_MS, self.auto_refresh)
 
-        # Run in background thread
-        thread = threading.Thread(target=load_in_background, daemon=True)
+    def refresh_data(self, full=False):
+        """
+        Refresh dashboard data. After the first full load only rows changed
+        since the last refresh are fetched and patched into the table.
+        """
+        if self._refreshing:
+            return
+        self._refreshing = True
+        full = full or self.changes_watermark is None
+        thread = threading.Thread(target=self._fetch_updates, args=(full,), daemon=True)
         thread.start()
 
-    def refresh_data(self):
-        """Refresh all dashboard data"""
+    def _fetch_updates(self, full):
+        """Background thread: read from the database, then hand the result to the Tk thread"""
         try:
-            # Update statistics
-            stats = dashboard_db.get_dashboard_stats()
-            for key, card in self.stat_cards.items():
-                card.value_label.config(text=str(stats.get(key, 0)))
-
-            # Update table
-            self.all_requests = dashboard_db.get_all_sor_requests(limit=1000)
-            self.filter_table()
+            if full:
+                # Watermark first, so writes made during the load come through the change feed
+                watermark = dashboard_db.change_watermark()
+                rows = dashboard_db.get_all_sor_requests(limit=1000)
+            else:
+                rows, watermark = [], self.changes_watermark
+                while True:
+                    page, watermark, has_more = dashboard_db.get_changes_since(*watermark)
+                    rows.extend(page)
+                    if not has_more:
+                        break
+            stats = dashboard_db.get_dashboard_stats() if full or rows else None
+            self.root.after(0, lambda: self._apply_updates(rows, watermark, stats, full))
+        except Exception as e:
+            self._refreshing = False
+            self.root.after(0, lambda err=e: messagebox.showerror("Error", f"Failed to refresh data: {err}"))
 
-            # Update timestamp
+    def _apply_updates(self, rows, watermark, stats, full):
+        try:
+            if stats:
+                for key, card in self.stat_cards.items():
+                    card.value_label.config(text=str(stats.get(key, 0)))
+
+            if full:
+                self.requests_by_id = {r['id']: r for r in rows}
+                self.search_index.rebuild(rows)
+                self.filter_table()
+            elif rows:
+                for row in rows:
+                    self.requests_by_id[row['id']] = row
+                self.search_index.upsert(rows)
+                matches, status_filter = self._current_filter()
+                # Oldest change first, so the most recently updated row ends up on top
+                for row in rows:
+                    self._patch_row(row, matches, status_filter)
+
+            self.changes_watermark = watermark
             self.last_updated_label.config(text=f"Last updated: {datetime.now().strftime('%H:%M:%S')}")
+        finally:
+            self._refreshing = False
 
-        except Exception as e:
-            messagebox.showerror("Error", f"Failed to refresh data: {e}")
+    def _current_filter(self):
+        """(ids matching the search box or None, status filter)"""
+        search_term = self.search_var.get().lower()
+        # Ignore placeholder text
+        if search_term == "search by name or email...":
+            search_term = ""
+        matches = set(self.search_index.search_ids(search_term)) if search_term else None
+        return matches, self.status_filter.get()
+
+    def _row_matches(self, request, matches, status_filter):
+        # Apply search filter
+        if matches is not None and request['id'] not in matches:
+            return False
+
+        # Apply status filter
+        if status_filter != 'All':
+            status_map = {
+                'Pending': 'pending',
+                'Signature Sent': 'signature_sent',
+                'Signed': ['pdf_generated', 'signed'],  # Combine both statuses
+                'Uploaded': 'uploaded',
+                'Failed': 'failed'
+            }
+            filter_status = status_map.get(status_filter)
+            # Handle both single status and list of statuses
+            if isinstance(filter_status, list):
+                return request['status'] in filter_status
+            return request['status'] == filter_status
+        return True
+
+    def _row_values(self, request):
+        # Format score properly
+        score_value = request.get('overall_score')
+        if score_value is not None:
+            # Handle both float and already-formatted strings
+            try:
+                score_display = f"{float(score_value):.2f}%"
+            except (ValueError, TypeError):
+                score_display = 'N/A'
+        else:
+            score_display = 'N/A'
+
+        return (
+            request['id'],
+            request['learner_name'],
+            request.get('learner_email', 'N/A'),
+            request['status'].replace('_', ' ').title(),
+            score_display,
+            request['created_at'].strftime('%Y-%m-%d %H:%M') if request['created_at'] else 'N/A',
+            request['updated_at'].strftime('%Y-%m-%d %H:%M') if request['updated_at'] else 'N/A'
+        )
+
+    def _patch_row(self, request, matches, status_filter):
+        """Update one row in place: redraw it, move it to the top, or hide it if it no longer matches"""
+        iid = str(request['id'])
+        exists = self.tree.exists(iid)
+        if exists:
+            self.tree.item(iid, values=self._row_values(request), tags=(request['status'],))
+
+        if self._row_matches(request, matches, status_filter):
+            if exists:
+                self.tree.move(iid, '', 0)
+            else:
+                self.tree.insert('', 0, iid=iid, values=self._row_values(request), tags=(request['status'],))
+        elif exists:
+            self.tree.detach(iid)
 
     def filter_table(self):
         """Filter table based on search and status"""
@@ -501,64 +613,19 @@ class SORDashboard:
         if not hasattr(self, 'tree'):
             return
 
-        # Clear existing items
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-
-        search_term = self.search_var.get().lower()
-        status_filter = self.status_filter.get()
-
-        # Ignore placeholder text
-        if search_term == "search by name or email...":
-            search_term = ""
-
-        for request in self.all_requests:
-            # Apply search filter
-            if search_term:
-                if search_term not in request['learner_name'].lower() and \
-                   search_term not in (request.get('learner_email') or '').lower():
-                    continue
-
-            # Apply status filter
-            if status_filter != 'All':
-                status_map = {
-                    'Pending': 'pending',
-                    'Signature Sent': 'signature_sent',
-                    'Signed': ['pdf_generated', 'signed'],  # Combine both statuses
-                    'Uploaded': 'uploaded',
-                    'Failed': 'failed'
-                }
-                filter_status = status_map.get(status_filter)
-                # Handle both single status and list of statuses
-                if isinstance(filter_status, list):
-                    if request['status'] not in filter_status:
-                        continue
-                else:
-                    if request['status'] != filter_status:
-                        continue
-
-            # Format score properly
-            score_value = request.get('overall_score')
-            if score_value is not None:
-                # Handle both float and already-formatted strings
-                try:
-                    score_display = f"{float(score_value):.2f}%"
-                except (ValueError, TypeError):
-                    score_display = 'N/A'
+        matches, status_filter = self._current_filter()
+        newest_first = sorted(self.requests_by_id.values(),
+                              key=lambda r: (r['updated_at'] or datetime.min, r['id']), reverse=True)
+        visible = [r for r in newest_first if self._row_matches(r, matches, status_filter)]
+
+        # Rows keep their tree items: hide everything, then re-attach the matches in order
+        self.tree.detach(*self.tree.get_children())
+        for index, request in enumerate(visible):
+            iid = str(request['id'])
+            if self.tree.exists(iid):
+                self.tree.move(iid, '', index)
             else:
-                score_display = 'N/A'
-
-            # Insert into tree
-            values = (
-                request['id'],
-                request['learner_name'],
-                request.get('learner_email', 'N/A'),
-                request['status'].replace('_', ' ').title(),
-                score_display,
-                request['created_at'].strftime('%Y-%m-%d %H:%M') if request['created_at'] else 'N/A',
-                request['updated_at'].strftime('%Y-%m-%d %H:%M') if request['updated_at'] else 'N/A'
-            )
-            self.tree.insert('', 'end', values=values, tags=(request['status'],))
+                self.tree.insert('', index, iid=iid, values=self._row_values(request), tags=(request['status'],))
 
     def sort_column(self, col):
         """Sort table by column"""
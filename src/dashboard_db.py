@@ -2,27 +2,73 @@
 Dashboard Database Manager for SOR Automation System
 Handles all dashboard-specific database operations
 """
-from typing import Dict, List, Optional
-import pymysql
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
+import base64
+import json
+import pymysql
 from .config import config
+from .audit import audit_writer, INSERT_AUDIT_SQL
+from .db_pool import pool
+from .search import search_clause
+
+# Columns the request list views need (avoids SELECT * on the list endpoint)
+REQUEST_LIST_COLUMNS = ("id, learner_id, learner_name, learner_email, status, overall_score, "
+                        "pdf_path, signature_request_id, created_at, updated_at")
+
+# Values of the sor_requests.status ENUM
+SOR_STATUSES = ('pending', 'pdf_generated', 'signature_sent', 'signed', 'uploaded', 'failed')
+
+# Timestamp column set when a request first enters each status
+STATUS_TIMESTAMP_COLUMNS = {
+    'signature_sent': 'signature_sent_at',
+    'signed': 'signed_at',
+    'uploaded': 'uploaded_at',
+}
+
+# One conditional-aggregation column per status for get_dashboard_stats
+STATUS_COUNT_COLUMNS = ", ".join(f"COALESCE(SUM(status = '{s}'), 0) AS `{s}`" for s in SOR_STATUSES)
+
+# MySQL error raised by MATCH() when no FULLTEXT index covers the columns
+ER_FT_MATCHING_KEY_NOT_FOUND = 1191
+
+# Sort keys allowed for keyset pagination (always descending, ties broken by id)
+REQUEST_SORT_COLUMNS = ('updated_at', 'created_at')
+
+# The change feed's watermark never passes NOW() minus this: a transaction that
+# commits late can carry an updated_at slightly older than rows already seen
+CHANGE_FEED_SETTLE_SECONDS = 5
+
+
+def encode_cursor(sort_value: datetime, row_id: int) -> str:
+    """Opaque page cursor for the last row of a page"""
+    raw = json.dumps([sort_value.isoformat() if sort_value else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[datetime], int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors"""
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return (datetime.fromisoformat(sort_value) if sort_value else None), int(row_id)
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
 
 class DashboardDB:
     """Manages dashboard database operations"""
 
     def __init__(self):
-        self.config = {
-            "host": config.DB_HOST,
-            "user": config.DB_USER,
-            "password": config.DB_PASSWORD,
-            "database": config.DB_NAME,
-            "port": config.DB_PORT,
-            "cursorclass": pymysql.cursors.DictCursor
-        }
+        self.pool = pool
+        self.audit = audit_writer
+        # Maintain sor_status_counters alongside sor_requests writes and read stats from it
+        self.status_counters = config.STATUS_COUNTERS_ENABLED
+        # Cleared on the first query that finds no ft_learner FULLTEXT index
+        self.fulltext_search = True
 
     def get_connection(self):
-        """Get database connection"""
-        return pymysql.connect(**self.config)
+        """Get a pooled database connection (close() returns it to the pool)"""
+        return self.pool.get_connection()
 
     # ===== SOR Request Management =====
 
@@ -35,8 +81,11 @@ class DashboardDB:
                         (learner_id, learner_name, learner_email, status, overall_score)
                         VALUES (%s, %s, %s, 'pending', %s)"""
                 cur.execute(sql, (learner_id, learner_name, learner_email, overall_score))
+                sor_id = cur.lastrowid
+                if self.status_counters:
+                    self._bump_status_counter(cur, 'pending', 1)
                 conn.commit()
-                return cur.lastrowid
+                return sor_id
         except Exception as e:
             print(f"❌ Error creating SOR request: {e}")
             return None
@@ -48,10 +97,21 @@ class DashboardDB:
         try:
             conn = self.get_connection()
             with conn.cursor() as cur:
+                old_status = None
+                if self.status_counters and 'status' in updates:
+                    # Lock the row so concurrent status changes count against the right bucket
+                    cur.execute("SELECT status FROM sor_requests WHERE id = %s FOR UPDATE", (sor_id,))
+                    row = cur.fetchone()
+                    old_status = row['status'] if row else None
+
                 set_clause = ", ".join([f"{k} = %s" for k in updates.keys()])
                 sql = f"UPDATE sor_requests SET {set_clause} WHERE id = %s"
                 values = list(updates.values()) + [sor_id]
                 cur.execute(sql, values)
+
+                if old_status is not None and old_status != updates['status']:
+                    self._bump_status_counter(cur, old_status, -1)
+                    self._bump_status_counter(cur, updates['status'], 1)
                 conn.commit()
                 return True
         except Exception as e:
@@ -60,6 +120,60 @@ class DashboardDB:
         finally:
             conn.close()
 
+    def transition(self, sor_id: int, new_status: str, fields: Dict = None, audit_action: str = None,
+                   details: str = None, audit_status: str = 'success', from_status: str = None) -> bool:
+        """
+        Move a request to new_status in one transaction: the status, any extra
+        fields, the status's timestamp column (signature_sent_at, signed_at,
+        uploaded_at; kept if already set, e.g. on resume) and the audit entry
+        commit together or not at all.
+
+        With from_status the update only applies while the request is still
+        in that status (False otherwise), so two processes can't both
+        advance the same request.
+        """
+        fields = dict(fields or {})
+        set_clause = ", ".join(["status = %s"] + [f"{k} = %s" for k in fields])
+        if new_status in STATUS_TIMESTAMP_COLUMNS:
+            column = STATUS_TIMESTAMP_COLUMNS[new_status]
+            set_clause += f", {column} = COALESCE({column}, NOW())"
+        values = [new_status] + list(fields.values())
+
+        # Earlier buffered entries for this request go in first, keeping the log in order
+        if audit_action:
+            self.audit.flush()
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cur:
+                old_status = from_status
+                if self.status_counters and from_status is None:
+                    cur.execute("SELECT status FROM sor_requests WHERE id = %s FOR UPDATE", (sor_id,))
+                    row = cur.fetchone()
+                    old_status = row['status'] if row else None
+
+                sql = f"UPDATE sor_requests SET {set_clause} WHERE id = %s"
+                params = values + [sor_id]
+                if from_status is not None:
+                    sql += " AND status = %s"
+                    params.append(from_status)
+                cur.execute(sql, params)
+                if from_status is not None and from_status != new_status and cur.rowcount != 1:
+                    conn.rollback()
+                    return False
+
+                if self.status_counters and old_status is not None and old_status != new_status:
+                    self._bump_status_counter(cur, old_status, -1)
+                    self._bump_status_counter(cur, new_status, 1)
+                if audit_action:
+                    cur.execute(INSERT_AUDIT_SQL, (sor_id, audit_action, details, audit_status, 'system'))
+                conn.commit()
+                return True
+        except Exception as e:
+            print(f"❌ Error moving SOR request {sor_id} to {new_status}: {e}")
+            return False
+        finally:
+            conn.close()
+
     def get_sor_request(self, sor_id: int) -> Optional[Dict]:
         """Get single SOR request by ID"""
         try:
@@ -73,6 +187,53 @@ class DashboardDB:
         finally:
             conn.close()
 
+    def get_sor_request_by_signature_id(self, signature_request_id: str) -> Optional[Dict]:
+        """Get SOR request by its Dropbox Sign signature request ID"""
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cur:
+                cur.execute("SELECT * FROM sor_requests WHERE signature_request_id = %s ORDER BY id DESC LIMIT 1", (signature_request_id,))
+                return cur.fetchone()
+        except Exception as e:
+            print(f"❌ Error fetching SOR request: {e}")
+            return None
+        finally:
+            conn.close()
+
+    # ===== Artifact Store =====
+
+    def find_pdf_by_fingerprint(self, fingerprint: str) -> Optional[Dict]:
+        """Most recent stored PDF rendered from the same data (see pdf_generator.content_fingerprint)"""
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, pdf_contenthash, pdf_filesize FROM sor_requests "
+                            "WHERE pdf_fingerprint = %s AND pdf_contenthash IS NOT NULL ORDER BY id DESC LIMIT 1",
+                            (fingerprint,))
+                return cur.fetchone()
+        except Exception as e:
+            print(f"❌ Error looking up PDF fingerprint: {e}")
+            return None
+        finally:
+            conn.close()
+
+    def get_artifact_refcounts(self) -> Optional[Dict[str, int]]:
+        """{contenthash: number of sor_requests references} for artifact store GC; None on error"""
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cur:
+                cur.execute("""SELECT contenthash, COUNT(*) AS refs FROM (
+                                   SELECT pdf_contenthash AS contenthash FROM sor_requests WHERE pdf_contenthash IS NOT NULL
+                                   UNION ALL
+                                   SELECT signed_contenthash FROM sor_requests WHERE signed_contenthash IS NOT NULL
+                               ) refs GROUP BY contenthash""")
+                return {row['contenthash']: row['refs'] for row in cur.fetchall()}
+        except Exception as e:
+            print(f"❌ Error counting artifact references: {e}")
+            return None
+        finally:
+            conn.close()
+
     def get_all_sor_requests(self, status: str = None, limit: int = 100) -> List[Dict]:
         """Get all SOR requests with optional status filter, sorted by last updated"""
         try:
@@ -91,88 +252,269 @@ class DashboardDB:
         finally:
             conn.close()
 
-    def search_sor_requests(self, search_term: str) -> List[Dict]:
-        """Search SOR requests by learner name or email"""
+    def list_sor_requests(self, status: str = None, search: str = None,
+                          created_from: datetime = None, created_to: datetime = None,
+                          sort: str = 'updated_at', limit: int = 100,
+                          cursor: str = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        One page of SOR requests with filtering done in SQL.
+
+        Rows are ordered by ``sort`` (updated_at or created_at) descending,
+        then id descending. Pass the returned next_cursor back as ``cursor``
+        to fetch the following page; next_cursor is None on the last page.
+        Raises ValueError for an unknown sort key or a malformed cursor.
+        """
+        if sort not in REQUEST_SORT_COLUMNS:
+            raise ValueError(f"Unsupported sort: {sort}")
+
+        where, params = [], []
+        if status:
+            where.append("status = %s")
+            params.append(status)
+        if created_from:
+            where.append("created_at >= %s")
+            params.append(created_from)
+        if created_to:
+            where.append("created_at < %s")
+            params.append(created_to)
+        if cursor:
+            sort_value, last_id = decode_cursor(cursor)
+            # Expanded form of (sort, id) < (value, id) so MySQL can range-scan the index
+            where.append(f"({sort} < %s OR ({sort} = %s AND id < %s))")
+            params.extend([sort_value, sort_value, last_id])
+
+        def build(fulltext):
+            clauses, values = list(where), list(params)
+            if search and search.strip():
+                clause, extra = search_clause(search, fulltext)
+                clauses.append(clause)
+                values.extend(extra)
+            sql = f"SELECT {REQUEST_LIST_COLUMNS} FROM sor_requests"
+            if clauses:
+                sql += " WHERE " + " AND ".join(clauses)
+            sql += f" ORDER BY {sort} DESC, id DESC LIMIT %s"
+            return sql, values + [limit + 1]
+
+        rows = self._fetch_search(build)
+        if rows is None:
+            return [], None
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1][sort], rows[-1]['id'])
+        return rows, next_cursor
+
+    def get_changes_since(self, since: datetime = None, last_id: int = 0,
+                          limit: int = 500) -> Tuple[List[Dict], Tuple[datetime, int], bool]:
+        """
+        Requests modified after the (since, last_id) watermark, oldest change
+        first, for clients that patch their rows in place.
+
+        Returns (rows, watermark, has_more); pass the watermark back on the
+        next call. It is held at NOW() - CHANGE_FEED_SETTLE_SECONDS, so the
+        last few seconds are read again on the next poll and a late commit
+        is never skipped (clients key rows by id, so repeats are harmless).
+        since=None reads from the beginning.
+        """
         try:
             conn = self.get_connection()
             with conn.cursor() as cur:
-                sql = """SELECT * FROM sor_requests
-                        WHERE learner_name LIKE %s OR learner_email LIKE %s
-                        ORDER BY created_at DESC LIMIT 100"""
-                term = f"%{search_term}%"
-                cur.execute(sql, (term, term))
-                return cur.fetchall()
+                cur.execute("SELECT NOW() AS now")
+                settled = cur.fetchone()['now'] - timedelta(seconds=CHANGE_FEED_SETTLE_SECONDS)
+
+                sql = f"SELECT {REQUEST_LIST_COLUMNS} FROM sor_requests"
+                params = []
+                if since is not None:
+                    # Expanded (updated_at, id) > (since, last_id) so idx_updated_at_id is range-scanned
+                    sql += " WHERE updated_at > %s OR (updated_at = %s AND id > %s)"
+                    params = [since, since, last_id]
+                cur.execute(sql + " ORDER BY updated_at, id LIMIT %s", params + [limit + 1])
+                rows = cur.fetchall()
         except Exception as e:
-            print(f"❌ Error searching SOR requests: {e}")
-            return []
+            print(f"❌ Error fetching request changes: {e}")
+            return [], (since, last_id), False
         finally:
             conn.close()
 
-    # ===== Dashboard Statistics =====
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        watermark = (rows[-1]['updated_at'], rows[-1]['id']) if rows else (since, last_id)
+        if watermark[0] is None or watermark[0] > settled:
+            watermark = (settled, 0)
+            # Rows past the settle point come round again once they settle
+            has_more = False
+        return rows, watermark, has_more
 
-    def get_dashboard_stats(self) -> Dict:
-        """Get dashboard overview statistics"""
+    def change_watermark(self) -> Tuple[datetime, int]:
+        """Watermark to take before a full load, so the change feed picks up from there"""
         try:
             conn = self.get_connection()
             with conn.cursor() as cur:
-                stats = {}
+                cur.execute("SELECT NOW() - INTERVAL %s SECOND AS settled", (CHANGE_FEED_SETTLE_SECONDS,))
+                return cur.fetchone()['settled'], 0
+        except Exception as e:
+            print(f"❌ Error reading change watermark: {e}")
+            return datetime.now() - timedelta(seconds=CHANGE_FEED_SETTLE_SECONDS), 0
+        finally:
+            conn.close()
 
-                # Total SORs
-                cur.execute("SELECT COUNT(*) as total FROM sor_requests")
-                stats['total'] = cur.fetchone()['total']
+    def search_sor_requests(self, search_term: str, limit: int = 100) -> List[Dict]:
+        """Search SOR requests by learner name or email (FULLTEXT/prefix, see search.search_clause)"""
+        if not search_term or not search_term.strip():
+            return []
 
-                # By status
-                cur.execute("""SELECT status, COUNT(*) as count
-                              FROM sor_requests
-                              GROUP BY status""")
-                status_counts = {row['status']: row['count'] for row in cur.fetchall()}
+        def build(fulltext):
+            clause, params = search_clause(search_term, fulltext)
+            return (f"SELECT {REQUEST_LIST_COLUMNS} FROM sor_requests WHERE {clause} "
+                    f"ORDER BY created_at DESC LIMIT %s", params + [limit])
+
+        return self._fetch_search(build) or []
+
+    def get_search_rows(self, since: datetime = None) -> List[Dict]:
+        """Rows for the in-memory search index, optionally only those updated since a time"""
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cur:
+                if since:
+                    cur.execute("SELECT id, learner_name, learner_email, status, updated_at FROM sor_requests WHERE updated_at >= %s", (since,))
+                else:
+                    cur.execute("SELECT id, learner_name, learner_email, status, updated_at FROM sor_requests")
+                return cur.fetchall()
+        except Exception as e:
+            print(f"❌ Error fetching search rows: {e}")
+            return []
+        finally:
+            conn.close()
 
-                stats['pending'] = status_counts.get('pending', 0)
-                stats['signature_sent'] = status_counts.get('signature_sent', 0)
-                # Combine pdf_generated and signed counts into the 'signed' card
-                stats['signed'] = status_counts.get('pdf_generated', 0) + status_counts.get('signed', 0)
-                stats['uploaded'] = status_counts.get('uploaded', 0)
-                stats['failed'] = status_counts.get('failed', 0)
+    def _fetch_search(self, build) -> Optional[List[Dict]]:
+        """
+        Run build(fulltext) -> (sql, params). Falls back to LIKE matching for
+        good when the server has no FULLTEXT index. Returns None on error.
+        """
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cur:
+                try:
+                    cur.execute(*build(self.fulltext_search))
+                except pymysql.MySQLError as e:
+                    if not self.fulltext_search or not e.args or e.args[0] != ER_FT_MATCHING_KEY_NOT_FOUND:
+                        raise
+                    print("⚠️ FULLTEXT index ft_learner missing, falling back to LIKE search (see database_schema.sql)")
+                    self.fulltext_search = False
+                    cur.execute(*build(False))
+                return cur.fetchall()
+        except Exception as e:
+            print(f"❌ Error searching SOR requests: {e}")
+            return None
+        finally:
+            conn.close()
 
-                # Overdue (signature sent > 7 days ago, not signed)
-                cur.execute("""SELECT COUNT(*) as count FROM sor_requests
-                              WHERE status = 'signature_sent'
-                              AND signature_sent_at < DATE_SUB(NOW(), INTERVAL 7 DAY)""")
-                stats['overdue'] = cur.fetchone()['count']
+    # ===== Dashboard Statistics =====
 
-                # Recent activity (last 24 hours)
-                cur.execute("""SELECT COUNT(*) as count FROM sor_requests
-                              WHERE created_at > DATE_SUB(NOW(), INTERVAL 24 HOUR)""")
-                stats['recent_24h'] = cur.fetchone()['count']
+    def get_dashboard_stats(self) -> Dict:
+        """Get dashboard overview statistics"""
+        try:
+            conn = self.get_connection()
+            with conn.cursor() as cur:
+                if self.status_counters:
+                    # Status counts from the counters table plus two index range counts, one round trip
+                    cur.execute("""SELECT status, count FROM sor_status_counters
+                                  UNION ALL
+                                  SELECT '_overdue', COUNT(*) FROM sor_requests
+                                  WHERE status = 'signature_sent'
+                                  AND signature_sent_at < DATE_SUB(NOW(), INTERVAL 7 DAY)
+                                  UNION ALL
+                                  SELECT '_recent_24h', COUNT(*) FROM sor_requests
+                                  WHERE created_at > DATE_SUB(NOW(), INTERVAL 24 HOUR)""")
+                    counts = {row['status']: int(row['count']) for row in cur.fetchall()}
+                    overdue = counts.pop('_overdue', 0)
+                    recent_24h = counts.pop('_recent_24h', 0)
+                    return self._format_stats(counts, sum(counts.values()), overdue, recent_24h)
 
-                return stats
+                # One conditional-aggregation scan instead of four queries
+                cur.execute(f"""SELECT COUNT(*) AS total, {STATUS_COUNT_COLUMNS},
+                              COALESCE(SUM(status = 'signature_sent'
+                                  AND signature_sent_at < DATE_SUB(NOW(), INTERVAL 7 DAY)), 0) AS overdue,
+                              COALESCE(SUM(created_at > DATE_SUB(NOW(), INTERVAL 24 HOUR)), 0) AS recent_24h
+                              FROM sor_requests""")
+                row = cur.fetchone()
+                counts = {s: int(row[s]) for s in SOR_STATUSES}
+                return self._format_stats(counts, int(row['total']), int(row['overdue']), int(row['recent_24h']))
         except Exception as e:
             print(f"❌ Error fetching dashboard stats: {e}")
             return {'total': 0, 'pending': 0, 'signed': 0, 'failed': 0, 'overdue': 0}
         finally:
             conn.close()
 
-    # ===== Audit Logging =====
+    def _format_stats(self, status_counts: Dict[str, int], total: int, overdue: int, recent_24h: int) -> Dict:
+        return {
+            'total': total,
+            'pending': status_counts.get('pending', 0),
+            'signature_sent': status_counts.get('signature_sent', 0),
+            # Combine pdf_generated and signed counts into the 'signed' card
+            'signed': status_counts.get('pdf_generated', 0) + status_counts.get('signed', 0),
+            'uploaded': status_counts.get('uploaded', 0),
+            'failed': status_counts.get('failed', 0),
+            'overdue': overdue,
+            'recent_24h': recent_24h,
+        }
+
+    # ===== Status Counters =====
 
-    def log_action(self, sor_id: int, action: str, details: str = None, status: str = 'success', user: str = 'system') -> bool:
-        """Log an action to audit trail"""
+    def _bump_status_counter(self, cur, status: str, delta: int):
+        """Adjust one status count inside the caller's transaction"""
+        cur.execute("""INSERT INTO sor_status_counters (status, count) VALUES (%s, %s)
+                      ON DUPLICATE KEY UPDATE count = count + VALUES(count)""", (status, delta))
+
+    def check_status_counters(self, repair: bool = False) -> Dict:
+        """
+        Compare sor_status_counters with a GROUP BY over sor_requests.
+
+        Returns {'consistent': bool, 'actual': {...}, 'counters': {...}}. With
+        repair, the counters are rebuilt from sor_requests in one transaction
+        (INSERT ... SELECT holds shared locks, so concurrent writes wait).
+        """
         try:
             conn = self.get_connection()
             with conn.cursor() as cur:
-                sql = """INSERT INTO sor_audit_log
-                        (sor_request_id, action, details, status, user)
-                        VALUES (%s, %s, %s, %s, %s)"""
-                cur.execute(sql, (sor_id, action, details, status, user))
-                conn.commit()
-                return True
+                cur.execute("SELECT status, COUNT(*) AS count FROM sor_requests GROUP BY status")
+                actual = {row['status']: int(row['count']) for row in cur.fetchall()}
+                cur.execute("SELECT status, count FROM sor_status_counters")
+                counters = {row['status']: int(row['count']) for row in cur.fetchall() if row['count']}
+                consistent = actual == counters
+
+                if repair and not consistent:
+                    cur.execute("DELETE FROM sor_status_counters")
+                    cur.execute("""INSERT INTO sor_status_counters (status, count)
+                                  SELECT status, COUNT(*) FROM sor_requests GROUP BY status""")
+                    conn.commit()
+                    print("✅ Rebuilt sor_status_counters")
+                return {'consistent': consistent, 'actual': actual, 'counters': counters}
         except Exception as e:
-            print(f"❌ Error logging action: {e}")
-            return False
+            print(f"❌ Error checking status counters: {e}")
+            return {'consistent': False, 'actual': {}, 'counters': {}, 'error': str(e)}
         finally:
             conn.close()
 
+    # ===== Audit Logging =====
+
+    def log_action(self, sor_id: int, action: str, details: str = None, status: str = 'success',
+                   user: str = 'system', sync: bool = False) -> bool:
+        """
+        Log an action to audit trail. Entries are buffered and written in
+        batches; error entries and sync=True are written before returning.
+        """
+        return self.audit.log(sor_id, action, details, status, user, sync=sync)
+
+    def flush_audit(self) -> bool:
+        """Write buffered audit entries now (stage boundaries, end of a job)"""
+        return self.audit.flush()
+
     def get_audit_log(self, sor_id: int = None, limit: int = 100) -> List[Dict]:
         """Get audit log, optionally filtered by SOR request ID"""
+        # Include this process's buffered entries
+        self.audit.flush()
         try:
             conn = self.get_connection()
             with conn.cursor() as cur:
@@ -2,40 +2,121 @@
 Database module for SOR Automation System
 Handles all database queries and connections
 """
-from typing import Dict, List, Optional
+from typing import Dict, Iterable, List, Optional, Tuple, Union
 import pymysql
 from .config import config
+from .db_pool import pool
+from .cache import metadata_cache, learner_id_cache
+
+# Hot per-learner queries, keyed on mdl_user.id / mdl_quiz_attempts.userid
+# (test_query_plans.py EXPLAINs these, plus results_sql)
+LEARNER_BY_ID_SQL = "SELECT id, firstname, lastname, email FROM mdl_user WHERE id = %s"
+# Name -> ID resolution; {clause} comes from name_match_clause
+LEARNER_ID_BY_NAME_SQL = "SELECT id FROM mdl_user WHERE {clause} ORDER BY id LIMIT 1"
+
+SOR_QUIZ_IDS = "12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23"
+
+# Which quiz attempt counts when a learner has several (RESULTS_ATTEMPT_POLICY):
+# all = every attempt row, as before; latest / best = one finished attempt per quiz
+ATTEMPT_ORDER = {
+    'latest': "attempt DESC",
+    # Ungraded (NULL) attempts sort last; ties go to the later attempt
+    'best': "sumgrades DESC, attempt DESC",
+}
+ATTEMPT_POLICIES = ('all',) + tuple(ATTEMPT_ORDER)
+
+
+def _check_policy(policy: Optional[str]) -> str:
+    policy = policy or config.RESULTS_ATTEMPT_POLICY
+    if policy not in ATTEMPT_POLICIES:
+        raise ValueError(f"Unknown attempt policy '{policy}' (expected one of {', '.join(ATTEMPT_POLICIES)})")
+    return policy
+
+
+def picked_attempts_sql(where: str, policy: str) -> str:
+    """
+    Subquery (aliased qa) of the attempts matching where, numbered per
+    (user, quiz) so that pick = 1 is the one the latest / best policy counts.
+    Uses ROW_NUMBER() (MySQL 8.0+ / MariaDB 10.2+); where is applied inside,
+    so mdl_quiz_attempts is still range-scanned on userid or quiz.
+    """
+    return (f"(SELECT userid, quiz, sumgrades, "
+            f"ROW_NUMBER() OVER (PARTITION BY userid, quiz ORDER BY {ATTEMPT_ORDER[policy]}) AS pick "
+            f"FROM mdl_quiz_attempts WHERE {where} AND state = 'finished' AND preview = 0) qa")
+
+
+def results_sql(user_filter: str, policy: str = None, with_userid: bool = False) -> str:
+    """
+    Quiz results query for the users matched by user_filter (a condition on
+    userid, e.g. "userid = %s" or "userid IN (%s, %s)"), one row per counted
+    attempt, shaped like fetch_results. latest / best keep one finished,
+    non-preview attempt per quiz.
+    """
+    policy = _check_policy(policy)
+    columns = ("CONCAT(u.firstname, ' ', u.lastname) AS learner_name, q.id AS quiz_id, q.name AS topic_name, "
+               "qa.sumgrades AS learner_score, q.sumgrades AS total_marks")
+    if with_userid:
+        columns = "qa.userid, " + columns
+    joins = "JOIN mdl_user u ON qa.userid = u.id JOIN mdl_quiz q ON qa.quiz = q.id"
+
+    if policy == 'all':
+        return (f"SELECT {columns} FROM mdl_quiz_attempts qa {joins} "
+                f"WHERE qa.{user_filter} AND qa.quiz IN ({SOR_QUIZ_IDS})")
+    return (f"SELECT {columns} FROM {picked_attempts_sql(f'{user_filter} AND quiz IN ({SOR_QUIZ_IDS})', policy)} "
+            f"{joins} WHERE qa.pick = 1 ORDER BY qa.userid, qa.quiz")
+
+
+def results_matrix_sql(quiz_ids: List[int], policy: str = None) -> str:
+    """
+    Lean cohort query for load_results_matrix: (userid, quiz, score, total)
+    per counted attempt in one course. + 0E0 makes MySQL send doubles, which
+    pymysql converts much faster than DECIMALs.
+    """
+    policy = _check_policy(policy)
+    if policy == 'all':
+        raise ValueError("The results matrix holds one attempt per quiz; use the 'latest' or 'best' policy")
+    quizzes = ", ".join(str(int(q)) for q in quiz_ids)
+    return (f"SELECT qa.userid, qa.quiz, qa.sumgrades + 0E0, q.sumgrades + 0E0 "
+            f"FROM {picked_attempts_sql(f'quiz IN ({quizzes})', policy)} JOIN mdl_quiz q ON qa.quiz = q.id "
+            f"WHERE qa.pick = 1 AND q.course = %s")
+
+
+def name_match_clause(names: List[str], alias: str = '') -> Tuple[str, List]:
+    """
+    WHERE fragment and params matching CONCAT(firstname, ' ', lastname)
+    against full names.
+
+    The CONCAT can't use an index, so lastname is first narrowed to every
+    possible surname of each name (the text after any of its spaces), which
+    range-scans mdl_user's lastname index; the CONCAT then keeps exact matches.
+    """
+    col = f"{alias}." if alias else ''
+    names = list(dict.fromkeys(names))
+    surnames = list(dict.fromkeys(name[i + 1:] for name in names for i, ch in enumerate(name) if ch == ' '))
+    if not surnames:
+        # "first last" always contains a space
+        return "1 = 0", []
+    return (f"{col}lastname IN ({', '.join(['%s'] * len(surnames))}) "
+            f"AND CONCAT({col}firstname, ' ', {col}lastname) IN ({', '.join(['%s'] * len(names))})",
+            surnames + names)
+
 
 class DatabaseManager:
     """Manages database connections and queries"""
+
+    # Maximum number of values bound into a single IN (...) clause
+    BULK_CHUNK_SIZE = 500
     
     def __init__(self):
-        self.connection = None
-        self.config = {
-            "host": config.DB_HOST,
-            "user": config.DB_USER,
-            "password": config.DB_PASSWORD,
-            "database": config.DB_NAME,
-            "port": config.DB_PORT,
-            "cursorclass": pymysql.cursors.DictCursor
-        }
+        self.pool = pool
     
     def get_connection(self):
-        # Always create a fresh connection to avoid stale connection issues
-        try:
-            if self.connection:
-                self.connection.ping(reconnect=True)
-        except:
-            self.connection = None
-
-        if not self.connection:
-            self.connection = pymysql.connect(**self.config)
-        return self.connection
+        # Pooled connections are health-checked on checkout, so stale sockets are replaced
+        return self.pool.get_connection()
     
     def test_connection(self) -> bool:
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cur:
+            with self.get_connection() as conn, conn.cursor() as cur:
                 cur.execute("SELECT 1")
             print("[OK] Database connected")
             return True
@@ -43,20 +124,42 @@ class DatabaseManager:
             print(f"[X] Database connection failed: {e}")
             return False
     
-    def fetch_learner_by_name(self, learner_name: str) -> Optional[Dict]:
+    def fetch_learner_by_id(self, user_id: int) -> Optional[Dict]:
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cur:
-                cur.execute("SELECT id, firstname, lastname, email FROM mdl_user WHERE CONCAT(firstname, ' ', lastname) = %s LIMIT 1", (learner_name,))
+            with self.get_connection() as conn, conn.cursor() as cur:
+                cur.execute(LEARNER_BY_ID_SQL, (user_id,))
                 return cur.fetchone()
         except Exception as e:
             print(f"[X] Error fetching learner: {e}")
             return None
+
+    def resolve_learner_id(self, learner_name: str) -> Optional[int]:
+        """
+        Moodle user ID for a full name, cached so each name is looked up once.
+        Duplicate names resolve to the lowest user ID; unknown names aren't cached.
+        """
+        if not learner_name:
+            return None
+        return learner_id_cache.get_or_load(learner_name, lambda: self._lookup_learner_id(learner_name))
+
+    def _lookup_learner_id(self, learner_name: str) -> Optional[int]:
+        clause, params = name_match_clause([learner_name])
+        try:
+            with self.get_connection() as conn, conn.cursor() as cur:
+                cur.execute(LEARNER_ID_BY_NAME_SQL.format(clause=clause), params)
+                row = cur.fetchone()
+                return row["id"] if row else None
+        except Exception as e:
+            print(f"[X] Error resolving learner: {e}")
+            return None
+
+    def fetch_learner_by_name(self, learner_name: str) -> Optional[Dict]:
+        user_id = self.resolve_learner_id(learner_name)
+        return self.fetch_learner_by_id(user_id) if user_id else None
     
     def fetch_user_info_data(self, user_id: int) -> Dict[str, str]:
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cur:
+            with self.get_connection() as conn, conn.cursor() as cur:
                 cur.execute("SELECT fid.id AS field_id, fid.name AS fieldname, ud.data FROM mdl_user_info_data ud JOIN mdl_user_info_field fid ON ud.fieldid = fid.id WHERE ud.userid = %s", (user_id,))
                 rows = cur.fetchall()
                 return {r["fieldname"]: r["data"] for r in rows} if rows else {}
@@ -64,20 +167,20 @@ class DatabaseManager:
             print(f"[X] Error fetching user info: {e}")
             return {}
     
+    @metadata_cache.cached('employer_fields')
     def fetch_employer_fields(self) -> List[Dict]:
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cur:
+            with self.get_connection() as conn, conn.cursor() as cur:
                 cur.execute("SELECT id, name FROM mdl_user_info_field WHERE categoryid = 5")
                 return cur.fetchall()
         except Exception as e:
             print(f"[X] Error fetching employer fields: {e}")
             return []
     
+    @metadata_cache.cached('provider_data')
     def fetch_provider_data(self) -> Dict[str, str]:
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cur:
+            with self.get_connection() as conn, conn.cursor() as cur:
                 cur.execute("SELECT fid.name AS fieldname, ud.data FROM mdl_user_info_data ud JOIN mdl_user_info_field fid ON ud.fieldid = fid.id WHERE fid.categoryid = 6 AND COALESCE(ud.data, '') <> '' ORDER BY ud.userid, fid.id LIMIT 500")
                 rows = cur.fetchall()
                 provider_info = {}
@@ -91,37 +194,44 @@ class DatabaseManager:
             print(f"[X] Error fetching provider data: {e}")
             return {}
     
+    @metadata_cache.cached('section_modules')
     def fetch_section_modules(self):
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cur:
+            with self.get_connection() as conn, conn.cursor() as cur:
                 cur.execute("SELECT cm.id as coursemoduleid, cm.section as sectionid, cm.instance as moduleinstance, m.name as modulename, cs.section as sectionnumber, cs.name as sectionname FROM mdl_course_modules cm JOIN mdl_modules m ON cm.module = m.id JOIN mdl_course_sections cs ON cm.section = cs.id WHERE cs.course = 8 AND m.name = 'quiz' AND cm.instance IN (12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23) ORDER BY cs.section, cm.id")
                 return cur.fetchall()
         except Exception as e:
             print(f"[X] Error fetching section modules: {e}")
             return []
     
-    def fetch_results(self, learner_name: str):
+    def fetch_results_by_id(self, user_id: int, policy: str = None):
         try:
-            conn = self.get_connection()
-            with conn.cursor() as cur:
-                cur.execute("SELECT CONCAT(u.firstname, ' ', u.lastname) AS learner_name, q.id AS quiz_id, q.name AS topic_name, qa.sumgrades AS learner_score, q.sumgrades AS total_marks FROM mdl_quiz_attempts qa JOIN mdl_user u ON qa.userid = u.id JOIN mdl_quiz q ON qa.quiz = q.id WHERE CONCAT(u.firstname, ' ', u.lastname) = %s AND qa.quiz IN (12, 13, 14, 15, 16, 17, 18, 19, 20, 21, 22, 23)", (learner_name,))
+            with self.get_connection() as conn, conn.cursor() as cur:
+                cur.execute(results_sql("userid = %s", policy), (user_id,))
                 return cur.fetchall()
         except Exception as e:
             print(f"[X] Error fetching results: {e}")
             return []
-    
+
+    def fetch_results(self, learner_name: str, policy: str = None):
+        user_id = self.resolve_learner_id(learner_name)
+        return self.fetch_results_by_id(user_id, policy) if user_id else []
+
     def fetch_all_learner_data(self, learner_name: str) -> Optional[Dict]:
-        learner = self.fetch_learner_by_name(learner_name)
+        user_id = self.resolve_learner_id(learner_name)
+        return self.fetch_all_learner_data_by_id(user_id) if user_id else None
+
+    def fetch_all_learner_data_by_id(self, user_id: int) -> Optional[Dict]:
+        """Everything the SOR needs for one learner, fetched by Moodle user ID"""
+        learner = self.fetch_learner_by_id(user_id)
         if not learner:
             return None
-        user_id = learner["id"]
         profile = self.fetch_user_info_data(user_id)
         emp_fields = self.fetch_employer_fields()
         provider_info = self.fetch_provider_data()
         section_modules = self.fetch_section_modules()
         quiz_section_map = {m['moduleinstance']: {'section_number': m['sectionnumber'], 'section_name': m['sectionname']} for m in section_modules}
-        results = self.fetch_results(learner_name)
+        results = self.fetch_results_by_id(user_id)
         return {
             'learner': learner,
             'profile': profile,
@@ -132,5 +242,175 @@ class DatabaseManager:
             'emp_fields': emp_fields
         }
 
+    # ===== Cohort (bulk) fetches =====
+
+    def _chunks(self, values: List) -> Iterable[List]:
+        for i in range(0, len(values), self.BULK_CHUNK_SIZE):
+            yield values[i:i + self.BULK_CHUNK_SIZE]
+
+    def fetch_learners_by_names(self, learner_names: List[str]) -> Dict[str, Dict]:
+        """Resolve many learner names in one query per chunk, keyed by full name"""
+        learners = {}
+        names = list(dict.fromkeys(n for n in learner_names if n))
+        try:
+            with self.get_connection() as conn, conn.cursor() as cur:
+                for chunk in self._chunks(names):
+                    clause, params = name_match_clause(chunk)
+                    cur.execute(f"SELECT id, firstname, lastname, email, CONCAT(firstname, ' ', lastname) AS fullname FROM mdl_user WHERE {clause} ORDER BY id", params)
+                    for row in cur.fetchall():
+                        fullname = row.pop("fullname")
+                        learners.setdefault(fullname, row)
+            for fullname, row in learners.items():
+                learner_id_cache.set(fullname, row["id"])
+        except Exception as e:
+            print(f"[X] Error fetching learners: {e}")
+        return learners
+
+    def fetch_learners_by_ids(self, user_ids: List[int]) -> Dict[int, Dict]:
+        """Fetch many learners by user ID, keyed by ID"""
+        learners = {}
+        ids = list(dict.fromkeys(int(i) for i in user_ids if i))
+        try:
+            with self.get_connection() as conn, conn.cursor() as cur:
+                for chunk in self._chunks(ids):
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cur.execute(f"SELECT id, firstname, lastname, email FROM mdl_user WHERE id IN ({placeholders})", chunk)
+                    for row in cur.fetchall():
+                        learners[row["id"]] = row
+        except Exception as e:
+            print(f"[X] Error fetching learners: {e}")
+        return learners
+
+    def fetch_user_info_data_bulk(self, user_ids: List[int]) -> Dict[int, Dict[str, str]]:
+        """Profile fields for many users, keyed by user ID"""
+        profiles = {uid: {} for uid in user_ids}
+        try:
+            with self.get_connection() as conn, conn.cursor() as cur:
+                for chunk in self._chunks(list(profiles)):
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cur.execute(f"SELECT ud.userid, fid.name AS fieldname, ud.data FROM mdl_user_info_data ud JOIN mdl_user_info_field fid ON ud.fieldid = fid.id WHERE ud.userid IN ({placeholders})", chunk)
+                    for r in cur.fetchall():
+                        profiles[r["userid"]][r["fieldname"]] = r["data"]
+        except Exception as e:
+            print(f"[X] Error fetching user info: {e}")
+        return profiles
+
+    def fetch_results_bulk(self, user_ids: List[int], policy: str = None) -> Dict[int, List[Dict]]:
+        """
+        Quiz attempts for many users, keyed by user ID (rows shaped like
+        fetch_results); the attempt policy is applied cohort-wide in one
+        statement per chunk
+        """
+        results = {uid: [] for uid in user_ids}
+        try:
+            with self.get_connection() as conn, conn.cursor() as cur:
+                for chunk in self._chunks(list(results)):
+                    placeholders = ", ".join(["%s"] * len(chunk))
+                    cur.execute(results_sql(f"userid IN ({placeholders})", policy, with_userid=True), chunk)
+                    for r in cur.fetchall():
+                        results[r.pop("userid")].append(r)
+        except Exception as e:
+            print(f"[X] Error fetching results: {e}")
+        return results
+
+    def fetch_results_by_names(self, learner_names: List[str], policy: str = None) -> Dict[str, List[Dict]]:
+        """
+        Quiz attempts for many learners, keyed by full name: names resolve to
+        user IDs (fetch_learners_by_names), then fetch_results_bulk. Learners
+        with no attempts map to an empty list; unknown names are left out.
+        Duplicate names resolve to the lowest user ID.
+        """
+        learners = self.fetch_learners_by_names(learner_names)
+        by_id = self.fetch_results_bulk(list(dict.fromkeys(l["id"] for l in learners.values())), policy)
+        return {name: by_id.get(learner["id"], []) for name, learner in learners.items()}
+
+    def fetch_all_learner_data_bulk(self, names_or_ids: List[Union[str, int]]) -> Dict[Union[str, int], Dict]:
+        """
+        Cohort version of fetch_all_learner_data.
+
+        Accepts learner names and/or Moodle user IDs and returns a dict keyed by
+        the value passed in, each entry shaped exactly like fetch_all_learner_data.
+        Shared lookups run once; profiles and results use IN (...) queries.
+        Learners that cannot be found are omitted.
+        """
+        names = [k for k in names_or_ids if isinstance(k, str)]
+        ids = [k for k in names_or_ids if not isinstance(k, str)]
+
+        learners_by_key = {}
+        learners_by_key.update(self.fetch_learners_by_names(names))
+        learners_by_key.update(self.fetch_learners_by_ids(ids))
+        if not learners_by_key:
+            return {}
+
+        user_ids = list(dict.fromkeys(l["id"] for l in learners_by_key.values()))
+        profiles = self.fetch_user_info_data_bulk(user_ids)
+        results = self.fetch_results_bulk(user_ids)
+
+        emp_fields = self.fetch_employer_fields()
+        provider_info = self.fetch_provider_data()
+        section_modules = self.fetch_section_modules()
+        quiz_section_map = {m['moduleinstance']: {'section_number': m['sectionnumber'], 'section_name': m['sectionname']} for m in section_modules}
+
+        cohort = {}
+        for key, learner in learners_by_key.items():
+            user_id = learner["id"]
+            cohort[key] = {
+                'learner': learner,
+                'profile': profiles.get(user_id, {}),
+                'provider_info': provider_info,
+                'section_1_name': "Knowledge Modules",
+                'quiz_section_map': quiz_section_map,
+                'results': results.get(user_id, []),
+                'emp_fields': emp_fields
+            }
+        return cohort
+
+    def fetch_course_learner_ids(self, course_id: int = None) -> List[int]:
+        """Users with at least one finished attempt at the course's SOR quizzes, by ID"""
+        course_id = config.COURSE_ID if course_id is None else course_id
+        try:
+            with self.get_connection() as conn, conn.cursor() as cur:
+                cur.execute(f"SELECT DISTINCT qa.userid FROM mdl_quiz_attempts qa JOIN mdl_quiz q ON qa.quiz = q.id "
+                            f"WHERE qa.quiz IN ({SOR_QUIZ_IDS}) AND qa.state = 'finished' AND qa.preview = 0 "
+                            f"AND q.course = %s ORDER BY qa.userid", (course_id,))
+                return [row["userid"] for row in cur.fetchall()]
+        except Exception as e:
+            print(f"[X] Error fetching course learners: {e}")
+            return []
+
+    # ===== Cohort results matrix =====
+
+    # Rows pulled per round trip while streaming the matrix query
+    MATRIX_FETCH_SIZE = 10000
+
+    def load_results_matrix(self, course_id: int = None, policy: str = None):
+        """
+        Every learner's counted attempts in a course as a scoring.ResultsMatrix
+        (learners x QUIZ_WEIGHTS quizzes, float32 scores and totals plus index
+        maps), for reporting and mass re-scoring without per-learner fetches.
+
+        The query runs on an unbuffered SSCursor, so rows are packed into the
+        matrix as they arrive instead of being materialised as dicts first.
+        policy is 'latest' or 'best' (default RESULTS_ATTEMPT_POLICY).
+        """
+        from .scoring import build_results_matrix
+
+        course_id = config.COURSE_ID if course_id is None else course_id
+        quiz_ids = list(config.QUIZ_WEIGHTS)
+        sql = results_matrix_sql(quiz_ids, policy)
+
+        def stream(cur):
+            while True:
+                rows = cur.fetchmany(self.MATRIX_FETCH_SIZE)
+                if not rows:
+                    return
+                yield from rows
+
+        with self.get_connection() as conn:
+            # Closing the cursor drains any unread rows, so the connection goes back to the pool clean
+            with conn.cursor(pymysql.cursors.SSCursor) as cur:
+                cur.execute(sql, (course_id,))
+                return build_results_matrix(stream(cur), quiz_ids)
+
 # Create database manager instance
 db = DatabaseManager()
\ No newline at end of file
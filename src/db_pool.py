@@ -0,0 +1,212 @@
+"""
+Database connection pool for SOR Automation System
+Shares a bounded set of pymysql connections between DatabaseManager,
+DashboardDB and the Moodle upload helpers
+"""
+from collections import deque
+from contextlib import contextmanager
+from typing import Dict, Optional
+import threading
+import time
+import pymysql
+from .config import config
+
+
+class PoolTimeoutError(Exception):
+    """Raised when no connection becomes available within the checkout timeout"""
+
+
+class PooledConnection:
+    """
+    Thin proxy around a pymysql connection checked out of the pool.
+
+    Behaves like the underlying connection, except that close() hands the
+    connection back to the pool instead of tearing down the socket, so the
+    existing ``conn = get_connection() ... finally: conn.close()`` pattern
+    keeps working unchanged.
+    """
+
+    def __init__(self, pool: "ConnectionPool", raw):
+        self._pool = pool
+        self._raw = raw
+
+    def __getattr__(self, name):
+        if self._raw is None:
+            raise pymysql.err.InterfaceError("Connection already returned to pool")
+        return getattr(self._raw, name)
+
+    def close(self):
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw)
+
+    def discard(self):
+        """Drop the underlying connection instead of returning it (e.g. after a fatal error)"""
+        if self._raw is not None:
+            raw, self._raw = self._raw, None
+            self._pool._release(raw, discard=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def __del__(self):
+        try:
+            self.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """Thread-safe bounded pool of pymysql connections"""
+
+    def __init__(self, connect_kwargs: Dict, max_size: int = 10, max_idle_seconds: int = 300,
+                 checkout_timeout: float = 10, health_check_interval: int = 30):
+        self.connect_kwargs = connect_kwargs
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.checkout_timeout = checkout_timeout
+        self.health_check_interval = health_check_interval
+
+        self._idle = deque()  # (raw connection, last returned timestamp)
+        self._open = 0
+        self._cond = threading.Condition()
+        self.stats = {
+            'created': 0,
+            'reused': 0,
+            'evicted': 0,
+            'health_check_failed': 0,
+            'checkouts': 0,
+            'timeouts': 0,
+        }
+
+    def _connect(self):
+        raw = pymysql.connect(**self.connect_kwargs)
+        with self._cond:
+            self.stats['created'] += 1
+        return raw
+
+    def _close_raw(self, raw):
+        try:
+            raw.close()
+        except Exception:
+            pass
+
+    def _evict_idle(self, now: float):
+        """Close connections that have sat idle longer than max_idle_seconds (lock held)"""
+        while self._idle and now - self._idle[0][1] > self.max_idle_seconds:
+            raw, _ = self._idle.popleft()
+            self._open -= 1
+            self.stats['evicted'] += 1
+            self._close_raw(raw)
+
+    def _is_healthy(self, raw, idle_for: float) -> bool:
+        if idle_for < self.health_check_interval:
+            return True
+        try:
+            raw.ping(reconnect=False)
+            return True
+        except Exception:
+            with self._cond:
+                self.stats['health_check_failed'] += 1
+            return False
+
+    def get_connection(self, timeout: Optional[float] = None) -> PooledConnection:
+        """Check out a connection, waiting up to ``timeout`` seconds for a free slot"""
+        timeout = self.checkout_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+
+        while True:
+            raw = None
+            idle_for = 0.0
+            with self._cond:
+                while True:
+                    now = time.time()
+                    self._evict_idle(now)
+                    if self._idle:
+                        # Most recently returned first: it is the least likely to be stale
+                        raw, returned_at = self._idle.pop()
+                        idle_for = now - returned_at
+                        break
+                    if self._open < self.max_size:
+                        self._open += 1
+                        break
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['timeouts'] += 1
+                        raise PoolTimeoutError(f"No database connection available within {timeout}s (pool size {self.max_size})")
+                    self._cond.wait(remaining)
+                self.stats['checkouts'] += 1
+
+            if raw is not None:
+                if self._is_healthy(raw, idle_for):
+                    with self._cond:
+                        self.stats['reused'] += 1
+                    return PooledConnection(self, raw)
+                self._release(raw, discard=True)
+                continue
+
+            # A slot was reserved above; open the socket outside the lock
+            try:
+                return PooledConnection(self, self._connect())
+            except Exception:
+                with self._cond:
+                    self._open -= 1
+                    self._cond.notify()
+                raise
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """Context manager form of get_connection()"""
+        conn = self.get_connection(timeout)
+        try:
+            yield conn
+        finally:
+            conn.close()
+
+    def _release(self, raw, discard: bool = False):
+        if not discard:
+            # End any open transaction so the next borrower gets a fresh snapshot
+            try:
+                raw.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or not getattr(raw, 'open', True):
+                self._open -= 1
+                self._close_raw(raw)
+            else:
+                self._idle.append((raw, time.time()))
+            self._cond.notify()
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones close on return)"""
+        with self._cond:
+            while self._idle:
+                raw, _ = self._idle.popleft()
+                self._open -= 1
+                self._close_raw(raw)
+            self._cond.notify_all()
+
+    def get_stats(self) -> Dict:
+        with self._cond:
+            return dict(self.stats, open=self._open, idle=len(self._idle), max_size=self.max_size)
+
+
+# Create shared connection pool instance
+pool = ConnectionPool(
+    {
+        "host": config.DB_HOST,
+        "user": config.DB_USER,
+        "password": config.DB_PASSWORD,
+        "database": config.DB_NAME,
+        "port": config.DB_PORT,
+        "cursorclass": pymysql.cursors.DictCursor
+    },
+    max_size=config.DB_POOL_SIZE,
+    max_idle_seconds=config.DB_POOL_MAX_IDLE_SECONDS,
+    checkout_timeout=config.DB_POOL_TIMEOUT_SECONDS,
+)
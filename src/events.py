@@ -0,0 +1,234 @@
+"""
+Events module for SOR Automation System
+In-process fan-out hub for live request updates: one watcher thread reads
+the sor_requests change feed and pushes status transitions and stat deltas
+to every connected Server-Sent Events client
+"""
+from collections import OrderedDict, deque
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Dict, List, Optional, Tuple
+import json
+import queue
+import threading
+import time
+from .config import config
+
+# Most recent events kept for clients reconnecting with Last-Event-ID
+EVENT_HISTORY = 500
+# Events a client may fall behind by before it is told to resync
+SUBSCRIBER_QUEUE_SIZE = 1000
+# Request statuses remembered so transitions can report the previous status
+MAX_TRACKED_REQUESTS = 10000
+
+
+def _json_default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def format_event(event: str, data: Dict, event_id: str = None) -> str:
+    """One SSE frame; data is serialised once here and shared by every subscriber"""
+    frame = f"id: {event_id}\n" if event_id else ''
+    return frame + f"event: {event}\ndata: {json.dumps(data, default=_json_default)}\n\n"
+
+
+class Subscription:
+    """One connected client: a bounded queue of frames plus a lagged flag"""
+
+    def __init__(self, maxsize: int = SUBSCRIBER_QUEUE_SIZE):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+        self.lagged = False
+
+    def put(self, frame: str):
+        try:
+            self.queue.put_nowait(frame)
+        except queue.Full:
+            # A stalled tab mustn't hold up the others; it reloads once it catches up
+            self.lagged = True
+
+    def get(self, timeout: float) -> Optional[str]:
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class EventHub:
+    """
+    Fans request updates out to subscribers. The watcher thread starts with
+    the first subscriber and stops poll_seconds * idle_polls after the last
+    one leaves, so N browser tabs cost one change-feed query per poll, not N.
+
+    Events:
+      status  - a request changed status: {'request': row, 'previous_status': ...}
+      request - a request changed without a status change: {'request': row}
+      stats   - dashboard counts after a transition: {'stats': {...}, 'delta': {...}}
+      resync  - the client missed events and should reload
+    """
+
+    def __init__(self, dashboard_db=None, poll_seconds: float = 2.0, idle_polls: int = 15,
+                 history: int = EVENT_HISTORY):
+        self.dashboard_db = dashboard_db
+        self.poll_seconds = poll_seconds
+        self.idle_polls = idle_polls
+        self._subscribers: List[Subscription] = []
+        self._lock = threading.Lock()
+        self._history: deque = deque(maxlen=history)
+        # Event ids are "<boot>-<seq>" so a client reconnecting after an API restart resyncs
+        self._boot = str(int(time.time()))
+        self._seq = 0
+        self._seen: "OrderedDict[int, Tuple[str, datetime]]" = OrderedDict()
+        self._stats: Optional[Dict] = None
+        self._watermark = None
+        self._thread = None
+        self.stats = {'polls': 0, 'published': 0, 'lagged': 0, 'subscribers_total': 0}
+
+    def _get_db(self):
+        if self.dashboard_db is None:
+            from .dashboard_db import dashboard_db
+            self.dashboard_db = dashboard_db
+        return self.dashboard_db
+
+    # ===== Subscribers =====
+
+    def subscribe(self, last_event_id: str = None) -> Subscription:
+        """Register a client; with last_event_id, events it missed are queued first"""
+        sub = Subscription()
+        with self._lock:
+            if last_event_id:
+                missed = self._since(last_event_id)
+                if missed is None:
+                    sub.put(format_event('resync', {'reason': 'missed events'}))
+                else:
+                    for frame in missed:
+                        sub.put(frame)
+            if self._stats is not None:
+                sub.put(format_event('stats', {'stats': self._stats, 'delta': {}}))
+            self._subscribers.append(sub)
+            self.stats['subscribers_total'] += 1
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='event-hub', daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def _since(self, last_event_id: str) -> Optional[List[str]]:
+        """Frames after last_event_id, or None if they're no longer in the history"""
+        boot, _, seq = last_event_id.partition('-')
+        if boot != self._boot or not seq.isdigit():
+            return None
+        seq = int(seq)
+        if seq >= self._seq:
+            return []
+        if not self._history or self._history[0][0] > seq + 1:
+            return None
+        return [frame for event_seq, frame in self._history if event_seq > seq]
+
+    def publish(self, event: str, data: Dict) -> str:
+        """Queue an event for every subscriber; returns its id"""
+        with self._lock:
+            self._seq += 1
+            event_id = f"{self._boot}-{self._seq}"
+            frame = format_event(event, data, event_id)
+            self._history.append((self._seq, frame))
+            for sub in self._subscribers:
+                was_lagged = sub.lagged
+                sub.put(frame)
+                if sub.lagged and not was_lagged:
+                    self.stats['lagged'] += 1
+            self.stats['published'] += 1
+        return event_id
+
+    # ===== Watcher =====
+
+    def _run(self):
+        idle = 0
+        db = self._get_db()
+        try:
+            # Prime statuses, stats and the watermark without publishing: clients load
+            # the current state over REST when they connect
+            self._watermark = db.change_watermark()
+            self.poll(publish=False)
+            self._stats = db.get_dashboard_stats()
+        except Exception as e:
+            print(f"❌ Error starting event watcher: {e}")
+
+        while True:
+            time.sleep(self.poll_seconds)
+            with self._lock:
+                if not self._subscribers:
+                    idle += 1
+                    if idle >= self.idle_polls:
+                        self._thread = None
+                        return
+                    continue
+            idle = 0
+            try:
+                self.poll()
+            except Exception as e:
+                print(f"❌ Error polling request changes: {e}")
+
+    def poll(self, publish: bool = True) -> int:
+        """Read the change feed once and publish what changed; returns the number of events"""
+        db = self._get_db()
+        since, last_id = self._watermark or db.change_watermark()
+        published = 0
+        transitioned = False
+        has_more = True
+        while has_more:
+            rows, self._watermark, has_more = db.get_changes_since(since, last_id)
+            since, last_id = self._watermark
+            for row in rows:
+                previous = self._seen.get(row['id'])
+                # The settle window hands back recent rows on every poll; only new versions count
+                if previous is not None and previous[1] == row['updated_at']:
+                    continue
+                self._remember(row)
+                if not publish:
+                    continue
+                previous_status = previous[0] if previous else None
+                if previous_status != row['status']:
+                    self.publish('status', {'request': row, 'previous_status': previous_status})
+                    transitioned = True
+                else:
+                    self.publish('request', {'request': row})
+                published += 1
+        self.stats['polls'] += 1
+
+        if transitioned:
+            stats = db.get_dashboard_stats()
+            old = self._stats or {}
+            delta = {key: value - old.get(key, 0) for key, value in stats.items() if value != old.get(key, 0)}
+            self._stats = stats
+            if delta:
+                self.publish('stats', {'stats': stats, 'delta': delta})
+                published += 1
+        return published
+
+    def _remember(self, row: Dict):
+        self._seen[row['id']] = (row['status'], row['updated_at'])
+        self._seen.move_to_end(row['id'])
+        while len(self._seen) > MAX_TRACKED_REQUESTS:
+            self._seen.popitem(last=False)
+
+    def get_stats(self) -> Dict:
+        with self._lock:
+            return {
+                **self.stats,
+                'subscribers': len(self._subscribers),
+                'watching': self._thread is not None and self._thread.is_alive(),
+                'last_event_id': f"{self._boot}-{self._seq}" if self._seq else None,
+                'poll_seconds': self.poll_seconds,
+            }
+
+
+# Create shared event hub instance
+event_hub = EventHub(poll_seconds=config.EVENTS_POLL_SECONDS)
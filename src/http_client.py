@@ -0,0 +1,93 @@
+"""
+HTTP client module for SOR Automation System
+Shared keep-alive HTTP client for Moodle and Dropbox Sign calls
+"""
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+import random
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from .config import config
+
+# Responses worth retrying: throttling and transient gateway errors
+RETRY_STATUSES = {429, 502, 503, 504}
+IDEMPOTENT_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+def backoff_delay(attempt: int, base: float = None, cap: float = 30.0) -> float:
+    """Full-jitter exponential backoff for the given (0-based) retry attempt"""
+    base = config.HTTP_BACKOFF_SECONDS if base is None else base
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+def _host_of(url: str) -> str:
+    return urlsplit(url).netloc
+
+
+class HttpClient:
+    """
+    Thread-safe synchronous client on a pooled requests.Session.
+
+    Connections are kept alive per host, each host is limited to
+    ``max_per_host`` in-flight requests, every call gets a default timeout,
+    and retryable failures back off with jitter. Only idempotent methods are
+    retried unless the caller passes ``retries`` explicitly.
+    """
+
+    def __init__(self, timeout: float = None, max_retries: int = None, max_per_host: int = None):
+        self.timeout = config.HTTP_TIMEOUT_SECONDS if timeout is None else timeout
+        self.max_retries = config.HTTP_MAX_RETRIES if max_retries is None else max_retries
+        self.max_per_host = config.HTTP_MAX_PER_HOST if max_per_host is None else max_per_host
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=self.max_per_host)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self._host_limits: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _host_limit(self, url: str) -> threading.BoundedSemaphore:
+        host = _host_of(url)
+        with self._lock:
+            if host not in self._host_limits:
+                self._host_limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._host_limits[host]
+
+    def request(self, method: str, url: str, retries: Optional[int] = None, **kwargs) -> requests.Response:
+        """Send a request; raises the last error once retries are exhausted"""
+        method = method.upper()
+        if retries is None:
+            retries = self.max_retries if method in IDEMPOTENT_METHODS else 0
+        kwargs.setdefault('timeout', self.timeout)
+
+        attempt = 0
+        while True:
+            try:
+                with self._host_limit(url):
+                    response = self.session.request(method, url, **kwargs)
+                if response.status_code not in RETRY_STATUSES or attempt >= retries:
+                    return response
+                retry_after = response.headers.get('Retry-After', '')
+                delay = float(retry_after) if retry_after.isdigit() else backoff_delay(attempt)
+            except (requests.ConnectionError, requests.Timeout):
+                if attempt >= retries:
+                    raise
+                delay = backoff_delay(attempt)
+            attempt += 1
+            time.sleep(delay)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url: str, **kwargs) -> requests.Response:
+        return self.request('POST', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+
+# Create shared HTTP client instance
+http_client = HttpClient()
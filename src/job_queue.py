@@ -0,0 +1,183 @@
+"""
+Job queue module for SOR Automation System
+Durable MySQL-backed queue (sor_jobs) for work the API hands off to the
+background worker (python -m src.worker)
+"""
+from typing import Dict, List, Optional
+import json
+from .config import config
+from .db_pool import pool
+
+# Job lifecycle: queued -> running -> succeeded, or back to queued for a
+# retry, or dead once max_attempts is exhausted
+JOB_QUEUED = 'queued'
+JOB_RUNNING = 'running'
+JOB_SUCCEEDED = 'succeeded'
+JOB_DEAD = 'dead'
+
+
+class PermanentJobError(Exception):
+    """Raised by a job handler for failures a retry can't fix (job goes straight to dead)"""
+
+
+def _decode(job: Optional[Dict]) -> Optional[Dict]:
+    if job:
+        for key in ('payload', 'result'):
+            if job.get(key):
+                job[key] = json.loads(job[key])
+    return job
+
+
+class JobQueue:
+    """
+    Jobs live in sor_jobs. Workers claim the oldest runnable job with
+    SELECT ... FOR UPDATE SKIP LOCKED (MySQL 8.0+), so concurrent workers
+    never block on or double-claim a row. A claim holds a lease that the
+    worker extends while it runs; jobs whose lease lapses (crashed worker)
+    are put back on the queue by requeue_expired.
+    """
+
+    def __init__(self):
+        self.pool = pool
+
+    def enqueue(self, job_type: str, payload: Dict = None, sor_request_id: int = None,
+                max_attempts: int = None, delay_seconds: int = 0) -> Optional[int]:
+        """Queue a job and return its id"""
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute("""INSERT INTO sor_jobs (job_type, sor_request_id, payload, max_attempts, run_after)
+                              VALUES (%s, %s, %s, %s, DATE_ADD(NOW(), INTERVAL %s SECOND))""",
+                            (job_type, sor_request_id, json.dumps(payload or {}),
+                             max_attempts or config.JOB_MAX_ATTEMPTS, delay_seconds))
+                conn.commit()
+                return cur.lastrowid
+        except Exception as e:
+            print(f"❌ Error enqueueing {job_type} job: {e}")
+            return None
+
+    def claim(self, worker_id: str, lease_seconds: int = None) -> Optional[Dict]:
+        """Claim the oldest runnable job for this worker, or None when the queue is empty"""
+        lease_seconds = lease_seconds or config.JOB_LEASE_SECONDS
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("""SELECT id FROM sor_jobs
+                          WHERE status = 'queued' AND run_after <= NOW()
+                          ORDER BY run_after, id LIMIT 1
+                          FOR UPDATE SKIP LOCKED""")
+            row = cur.fetchone()
+            if not row:
+                conn.rollback()
+                return None
+            cur.execute("""UPDATE sor_jobs
+                          SET status = 'running', attempts = attempts + 1, locked_by = %s,
+                              lease_expires_at = DATE_ADD(NOW(), INTERVAL %s SECOND),
+                              started_at = COALESCE(started_at, NOW())
+                          WHERE id = %s""", (worker_id, lease_seconds, row['id']))
+            cur.execute("SELECT * FROM sor_jobs WHERE id = %s", (row['id'],))
+            job = cur.fetchone()
+            conn.commit()
+            return _decode(job)
+
+    def heartbeat(self, job_id: int, worker_id: str, progress: str = None, lease_seconds: int = None) -> bool:
+        """Extend the lease (and optionally record progress); False if the job is no longer ours"""
+        lease_seconds = lease_seconds or config.JOB_LEASE_SECONDS
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("""UPDATE sor_jobs
+                          SET lease_expires_at = DATE_ADD(NOW(), INTERVAL %s SECOND),
+                              progress = COALESCE(%s, progress)
+                          WHERE id = %s AND status = 'running' AND locked_by = %s""",
+                        (lease_seconds, progress, job_id, worker_id))
+            conn.commit()
+            return cur.rowcount == 1
+
+    def complete(self, job_id: int, worker_id: str, result: Dict = None) -> bool:
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("""UPDATE sor_jobs
+                          SET status = 'succeeded', result = %s, last_error = NULL,
+                              locked_by = NULL, lease_expires_at = NULL, finished_at = NOW()
+                          WHERE id = %s AND status = 'running' AND locked_by = %s""",
+                        (json.dumps(result if result is not None else {}, default=str), job_id, worker_id))
+            conn.commit()
+            return cur.rowcount == 1
+
+    def fail(self, job_id: int, worker_id: str, error: str, permanent: bool = False) -> Optional[str]:
+        """
+        Record a failed attempt. The job is retried after an exponential
+        backoff, or dead-lettered once attempts reach max_attempts (or at
+        once for permanent errors). Returns the job's new status.
+        """
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT attempts, max_attempts FROM sor_jobs WHERE id = %s AND status = 'running' AND locked_by = %s FOR UPDATE",
+                        (job_id, worker_id))
+            job = cur.fetchone()
+            if not job:
+                conn.rollback()
+                return None
+            if permanent or job['attempts'] >= job['max_attempts']:
+                cur.execute("""UPDATE sor_jobs
+                              SET status = 'dead', last_error = %s, locked_by = NULL,
+                                  lease_expires_at = NULL, finished_at = NOW()
+                              WHERE id = %s""", (error, job_id))
+                status = JOB_DEAD
+            else:
+                delay = config.JOB_RETRY_BACKOFF_SECONDS * (2 ** (job['attempts'] - 1))
+                cur.execute("""UPDATE sor_jobs
+                              SET status = 'queued', last_error = %s, locked_by = NULL, lease_expires_at = NULL,
+                                  run_after = DATE_ADD(NOW(), INTERVAL %s SECOND)
+                              WHERE id = %s""", (error, delay, job_id))
+                status = JOB_QUEUED
+            conn.commit()
+            return status
+
+    def requeue_expired(self) -> int:
+        """Return jobs whose worker stopped heartbeating to the queue (or dead-letter them)"""
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("""UPDATE sor_jobs
+                          SET status = IF(attempts >= max_attempts, 'dead', 'queued'),
+                              finished_at = IF(attempts >= max_attempts, NOW(), NULL),
+                              last_error = CONCAT('Lease expired (worker ', COALESCE(locked_by, '?'), ')'),
+                              locked_by = NULL, lease_expires_at = NULL
+                          WHERE status = 'running' AND lease_expires_at < NOW()""")
+            conn.commit()
+            return cur.rowcount
+
+    def retry(self, job_id: int) -> bool:
+        """Put a dead job back on the queue with a fresh attempt budget"""
+        with self.pool.connection() as conn, conn.cursor() as cur:
+            cur.execute("""UPDATE sor_jobs
+                          SET status = 'queued', attempts = 0, run_after = NOW(), finished_at = NULL
+                          WHERE id = %s AND status = 'dead'""", (job_id,))
+            conn.commit()
+            return cur.rowcount == 1
+
+    def get_job(self, job_id: int) -> Optional[Dict]:
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute("SELECT * FROM sor_jobs WHERE id = %s", (job_id,))
+                return _decode(cur.fetchone())
+        except Exception as e:
+            print(f"❌ Error fetching job {job_id}: {e}")
+            return None
+
+    def list_jobs(self, status: str = None, sor_request_id: int = None, limit: int = 50) -> List[Dict]:
+        where, params = [], []
+        if status:
+            where.append("status = %s")
+            params.append(status)
+        if sor_request_id:
+            where.append("sor_request_id = %s")
+            params.append(sor_request_id)
+        sql = "SELECT * FROM sor_jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT %s"
+        try:
+            with self.pool.connection() as conn, conn.cursor() as cur:
+                cur.execute(sql, params + [limit])
+                return [_decode(job) for job in cur.fetchall()]
+        except Exception as e:
+            print(f"❌ Error listing jobs: {e}")
+            return []
+
+
+# Create shared job queue instance
+job_queue = JobQueue()
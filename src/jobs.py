@@ -0,0 +1,141 @@
+"""
+Job handlers for SOR Automation System
+The work behind the API's action endpoints, run by the background worker.
+Each handler takes (payload, progress) and returns a JSON-serialisable result;
+raise PermanentJobError for failures that retrying can't fix.
+"""
+from typing import Callable, Dict
+from .config import config
+from .dashboard_db import dashboard_db
+from .job_queue import PermanentJobError
+from .pipeline import InvalidTransition, pipeline
+
+HANDLERS: Dict[str, Callable] = {}
+
+
+def job_handler(job_type: str):
+    """Register a function as the handler for a job type"""
+    def decorator(func):
+        HANDLERS[job_type] = func
+        return func
+    return decorator
+
+
+def _get_request(sor_id: int) -> Dict:
+    req = dashboard_db.get_sor_request(sor_id)
+    if not req:
+        raise PermanentJobError(f"Request {sor_id} not found")
+    return req
+
+
+def _run_stages(req: Dict, progress: Callable, stages, message: str, **kwargs) -> Dict:
+    """Run the given pipeline stages; the job fails if the request didn't complete any of them"""
+    progress(message)
+    result = pipeline.run(req, stages=stages, **kwargs)
+    if not result['completed']:
+        # A stage that failed on its own can be retried; a request in the wrong state can't
+        if result['error'] and result['status'] != 'failed':
+            raise Exception(result['error'])
+        raise PermanentJobError(result['error'] or f"Request is {result['status']}; nothing to do")
+    return result
+
+
+@job_handler('request_workflow')
+def run_request_workflow(payload: Dict, progress: Callable) -> Dict:
+    """New request: run the pipeline until it waits on the learner's signature or is uploaded"""
+    progress('Processing request')
+    result = pipeline.run(_get_request(payload['sor_id']))
+    completed = result['completed']
+
+    workflow_status = {
+        'request_created': True,
+        'pdf_generated': 'render' in completed,
+        'signature_sent': 'send_signature' in completed,
+        'uploaded': 'upload' in completed
+    }
+    return {'workflow_status': workflow_status, 'status': result['status'], 'error': result['error']}
+
+
+@job_handler('generate_pdf')
+def generate_pdf(payload: Dict, progress: Callable) -> Dict:
+    req = _get_request(payload['sor_id'])
+    try:
+        pipeline.prepare_rerender(req)
+    except InvalidTransition as e:
+        raise PermanentJobError(str(e))
+    _run_stages(req, progress, ('render',), 'Generating PDF')
+    return {'message': 'PDF generated successfully', 'pdf_path': req['pdf_path']}
+
+
+@job_handler('send_signature')
+def send_signature(payload: Dict, progress: Callable) -> Dict:
+    req = _get_request(payload['sor_id'])
+    _run_stages(req, progress, ('send_signature',), 'Sending for signature', skip_signature=False)
+    return {'message': 'Sent for signature successfully', 'signature_request_id': req['signature_request_id']}
+
+
+@job_handler('upload_moodle')
+def upload_moodle(payload: Dict, progress: Callable) -> Dict:
+    req = _get_request(payload['sor_id'])
+    # From the dashboard an unsigned PDF may be uploaded directly
+    _run_stages(req, progress, ('upload',), 'Uploading to Moodle', skip_signature=True)
+    return {'message': 'Uploaded to Moodle successfully'}
+
+
+@job_handler('complete_signed')
+def complete_signed(payload: Dict, progress: Callable) -> Dict:
+    """Signature callback continuation; download and upload failures (file not ready yet) are retried"""
+    req = _get_request(payload['sor_id'])
+    if req['status'] not in ('signature_sent', 'signed'):
+        return {'message': f"Request already {req['status']}", 'completed': False}
+
+    progress('Downloading signed document')
+    result = pipeline.run(req, stages=('collect_signed', 'upload'), signed=True)
+    if result['error']:
+        raise Exception(result['error'])
+    return {'completed': 'collect_signed' in result['completed'], 'uploaded': result['status'] == 'uploaded', 'error': None}
+
+
+@job_handler('resume_request')
+def resume_request(payload: Dict, progress: Callable) -> Dict:
+    """Put a failed or stuck request back at its last checkpoint and continue from there"""
+    _get_request(payload['sor_id'])
+    progress('Resuming request')
+    result = pipeline.resume(payload['sor_id'])
+    return {'message': f"Request is now {result['status']}", **result}
+
+
+@job_handler('process_pending')
+def process_pending(payload: Dict, progress: Callable) -> Dict:
+    from .main import process_pending_requests
+
+    progress('Processing pending requests')
+    return {'message': 'Processing completed', 'result': process_pending_requests()}
+
+
+@job_handler('check_signatures')
+def check_signatures(payload: Dict, progress: Callable) -> Dict:
+    from .main import check_signature_status
+
+    progress('Checking signatures')
+    result = check_signature_status(min_age_minutes=payload.get('min_age_minutes', 0))
+    return {'message': 'Signature check completed', 'result': result}
+
+
+@job_handler('bulk_sync_grades')
+def bulk_sync_grades(payload: Dict, progress: Callable) -> Dict:
+    from .moodle_service import moodle_service
+
+    requests_data = dashboard_db.get_all_sor_requests(limit=1000)
+    uploaded = [r for r in requests_data if r['status'] == 'uploaded' and r.get('overall_score')]
+    if not uploaded:
+        return {'message': 'No grades to sync', 'synced': 0}
+
+    assignment_info = moodle_service.get_assignment_info(config.ASSIGNMENT_COURSEMODULE_ID)
+    if not assignment_info:
+        raise Exception('Assignment not found')
+
+    progress(f'Syncing {len(uploaded)} grades')
+    grades = [{'userid': r['learner_id'], 'grade': float(r['overall_score'])} for r in uploaded]
+    result = moodle_service.bulk_grade_submissions(assignment_info.get('id'), grades)
+    return {'message': f"Synced {result['success_count']}/{result['total_processed']} grades", 'result': result}
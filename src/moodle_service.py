@@ -2,9 +2,19 @@
 Moodle Service Module for Dashboard
 Handles Moodle API interactions for dashboard
 """
-import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List, Optional
 from .config import config
+from .http_client import http_client
+from .cache import metadata_cache
+
+# Web service functions that only read; only these are retried after a
+# transport error or gateway failure, since a repeated write may not be idempotent
+READ_ONLY_FUNCTIONS = {
+    'core_webservice_get_site_info', 'core_user_get_users', 'core_course_get_contents',
+    'mod_assign_get_assignments', 'mod_assign_get_submissions', 'mod_assign_get_submission_status',
+    'mod_assign_get_grades', 'local_sor_get_grading_status',
+}
 
 class MoodleService:
     """Handles Moodle API calls for dashboard"""
@@ -14,31 +24,37 @@ class MoodleService:
         self.token = config.MOODLE_TOKEN
         self.ws_url = f"{self.base_url}/webservice/rest/server.php"
 
-    def _call_api(self, function: str, params: Dict = None) -> Optional[Dict]:
-        """Make a Moodle web service call"""
-        try:
-            data = {
-                'wstoken': self.token,
-                'wsfunction': function,
-                'moodlewsrestformat': 'json'
-            }
-            if params:
-                data.update(params)
+    def _build_request(self, function: str, params: Dict = None) -> Dict:
+        data = {
+            'wstoken': self.token,
+            'wsfunction': function,
+            'moodlewsrestformat': 'json'
+        }
+        if params:
+            data.update(params)
+        return data
 
-            response = requests.post(self.ws_url, data=data, timeout=30)
+    def _parse_response(self, status_code: int, result, text: str) -> Optional[Dict]:
+        if status_code != 200:
+            print(f"❌ HTTP error {status_code}: {text[:200]}")
+            return None
 
-            if response.status_code == 200:
-                result = response.json()
+        # Check for errors
+        if isinstance(result, dict) and 'exception' in result:
+            print(f"❌ Moodle API error: {result.get('message', 'Unknown error')}")
+            return None
 
-                # Check for errors
-                if isinstance(result, dict) and 'exception' in result:
-                    print(f"❌ Moodle API error: {result.get('message', 'Unknown error')}")
-                    return None
+        return result
 
-                return result
-            else:
-                print(f"❌ HTTP error {response.status_code}: {response.text[:200]}")
-                return None
+    def _call_api(self, function: str, params: Dict = None, retry: bool = None) -> Optional[Dict]:
+        """Make a Moodle web service call (retried on transient failures only if retry, default: read-only functions)"""
+        if retry is None:
+            retry = function in READ_ONLY_FUNCTIONS
+        try:
+            response = http_client.post(self.ws_url, data=self._build_request(function, params),
+                                        retries=config.HTTP_MAX_RETRIES if retry else 0)
+            result = response.json() if response.status_code == 200 else None
+            return self._parse_response(response.status_code, result, response.text)
 
         except Exception as e:
             print(f"❌ Moodle API call failed: {e}")
@@ -46,6 +62,7 @@ class MoodleService:
 
     # ===== Assignment Functions =====
 
+    @metadata_cache.cached('assignment_info')
     def get_assignment_info(self, course_module_id: int) -> Optional[Dict]:
         """Get assignment information"""
         result = self._call_api('mod_assign_get_assignments', {
@@ -239,7 +256,7 @@ class MoodleService:
                 'grade': grade,
                 'feedback': feedback,
                 'attemptnumber': attempt_number
-            })
+            }, retry=False)
 
             if result and 'success' in result:
                 return result
@@ -255,7 +272,7 @@ class MoodleService:
                 'applytoall': 0,
                 'plugindata[assignfeedbackcomments_editor][text]': feedback,
                 'plugindata[assignfeedbackcomments_editor][format]': 1
-            })
+            }, retry=False)
 
             if result is None or (isinstance(result, list) and len(result) == 0):
                 return {
@@ -278,6 +295,10 @@ class MoodleService:
         """
         Grade multiple submissions at once
 
+        Sends chunked batches to the local_sor_bulk_grade_submissions web service.
+        Any chunk the plugin cannot handle (plugin missing, call failed) is graded
+        per user instead, with bounded concurrency.
+
         Args:
             assignment_id: Assignment ID
             grades: List of dicts with 'userid', 'grade', and optional 'feedback'
@@ -285,28 +306,59 @@ class MoodleService:
         Returns:
             Dict with overall success status and individual results
         """
-        results = []
-        success_count = 0
-        fail_count = 0
-
-        for grade_data in grades:
-            result = self.grade_submission(
-                assignment_id,
-                grade_data['userid'],
-                grade_data['grade'],
-                grade_data.get('feedback', '')
-            )
-
-            if result.get('success'):
-                success_count += 1
-            else:
-                fail_count += 1
-
-            results.append({
-                'userid': grade_data['userid'],
-                'success': result.get('success', False),
-                'message': result.get('message', '')
-            })
+        results_by_index = {}
+        fallback = []
+        chunk_size = max(1, config.MOODLE_BULK_GRADE_CHUNK)
+
+        for start in range(0, len(grades), chunk_size):
+            chunk = list(enumerate(grades[start:start + chunk_size], start))
+            if fallback:
+                # Plugin already failed for an earlier chunk; don't pay for another round trip
+                fallback.extend(chunk)
+                continue
+
+            params = {'assignmentid': assignment_id}
+            for i, (_, grade_data) in enumerate(chunk):
+                params[f'grades[{i}][userid]'] = grade_data['userid']
+                params[f'grades[{i}][grade]'] = grade_data['grade']
+                params[f'grades[{i}][feedback]'] = grade_data.get('feedback', '')
+
+            result = self._call_api('local_sor_bulk_grade_submissions', params, retry=False)
+            if not result or 'results' not in result:
+                fallback.extend(chunk)
+                continue
+
+            plugin_results = {r.get('userid'): r for r in result['results']}
+            for index, grade_data in chunk:
+                r = plugin_results.get(grade_data['userid'], {'success': False, 'message': 'Missing from bulk response'})
+                results_by_index[index] = {
+                    'userid': grade_data['userid'],
+                    'success': bool(r.get('success', False)),
+                    'message': r.get('message', '')
+                }
+
+        if fallback:
+            def grade_one(item):
+                index, grade_data = item
+                result = self.grade_submission(
+                    assignment_id,
+                    grade_data['userid'],
+                    grade_data['grade'],
+                    grade_data.get('feedback', '')
+                )
+                return index, {
+                    'userid': grade_data['userid'],
+                    'success': result.get('success', False),
+                    'message': result.get('message', '')
+                }
+
+            with ThreadPoolExecutor(max_workers=max(1, config.MOODLE_GRADE_CONCURRENCY)) as executor:
+                for index, entry in executor.map(grade_one, fallback):
+                    results_by_index[index] = entry
+
+        results = [results_by_index[i] for i in range(len(grades))]
+        success_count = sum(1 for r in results if r['success'])
+        fail_count = len(results) - success_count
 
         return {
             'success': fail_count == 0,
@@ -400,7 +452,7 @@ class MoodleService:
                 for i, uid in enumerate(user_ids):
                     params[f'userids[{i}]'] = uid
 
-            result = self._call_api('local_sor_release_grades', params)
+            result = self._call_api('local_sor_release_grades', params, retry=False)
 
             if result and 'success' in result:
                 return result
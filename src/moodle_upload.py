@@ -2,28 +2,32 @@
 Moodle upload module for SOR Automation System
 Handles uploading signed PDFs to Moodle assignments
 """
+from .artifact_store import sha1_file
 from .config import config
-import requests
-import pymysql
+from .db_pool import pool
+from .http_client import http_client
 import time
 import hashlib
 import os
 
-def upload_to_assignment_direct(file_path: str, learner_name: str, learner_id: int, course_module_id: int):
+# The learner's current submission file with a given contenthash (mdl_files is indexed on contenthash)
+SUBMISSION_FILE_SQL = """SELECT f.id, f.filename, s.id AS submission_id FROM mdl_assign_submission s
+    JOIN mdl_files f ON f.itemid = s.id AND f.component = 'assignsubmission_file' AND f.filearea = 'submission_files'
+    WHERE s.assignment = %s AND s.userid = %s AND s.latest = 1 AND f.contenthash = %s LIMIT 1"""
+
+def upload_to_assignment_direct(file_path: str, learner_name: str, learner_id: int, course_module_id: int, contenthash: str = None):
     """
     Upload file to Moodle assignment using direct DB manipulation.
     Returns dictionary with upload info if successful.
+
+    contenthash is the file's SHA-1 if already known (artifact store). When
+    the learner's submission already holds that exact file nothing is
+    uploaded and the result's method is 'unchanged'.
     """
+    conn = None
     try:
         # Get assignment ID
-        conn = pymysql.connect(
-            host=config.DB_HOST,
-            user=config.DB_USER,
-            password=config.DB_PASSWORD,
-            database=config.DB_NAME,
-            port=config.DB_PORT,
-            cursorclass=pymysql.cursors.DictCursor
-        )
+        conn = pool.get_connection()
         with conn.cursor() as cur:
             cur.execute("SELECT a.id as assign_id, a.name as assignment_name FROM mdl_assign a JOIN mdl_course_modules cm ON cm.instance = a.id WHERE cm.id = %s LIMIT 1", (course_module_id,))
             result = cur.fetchone()
@@ -33,6 +37,26 @@ def upload_to_assignment_direct(file_path: str, learner_name: str, learner_id: i
             assign_id = result['assign_id']
             assignment_name = result['assignment_name']
 
+            if not contenthash:
+                contenthash, _ = sha1_file(file_path)
+            cur.execute(SUBMISSION_FILE_SQL, (assign_id, learner_id, contenthash))
+            existing = cur.fetchone()
+            if existing:
+                print(f"Submission already has this file ({existing['filename']}), skipping upload")
+                return {
+                    'filename': existing['filename'],
+                    'submission_id': existing['submission_id'],
+                    'file_id': existing['id'],
+                    'assignment_id': assign_id,
+                    'coursemodule_id': course_module_id,
+                    'assignment_name': assignment_name,
+                    'contenthash': contenthash,
+                    'method': 'unchanged'
+                }
+
+        # Hand the connection back before the (slow) HTTP upload
+        conn.close()
+
         # Create filename
         timestamp = time.strftime("%Y%m%d_%H%M%S")
         filename = f"SOR_{learner_name.replace(' ', '_')}_{timestamp}.pdf"
@@ -58,17 +82,19 @@ def upload_to_assignment_direct(file_path: str, learner_name: str, learner_id: i
                 'assignment_id': assign_id,
                 'coursemodule_id': course_module_id,
                 'assignment_name': assignment_name,
+                'contenthash': contenthash,
                 'method': 'web_service'
             }
         else:
             print(f"Web service failed, using manual method")
-            return upload_to_assignment_manual(file_path, filename, learner_id, assign_id, course_module_id)
+            return upload_to_assignment_manual(file_path, filename, learner_id, assign_id, course_module_id, contenthash)
 
     except Exception as e:
         print(f"Upload error: {e}")
         return None
     finally:
-        conn.close()
+        if conn:
+            conn.close()
 
 def upload_file_to_moodle(file_path: str, filename: str):
     """Upload a file to Moodle's draft area"""
@@ -83,7 +109,7 @@ def upload_file_to_moodle(file_path: str, filename: str):
                 'filearea': 'draft',
                 'itemid': 0
             }
-            response = requests.post(upload_url, files=files, data=data, timeout=60)
+            response = http_client.post(upload_url, files=files, data=data, timeout=60)
             if response.status_code == 200:
                 result = response.json()
                 if result and len(result) > 0 and 'itemid' in result[0]:
@@ -103,7 +129,7 @@ def moodle_ws_call(function: str, params: dict):
     }
     data.update(params)
     try:
-        response = requests.post(ws_url, data=data, timeout=30)
+        response = http_client.post(ws_url, data=data, timeout=30)
         if response.status_code == 200:
             result = response.json()
             if isinstance(result, dict) and 'exception' in result:
@@ -116,16 +142,9 @@ def moodle_ws_call(function: str, params: dict):
         print(f"Request error: {e}")
         return None
 
-def upload_to_assignment_manual(file_path: str, filename: str, user_id: int, assign_id: int, coursemodule_id: int):
-    """Manual upload method"""
-    conn = pymysql.connect(
-        host=config.DB_HOST,
-        user=config.DB_USER,
-        password=config.DB_PASSWORD,
-        database=config.DB_NAME,
-        port=config.DB_PORT,
-        cursorclass=pymysql.cursors.DictCursor
-    )
+def upload_to_assignment_manual(file_path: str, filename: str, user_id: int, assign_id: int, coursemodule_id: int, contenthash: str = None):
+    """Manual upload method (contenthash: the file's SHA-1, computed if not given)"""
+    conn = pool.get_connection()
     try:
         with conn.cursor() as cur:
             current_time = int(time.time())
@@ -146,11 +165,11 @@ def upload_to_assignment_manual(file_path: str, filename: str, user_id: int, ass
                 return None
             context_id = context['contextid']
 
-            # Read file
-            with open(file_path, 'rb') as f:
-                file_content = f.read()
-            contenthash = hashlib.sha1(file_content).hexdigest()
-            filesize = len(file_content)
+            # Hash the file in chunks unless the caller already knows its hash
+            if contenthash:
+                filesize = os.path.getsize(file_path)
+            else:
+                contenthash, filesize = sha1_file(file_path)
             filepath = "/"
             pathname = f"/{context_id}/assignsubmission_file/submission_files/{submission_id}{filepath}{filename}"
             pathnamehash = hashlib.sha1(pathname.encode()).hexdigest()
@@ -180,6 +199,7 @@ def upload_to_assignment_manual(file_path: str, filename: str, user_id: int, ass
                 'context_id': context_id,
                 'assignment_id': assign_id,
                 'coursemodule_id': coursemodule_id,
+                'contenthash': contenthash,
                 'method': 'manual'
             }
 
@@ -2,7 +2,11 @@
 PDF Generator module for SOR Automation System
 Handles PDF creation and formatting
 """
+import hashlib
+import io
+import json
 import os
+import threading
 from datetime import datetime
 from reportlab.lib.pagesizes import A4
 from reportlab.lib import colors
@@ -12,8 +16,57 @@ from reportlab.lib.units import mm
 from reportlab.pdfgen import canvas
 from reportlab.lib.utils import ImageReader
 from .config import config
-import numpy as np
-import pandas as pd
+from .scoring import score_results, score_one, group_by_section, print_results_table
+
+try:
+    from pypdf import PdfReader, PdfWriter
+except ImportError:  # Template mode is optional
+    PdfReader = PdfWriter = None
+
+
+class ImageAssetCache:
+    """
+    Process-wide cache of decoded images (logo, stamp, watermark, cover).
+
+    Each file is opened and validated once, and the ReportLab ImageReader is
+    reused across pages and across PDFs. An entry is reloaded when the file's
+    mtime or size changes.
+    """
+
+    def __init__(self):
+        self.enabled = True
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+
+    def get(self, image_path):
+        """Return an ImageReader for image_path; raises if the file is unreadable"""
+        if not self.enabled:
+            return ImageReader(image_path)
+
+        st = os.stat(image_path)
+        signature = (st.st_mtime_ns, st.st_size)
+        with self._lock:
+            entry = self._entries.get(image_path)
+            if entry and entry[0] == signature:
+                self.stats['hits'] += 1
+                return entry[1]
+            if entry:
+                self.stats['invalidations'] += 1
+            self.stats['misses'] += 1
+
+            reader = ImageReader(image_path)
+            reader.getSize()  # Forces decode so a bad file fails here, once
+            self._entries[image_path] = (signature, reader)
+            return reader
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Create shared asset cache instance
+asset_cache = ImageAssetCache()
 
 
 def validate_image_path(image_path, image_name):
@@ -40,7 +93,7 @@ def validate_image_path(image_path, image_name):
     print(f"[OK] {image_name}: File exists ({file_size} bytes)")
     
     try:
-        reader = ImageReader(image_path)
+        reader = asset_cache.get(image_path)
         width, height = reader.getSize()
         print(f"[OK] {image_name}: Image readable ({width}x{height} pixels)")
         return image_path
@@ -49,6 +102,25 @@ def validate_image_path(image_path, image_name):
         return None
 
 
+def init_render_worker(logo_path, stamp_path, cover_path):
+    """Process-pool initializer: carry the validated image paths into a render worker."""
+    config.LOGO_PATH_VALID = logo_path
+    config.STAMP_PATH_VALID = stamp_path
+    config.COVER_PATH_VALID = cover_path
+
+
+def warm_render_worker(logo_path, stamp_path, cover_path):
+    """Like init_render_worker, but also builds the style sheet and decodes the images up front."""
+    init_render_worker(logo_path, stamp_path, cover_path)
+    shared_styles()
+    for path in (logo_path, stamp_path, cover_path):
+        if path:
+            try:
+                asset_cache.get(path)
+            except Exception as e:
+                print(f"[!] Could not preload {path}: {e}")
+
+
 def draw_image_safe(canvas_obj, image_path, x, y, width, height, preserve_aspect=True, image_name="image"):
     """Draw an image on canvas safely."""
     print(f"[DEBUG] draw_image_safe called for {image_name} at ({x}, {y}) size ({width}x{height})")
@@ -62,7 +134,7 @@ def draw_image_safe(canvas_obj, image_path, x, y, width, height, preserve_aspect
     
     try:
         print(f"[DRAW] {image_name}: Drawing at ({x}, {y}) size ({width}x{height})...")
-        img_reader = ImageReader(image_path)
+        img_reader = asset_cache.get(image_path)
         canvas_obj.drawImage(img_reader, x, y, width=width, height=height, preserveAspectRatio=preserve_aspect, anchor='sw')
         print(f"[DRAW] {image_name}: SUCCESS")
         return True
@@ -149,7 +221,8 @@ def add_header_footer(canvas_obj, doc):
         y = 30
         for i, line in enumerate(footer_lines):
             canvas_obj.drawString(x, y + (10 * i), line)
-        page_num_text = f"Page {doc.page}"
+        # Fragments rendered on their own carry the page number they will sit at
+        page_num_text = f"Page {doc.page + getattr(doc, 'page_offset', 0)}"
         canvas_obj.drawRightString(A4[0] - doc.rightMargin, y, page_num_text)
     except Exception as e:
         print(f"[ERROR] Failed to draw footer: {e}")
@@ -204,37 +277,19 @@ def make_kv_table_bold_header(kv_list, col_widths=None, styles=None):
 
 
 def calculate_overall_score(learner_data):
-    """Calculate overall score from learner data without processing full dataframe"""
-    results = learner_data.get('results', [])
-    if not results:
-        return 0.0
-
-    raw_weights = config.QUIZ_WEIGHTS
-    total_raw_weight = sum(raw_weights.values())
+    """Overall score for learner data, as printed on the SOR (see scoring.score_one)"""
+    return score_one(learner_data.get('results', []))
 
-    total_weighted_score = 0.0
-    for result in results:
-        quiz_id = result.get('quiz_id')
-        learner_score = float(result.get('learner_score') or 0)
-        total_marks = float(result.get('total_marks') or 1)  # Avoid division by zero
 
-        # Calculate achievement percentage
-        achievement_pct = (learner_score / total_marks * 100) if total_marks > 0 else 0
-
-        # Get weight for this quiz
-        weight = raw_weights.get(quiz_id, 0)
-
-        # Calculate weighted score
-        weighted_score = achievement_pct * weight
-        total_weighted_score += weighted_score
-
-    # Calculate overall score
-    overall_score = (total_weighted_score / total_raw_weight) if total_raw_weight > 0 else 0.0
-    return round(overall_score, 2)
+def process_results_data(results_df, quiz_section_map, section_1_name):
+    """Process quiz results with pandas.
 
+    Reference implementation kept for the golden-output check against
+    scoring.score_results, which generate_sor_pdf uses instead.
+    """
+    import numpy as np
+    import pandas as pd
 
-def process_results_data(results_df, quiz_section_map, section_1_name):
-    """Process quiz results."""
     if results_df.empty:
         results_df = pd.DataFrame(columns=["learner_name", "quiz_id", "topic_name", "learner_score", "total_marks", "Achievement: Percentage", "Credits", "Weight (%)", "Final EISA Achievement Score", "Section", "Module"])
         overall_score = 0.00
@@ -273,31 +328,100 @@ def process_results_data(results_df, quiz_section_map, section_1_name):
     return results_df, overall_score, overall_status
 
 
-def generate_sor_pdf(learner_name, learner_data, pdf_output_path):
-    """Generate the SOR PDF."""
-    print(f"\nGenerating SOR PDF for {learner_name}...")
+# Static SOR content shared by every learner
+DOCUMENT_VERSION_KV = [
+    ("Document Version", "3.0"),
+    ("Date Published", "2 Oct 2025"),
+    ("Publisher", "MINDWORX ACADEMY"),
+    ("Document Change History", "21/7/2025; 22/9/2025; 2/10/2025"),
+    ("Document Author", "MvR"),
+    ("Review History", "")
+]
+
+KNOWLEDGE_MODULES = [
+    ["KM 01", "Software Engineering", "NQF Level 6", "20"],
+    ["KM 02", "Programming", "NQF Level 6", "20"],
+    ["KM 03", "Database design and Information Systems", "NQF Level 6", "15"],
+    ["KM 04", "Fundamentals of Project Management", "NQF Level 5", "5"],
+    ["KM 05", "Digital and Business Mathematics", "NQF Level 5", "15"]
+]
+
+PRACTICAL_MODULES = [
+    ["PM 01", "Document system design", "NQF Level 6", "25"],
+    ["PM 02", "Design and Manipulate Databases", "NQF Level 5", "5"],
+    ["PM 03", "Program and deploy applications", "NQF Level 6", "25"],
+    ["PM 04", "Test or debug source code", "NQF Level 5", "15"]
+]
+
+WORK_EXPERIENCE_MODULES = [
+    ["WM 01", "Software design", "NQF Level 6", "30"],
+    ["WM 02", "Database design and manipulation", "NQF Level 5", "20"],
+    ["WM 03", "Software development", "NQF Level 6", "30"],
+    ["WM 04", "Software testing", "NQF Level 5", "15"]
+]
+
+EXIT_OUTCOMES = [
+    "Design software to meet clients' needs",
+    "Design and manipulate databases",
+    "Develop software to add value to the organisation",
+    "Test or debug source code"
+]
+
+DECLARATION_TEXT = """
+    I certify that the information recorded above is a true reflection of the learner's internal assessment achievements for this qualification, and that supporting evidence is available for audit.
+    """
 
-    learner = learner_data['learner']
-    profile = learner_data['profile']
-    provider_info = learner_data['provider_info']
-    section_1_name = learner_data['section_1_name']
-    quiz_section_map = learner_data['quiz_section_map']
-    results_df = pd.DataFrame(learner_data['results'])
-    emp_fields = learner_data['emp_fields']
+DECLARATION_KV = [
+    ("Name of delegated official", "__________________________________________"),
+    ("Designation", "Principal / Academic Manager / Quality and Compliance Lead"),
+    ("Signature", "__________________________________________"),
+    ("Date issued", "________________")
+]
 
-    results_df, overall_score, overall_status = process_results_data(results_df, quiz_section_map, section_1_name)
+# Bump when the layout of the static sections changes to invalidate cached fragments
+TEMPLATE_VERSION = 1
 
-    doc = SimpleDocTemplate(pdf_output_path, pagesize=A4, rightMargin=18 * mm, leftMargin=18 * mm, topMargin=18 * mm, bottomMargin=18 * mm)
-    doc.learner = {"fullname": f"{learner['firstname']} {learner['lastname']}", "id": learner.get("id")}
-    elements = []
 
+def build_styles():
+    """Paragraph styles used throughout the SOR."""
     styles = getSampleStyleSheet()
     styles.add(ParagraphStyle(name="CenterTitle", parent=styles["Heading1"], alignment=1, fontSize=18, spaceAfter=6))
     styles.add(ParagraphStyle(name="SectionTitle", parent=styles["Heading2"], fontSize=12, spaceAfter=6))
     styles.add(ParagraphStyle(name="Small", parent=styles["Normal"], fontSize=9))
-    normal = styles["Normal"]
-
     styles.add(ParagraphStyle(name="CoverTitleGrey", parent=styles["Heading1"], alignment=1, fontSize=16, spaceAfter=12, textColor=colors.HexColor("#555555")))
+    return styles
+
+
+_styles = None
+_styles_lock = threading.Lock()
+
+
+def shared_styles():
+    """The SOR style sheet, built once per process (rendering only reads it)."""
+    global _styles
+    if _styles is None:
+        with _styles_lock:
+            if _styles is None:
+                _styles = build_styles()
+    return _styles
+
+
+def make_module_table(rows):
+    """Qualification structure table (code, name, NQF level, credits)."""
+    table = Table([["Code", "Module Name", "NQF Level", "Credits"]] + rows, colWidths=[30 * mm, 100 * mm, 30 * mm, 20 * mm])
+    table.setStyle(TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+        ('ALIGN', (2, 1), (3, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold')
+    ]))
+    return table
+
+
+def build_learner_front_elements(learner, profile, emp_fields, styles):
+    """Cover page, learner details and employer details (learner-specific)."""
+    elements = []
 
     # Cover page
     elements.append(Spacer(1, 180))
@@ -345,19 +469,17 @@ def generate_sor_pdf(learner_name, learner_data, pdf_output_path):
     else:
         employer_kv.append(("Employer", "No employer profile fields found (categoryid=5)"))
     elements.append(make_kv_table_bold_header(employer_kv, styles=styles))
-    elements.append(PageBreak())
+    return elements
+
+
+def build_structure_elements(styles):
+    """Document version, qualification structure and exit outcomes (identical for every learner)."""
+    normal = styles["Normal"]
+    elements = []
 
     # Document Version
     elements.append(Paragraph("Document Version", styles["SectionTitle"]))
-    doc_version_kv = [
-        ("Document Version", "3.0"),
-        ("Date Published", "2 Oct 2025"),
-        ("Publisher", "MINDWORX ACADEMY"),
-        ("Document Change History", "21/7/2025; 22/9/2025; 2/10/2025"),
-        ("Document Author", "MvR"),
-        ("Review History", "")
-    ]
-    elements.append(make_kv_table_bold_header(doc_version_kv, styles=styles))
+    elements.append(make_kv_table_bold_header(DOCUMENT_VERSION_KV, styles=styles))
     elements.append(PageBreak())
 
     # QUALIFICATION STRUCTURE
@@ -366,106 +488,59 @@ def generate_sor_pdf(learner_name, learner_data, pdf_output_path):
 
     # Knowledge Modules
     elements.append(Paragraph("<b>Knowledge Modules</b>", styles["Small"]))
-    knowledge_data = [
-        ["KM 01", "Software Engineering", "NQF Level 6", "20"],
-        ["KM 02", "Programming", "NQF Level 6", "20"],
-        ["KM 03", "Database design and Information Systems", "NQF Level 6", "15"],
-        ["KM 04", "Fundamentals of Project Management", "NQF Level 5", "5"],
-        ["KM 05", "Digital and Business Mathematics", "NQF Level 5", "15"]
-    ]
-    knowledge_table = Table([["Code", "Module Name", "NQF Level", "Credits"]] + knowledge_data, colWidths=[30 * mm, 100 * mm, 30 * mm, 20 * mm])
-    knowledge_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (2, 1), (3, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold')
-    ]))
-    elements.append(knowledge_table)
+    elements.append(make_module_table(KNOWLEDGE_MODULES))
     elements.append(Spacer(1, 12))
     elements.append(Paragraph("Total number of credits for Knowledge Modules: 75", normal))
     elements.append(Spacer(1, 18))
 
     # Practical Skill Modules
     elements.append(Paragraph("<b>Practical Skill Modules</b>", styles["Small"]))
-    practical_data = [
-        ["PM 01", "Document system design", "NQF Level 6", "25"],
-        ["PM 02", "Design and Manipulate Databases", "NQF Level 5", "5"],
-        ["PM 03", "Program and deploy applications", "NQF Level 6", "25"],
-        ["PM 04", "Test or debug source code", "NQF Level 5", "15"]
-    ]
-    practical_table = Table([["Code", "Module Name", "NQF Level", "Credits"]] + practical_data, colWidths=[30 * mm, 100 * mm, 30 * mm, 20 * mm])
-    practical_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (2, 1), (3, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold')
-    ]))
-    elements.append(practical_table)
+    elements.append(make_module_table(PRACTICAL_MODULES))
     elements.append(Spacer(1, 12))
     elements.append(Paragraph("Total number of credits for Practical Skill Modules: 70", normal))
     elements.append(Spacer(1, 18))
 
     # Work Experience Modules
     elements.append(Paragraph("<b>Work Experience Modules</b>", styles["Small"]))
-    work_data = [
-        ["WM 01", "Software design", "NQF Level 6", "30"],
-        ["WM 02", "Database design and manipulation", "NQF Level 5", "20"],
-        ["WM 03", "Software development", "NQF Level 6", "30"],
-        ["WM 04", "Software testing", "NQF Level 5", "15"]
-    ]
-    work_table = Table([["Code", "Module Name", "NQF Level", "Credits"]] + work_data, colWidths=[30 * mm, 100 * mm, 30 * mm, 20 * mm])
-    work_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
-        ('ALIGN', (2, 1), (3, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold')
-    ]))
-    elements.append(work_table)
+    elements.append(make_module_table(WORK_EXPERIENCE_MODULES))
     elements.append(Spacer(1, 12))
     elements.append(Paragraph("Total number of credits for Work Experience Modules: 95", normal))
     elements.append(Spacer(1, 18))
 
     # Exit Level Outcomes
     elements.append(Paragraph("<b>Exit Level Outcome</b>", styles["Small"]))
-    exit_outcomes = [
-        "Design software to meet clients' needs",
-        "Design and manipulate databases",
-        "Develop software to add value to the organisation",
-        "Test or debug source code"
-    ]
-    for i, outcome in enumerate(exit_outcomes, 1):
+    for i, outcome in enumerate(EXIT_OUTCOMES, 1):
         elements.append(Paragraph(f"{i}. {outcome}", normal))
+    return elements
 
-    elements.append(PageBreak())
 
-    # Results per component
+def build_results_elements(rows, overall_score, overall_status, section_1_name, styles):
+    """Results per component (learner-specific); rows come from scoring.score_results."""
+    normal = styles["Normal"]
+    elements = []
+
     elements.append(Paragraph("Results per component", styles["SectionTitle"]))
     elements.append(Paragraph("Achievement: Percentage (70% <= Competent)", styles["Small"]))
     elements.append(Spacer(1, 6))
 
-    if not results_df.empty:
+    if rows:
         wrap_center_style = ParagraphStyle(name='WrapCenter', fontName='Helvetica', fontSize=9, leading=11, alignment=1)
         wrap_left_style = ParagraphStyle(name='WrapLeft', fontName='Helvetica', fontSize=9, leading=11, alignment=0)
 
         elements.append(Paragraph(f"<b>{section_1_name}</b>", styles["SectionTitle"]))
         elements.append(Spacer(1, 12))
 
-        unique_sections = results_df["Section"].unique()
-        for section_name in unique_sections:
-            section_results = results_df[results_df["Section"] == section_name]
-            if not section_results.empty:
+        for section_name, section_results in group_by_section(rows):
+            if section_results:
                 elements.append(Paragraph(f"<b>{section_name}</b>", styles["Small"]))
                 elements.append(Spacer(1, 6))
 
                 table_columns = ["Topic Title", "Credits", "Weight (%)", "Achievement: Percentage", "Final EISA Achievement Score"]
                 data = [[Paragraph(c, wrap_center_style) for c in table_columns]]
-                for _, row in section_results.iterrows():
+                for row in section_results:
                     data.append([
                         Paragraph(row.get("topic_name", ""), wrap_left_style),
-                        str(int(row["Credits"])) if pd.notna(row.get("Credits")) else "",
+                        str(int(row["Credits"])) if row.get("Credits") is not None else "",
                         f"{row.get('Weight (%)', 0):.2f}",
                         Paragraph(f"{row.get('Achievement: Percentage', 0):.2f}", wrap_center_style),
                         Paragraph(f"{row.get('Final EISA Achievement Score', 0):.2f}", wrap_center_style)
@@ -491,23 +566,144 @@ def generate_sor_pdf(learner_name, learner_data, pdf_output_path):
         elements.append(Paragraph(f"Overall Module Result: {overall_score:.2f}% - {overall_status}", normal))
     else:
         elements.append(Paragraph("No assessment results found for this learner.", normal))
+    return elements
 
-    elements.append(PageBreak())
 
-    # Provider declaration
+def build_declaration_elements(styles):
+    """Provider declaration and certification text (identical for every learner)."""
+    normal = styles["Normal"]
+    elements = []
     elements.append(Paragraph("Provider declaration and signature (delegated official)", styles["SectionTitle"]))
-    declaration_text = """
-    I certify that the information recorded above is a true reflection of the learner's internal assessment achievements for this qualification, and that supporting evidence is available for audit.
+    elements.append(Paragraph(DECLARATION_TEXT, normal))
+    elements.append(Spacer(1, 12))
+    elements.append(make_kv_table(DECLARATION_KV, styles=styles))
+    return elements
+
+
+def _new_doc(output):
+    # With the artifact store, invariant drops the creation timestamp and random
+    # document ID so the same SOR renders to the same bytes (and contenthash)
+    return SimpleDocTemplate(output, pagesize=A4, rightMargin=18 * mm, leftMargin=18 * mm, topMargin=18 * mm, bottomMargin=18 * mm,
+                             invariant=1 if config.ARTIFACT_STORE_ENABLED else None)
+
+
+class StaticFragmentCache:
     """
-    elements.append(Paragraph(declaration_text, normal))
-    declaration_kv = [
-        ("Name of delegated official", "__________________________________________"),
-        ("Designation", "Principal / Academic Manager / Quality and Compliance Lead"),
-        ("Signature", "__________________________________________"),
-        ("Date issued", "________________")
+    Rendered PDF bytes for the static SOR sections.
+
+    A fragment depends on its content, the config constants, the header /
+    watermark / stamp images, the page number it starts on (footer) and the
+    issue date (stamp), so all of those go into the key.
+    """
+
+    def __init__(self):
+        self._fragments = {}
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0}
+
+    def key(self, section, start_page, issue_date):
+        content = json.dumps([section] + _static_content(config.LOGO_PATH_VALID, config.STAMP_PATH_VALID), default=str)
+        return (section, start_page, issue_date, hashlib.sha1(content.encode()).hexdigest())
+
+    def get(self, section, start_page, build_elements):
+        """Return (pdf_bytes, page_count) for a static section starting at start_page."""
+        key = self.key(section, start_page, datetime.now().strftime("%Y-%m-%d"))
+        with self._lock:
+            if key in self._fragments:
+                self.stats['hits'] += 1
+                return self._fragments[key]
+        fragment = render_fragment(build_elements(shared_styles()), start_page)
+        with self._lock:
+            self.stats['misses'] += 1
+            self._fragments[key] = fragment
+        return fragment
+
+    def clear(self):
+        with self._lock:
+            self._fragments.clear()
+
+
+# Create shared static fragment cache instance
+fragment_cache = StaticFragmentCache()
+
+
+def _static_content(*image_paths):
+    """Everything in an SOR that isn't learner data: template text, qualification constants and image files"""
+    images = []
+    for path in image_paths:
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            images.append((path, st.st_mtime_ns, st.st_size))
+    return [
+        TEMPLATE_VERSION, DOCUMENT_VERSION_KV, KNOWLEDGE_MODULES, PRACTICAL_MODULES,
+        WORK_EXPERIENCE_MODULES, EXIT_OUTCOMES, DECLARATION_TEXT, DECLARATION_KV,
+        config.QUAL_TITLE, config.SAQA_ID, config.NQF_LEVEL, config.TOTAL_CREDITS, images
     ]
-    elements.append(Spacer(1, 12))
-    elements.append(make_kv_table(declaration_kv, styles=styles))
+
+
+def content_fingerprint(learner_data):
+    """
+    Hash of everything a learner's SOR is rendered from: learner data,
+    scoring config, static content, image files and the issue date stamped
+    on it. Same fingerprint, same document.
+    """
+    content = json.dumps([
+        datetime.now().strftime("%Y-%m-%d"), learner_data, sorted(config.QUIZ_WEIGHTS.items()), sorted(config.QUIZ_CREDITS.items()),
+        _static_content(config.LOGO_PATH_VALID, config.STAMP_PATH_VALID, config.COVER_PATH_VALID)
+    ], default=str, sort_keys=True)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def render_fragment(elements, start_page=1, first_page_callback=on_later_pages, learner=None):
+    """Lay out elements into standalone PDF bytes whose footers number from start_page."""
+    buffer = io.BytesIO()
+    doc = _new_doc(buffer)
+    doc.page_offset = start_page - 1
+    if learner is not None:
+        doc.learner = learner
+    doc.build(elements, onFirstPage=first_page_callback, onLaterPages=on_later_pages)
+    return buffer.getvalue(), doc.page
+
+
+def _generate_from_template(learner, profile, emp_fields, rows, overall_score, overall_status, section_1_name, pdf_output_path):
+    """Lay out only the learner pages and stitch them around the cached static fragments."""
+    styles = shared_styles()
+    doc_learner = {"fullname": f"{learner['firstname']} {learner['lastname']}", "id": learner.get("id")}
+
+    front, front_pages = render_fragment(build_learner_front_elements(learner, profile, emp_fields, styles),
+                                         1, first_page_callback=on_first_page, learner=doc_learner)
+    structure, structure_pages = fragment_cache.get('structure', front_pages + 1, build_structure_elements)
+    results_start = front_pages + structure_pages + 1
+    results, results_pages = render_fragment(build_results_elements(rows, overall_score, overall_status, section_1_name, styles), results_start)
+    declaration, _ = fragment_cache.get('declaration', results_start + results_pages, build_declaration_elements)
+
+    writer = PdfWriter()
+    for part in (front, structure, results, declaration):
+        for page in PdfReader(io.BytesIO(part)).pages:
+            writer.add_page(page)
+    with open(pdf_output_path, 'wb') as f:
+        writer.write(f)
+
+
+def generate_sor_pdf(learner_name, learner_data, pdf_output_path, use_template=None):
+    """Generate the SOR PDF.
+
+    With use_template (default: config.PDF_TEMPLATE_MODE) the static sections
+    come from a cached pre-rendered fragment and only the learner pages are laid out.
+    """
+    print(f"\nGenerating SOR PDF for {learner_name}...")
+    use_template = config.PDF_TEMPLATE_MODE if use_template is None else use_template
+
+    learner = learner_data['learner']
+    profile = learner_data['profile']
+    provider_info = learner_data['provider_info']
+    section_1_name = learner_data['section_1_name']
+    quiz_section_map = learner_data['quiz_section_map']
+    emp_fields = learner_data['emp_fields']
+
+    rows, overall_score, overall_status = score_results(learner_data['results'], quiz_section_map)
+    if rows:
+        print_results_table(rows, overall_score, overall_status)
 
     if os.path.exists(pdf_output_path):
         try:
@@ -516,6 +712,27 @@ def generate_sor_pdf(learner_name, learner_data, pdf_output_path):
             print("Please close the PDF if it's open, then re-run.")
             return None
 
+    if use_template and PdfWriter is None:
+        print("[!]  pypdf not installed - falling back to full render")
+        use_template = False
+
+    if use_template:
+        _generate_from_template(learner, profile, emp_fields, rows, overall_score, overall_status, section_1_name, pdf_output_path)
+        print(f"SOR PDF generated: {pdf_output_path}")
+        return pdf_output_path
+
+    doc = _new_doc(pdf_output_path)
+    doc.learner = {"fullname": f"{learner['firstname']} {learner['lastname']}", "id": learner.get("id")}
+    styles = shared_styles()
+
+    elements = build_learner_front_elements(learner, profile, emp_fields, styles)
+    elements.append(PageBreak())
+    elements.extend(build_structure_elements(styles))
+    elements.append(PageBreak())
+    elements.extend(build_results_elements(rows, overall_score, overall_status, section_1_name, styles))
+    elements.append(PageBreak())
+    elements.extend(build_declaration_elements(styles))
+
     doc.build(elements, onFirstPage=on_first_page, onLaterPages=on_later_pages)
     print(f"SOR PDF generated: {pdf_output_path}")
-    return pdf_output_path
\ No newline at end of file
+    return pdf_output_path
@@ -0,0 +1,441 @@
+"""
+Pipeline module for SOR Automation System
+The pdf -> signature -> download -> upload flow as one state machine over
+sor_requests.status. Every stage is idempotent and checkpoints its result on
+the request row, so any request can be resumed from its last completed stage.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+import time
+from .config import config, get_pdf_output_path, get_request_pdf_path
+from .dashboard_db import dashboard_db
+
+# Stages in pipeline order, with the status each one starts from and moves to.
+# 'upload' starts from 'signed', or from 'pdf_generated' when SKIP_SIGNATURE is set.
+STAGES = ('render', 'send_signature', 'collect_signed', 'upload')
+
+# Allowed sor_requests.status transitions. A failed request goes back to the
+# status of its last valid checkpoint when it is resumed.
+TRANSITIONS = {
+    'pending': ('pdf_generated', 'failed'),
+    'pdf_generated': ('signature_sent', 'uploaded', 'failed', 'pending'),
+    'signature_sent': ('signed', 'failed', 'pending'),
+    'signed': ('uploaded', 'failed', 'signature_sent', 'pending'),
+    'uploaded': (),
+    'failed': ('pending', 'pdf_generated', 'signature_sent', 'signed'),
+}
+
+
+# Statuses a request's PDF may be regenerated from (after a failed send or a data correction)
+RERENDER_STATUSES = ('pending', 'pdf_generated', 'failed')
+
+
+class StageFailed(Exception):
+    """
+    A stage could not complete. Fatal failures (bad learner data, render
+    errors) mark the request failed; anything else leaves it at its last
+    checkpoint so the stage is retried on the next run.
+    """
+
+    def __init__(self, message: str, action: str, fatal: bool = False):
+        super().__init__(message)
+        self.action = action
+        self.fatal = fatal
+
+
+class InvalidTransition(ValueError):
+    pass
+
+
+def _exists(path: Optional[str]) -> bool:
+    return bool(path) and os.path.exists(path)
+
+
+def _learner_key(req: Dict):
+    """Moodle user ID when the request has one (indexed lookups), else the learner's name"""
+    return int(req['learner_id']) if req.get('learner_id') else req['learner_name']
+
+
+def _store():
+    """The shared artifact store when ARTIFACT_STORE_ENABLED, else None"""
+    if not config.ARTIFACT_STORE_ENABLED:
+        return None
+    from .artifact_store import artifact_store
+    return artifact_store
+
+
+def _signed_path(req: Dict) -> str:
+    pdf_path = req.get('pdf_path') or str(get_pdf_output_path(req['id']))
+    return pdf_path.replace(".pdf", "_SIGNED.pdf")
+
+
+class Pipeline:
+    """
+    Runs SOR requests through STAGES. A request is only ever advanced by one
+    thread per process at a time; its status changes and audit entries are
+    written in order from that thread.
+    """
+
+    def __init__(self):
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    # ----- State -----
+
+    def next_stage(self, req: Dict, skip_signature: bool = None) -> Optional[str]:
+        """
+        The stage that moves a request on from its current status (None when
+        done or failed). skip_signature defaults to config.SKIP_SIGNATURE.
+        """
+        status = req['status']
+        if skip_signature is None:
+            skip_signature = config.SKIP_SIGNATURE
+        if status == 'pending':
+            return 'render'
+        if status == 'pdf_generated':
+            return 'upload' if skip_signature else 'send_signature'
+        if status == 'signature_sent':
+            return 'collect_signed'
+        if status == 'signed':
+            return 'upload'
+        return None
+
+    def checkpoint_status(self, req: Dict) -> str:
+        """Status of the last completed stage whose output is still usable"""
+        if req['status'] == 'uploaded':
+            return 'uploaded'
+        if _exists(req.get('signed_pdf_path')):
+            return 'signed'
+        if req.get('signature_request_id'):
+            return 'signature_sent'
+        if _exists(req.get('pdf_path')):
+            return 'pdf_generated'
+        return 'pending'
+
+    def _transition(self, req: Dict, status: str, fields: Dict, action: str, details: str,
+                    audit_status: str = 'success'):
+        """
+        Checkpoint a stage: new status, the stage's output and the audit entry
+        in one transaction, applied only if no other process moved the request
+        """
+        if status not in TRANSITIONS.get(req['status'], ()):
+            raise InvalidTransition(f"ID {req['id']}: {req['status']} -> {status} is not allowed")
+        fields = dict(fields, error_message=None)
+        if not dashboard_db.transition(req['id'], status, fields, action, details, audit_status, from_status=req['status']):
+            raise StageFailed(f"Could not save {status} checkpoint (request changed elsewhere?)", 'checkpoint_failed')
+        req.update(fields, status=status)
+
+    # ----- Stages -----
+
+    def _render(self, req: Dict, learner_data: Optional[Dict] = None, render: Callable = None):
+        from .database import db
+        from .pdf_generator import generate_sor_pdf, calculate_overall_score
+        from .validation import validator
+
+        if not learner_data:
+            key = _learner_key(req)
+            learner_data = db.fetch_all_learner_data(key) if isinstance(key, str) else db.fetch_all_learner_data_by_id(key)
+        if not learner_data:
+            raise StageFailed('Learner data not found', 'process_failed', fatal=True)
+
+        report = validator.validate_all(learner_data)
+        if report.has_errors():
+            raise StageFailed('Validation errors', 'validation_failed', fatal=True)
+        dashboard_db.log_action(req['id'], 'validation_passed', 'Validation passed', 'success')
+
+        store = _store()
+        if store:
+            pdf_path, updates, reused = self._render_stored(req, learner_data, render or generate_sor_pdf, store)
+            details = f"PDF {'unchanged, reused' if reused else 'generated'}: {pdf_path} (sha1 {updates['pdf_contenthash']})"
+        else:
+            # Rendering again just replaces the file, so a crash before the checkpoint is harmless
+            pdf_path = (render or generate_sor_pdf)(req['learner_name'], learner_data, str(get_pdf_output_path(req['id'])))
+            if not pdf_path:
+                raise StageFailed('PDF generation failed', 'pdf_generation_failed', fatal=True)
+            updates, details = {}, f'PDF generated: {pdf_path}'
+
+        updates.update(pdf_path=pdf_path, overall_score=calculate_overall_score(learner_data))
+        if not req.get('learner_email') and learner_data['learner'].get('email'):
+            updates['learner_email'] = learner_data['learner']['email']
+        self._transition(req, 'pdf_generated', updates, 'pdf_generated', details)
+
+    def _render_stored(self, req: Dict, learner_data: Dict, render: Callable, store) -> Tuple[str, Dict, bool]:
+        """
+        Put the request's PDF in the artifact store under its stable name.
+        If any request's PDF was rendered from the same data it is linked
+        instead of rendered again. Returns (pdf_path, artifact columns, reused).
+        """
+        from .pdf_generator import content_fingerprint
+
+        pdf_path = str(get_request_pdf_path(req['id']))
+        fingerprint = content_fingerprint(learner_data)
+        stored = dashboard_db.find_pdf_by_fingerprint(fingerprint)
+        if stored and store.has(stored['pdf_contenthash']):
+            store.link(stored['pdf_contenthash'], pdf_path)
+            return pdf_path, {'pdf_contenthash': stored['pdf_contenthash'], 'pdf_filesize': stored['pdf_filesize'],
+                              'pdf_fingerprint': fingerprint}, True
+
+        staging = store.staging_path()
+        if not render(req['learner_name'], learner_data, staging):
+            raise StageFailed('PDF generation failed', 'pdf_generation_failed', fatal=True)
+        contenthash, size = store.store_as(staging, pdf_path)
+        return pdf_path, {'pdf_contenthash': contenthash, 'pdf_filesize': size, 'pdf_fingerprint': fingerprint}, False
+
+    def _send_signature(self, req: Dict):
+        from .signature_service import send_signature_request
+
+        # Already sent (crashed before the checkpoint): never send a second request
+        sig_id = req.get('signature_request_id')
+        if not sig_id:
+            if not req.get('learner_email'):
+                raise StageFailed('No learner email address for signature', 'signature_failed')
+            if not _exists(req.get('pdf_path')):
+                raise StageFailed('PDF file is missing; resume the request to render it again', 'signature_failed')
+            sig_id = send_signature_request(req['pdf_path'], req['learner_email'], req['learner_name'])
+            if not sig_id:
+                raise StageFailed('Failed to send signature request', 'signature_failed')
+
+        self._transition(req, 'signature_sent', {'signature_request_id': sig_id},
+                         'signature_sent', f'Signature request sent (ID: {sig_id})')
+
+    def _collect_signed(self, req: Dict, signed: bool = False) -> bool:
+        """Download the signed PDF; False while the document is still unsigned"""
+        from .signature_service import check_signature_status, download_signed_document
+
+        store = _store()
+        signed_pdf_path = req.get('signed_pdf_path') or _signed_path(req)
+        fields = {'signed_pdf_path': signed_pdf_path}
+        if not _exists(signed_pdf_path):
+            if not signed and not check_signature_status(req['signature_request_id']):
+                return False
+            download_path = store.staging_path() if store else signed_pdf_path
+            if not download_signed_document(req['signature_request_id'], download_path):
+                raise StageFailed('Failed to download signed document', 'download_failed')
+            if store:
+                fields['signed_contenthash'], _ = store.store_as(download_path, signed_pdf_path)
+        elif store and not req.get('signed_contenthash'):
+            # Downloaded before the store was enabled (or before a crash): adopt the file
+            fields['signed_contenthash'], _ = store.store_as(signed_pdf_path, signed_pdf_path)
+
+        self._transition(req, 'signed', fields,
+                         'signature_completed', f'Signed PDF downloaded: {signed_pdf_path}')
+        return True
+
+    def _upload(self, req: Dict):
+        from .moodle_upload import upload_to_assignment_direct
+
+        # Moodle replaces the learner's submission files, so re-uploading is safe
+        signed = req['status'] == 'signed'
+        file_path = req.get('signed_pdf_path') if signed else req.get('pdf_path')
+        if not _exists(file_path):
+            raise StageFailed(f'File to upload is missing: {file_path}', 'moodle_upload_failed')
+        if not req.get('learner_id'):
+            raise StageFailed('No Moodle user ID for upload', 'moodle_upload_failed')
+
+        # Stored files come with their SHA-1; otherwise the upload hashes the file itself
+        contenthash = req.get('signed_contenthash' if signed else 'pdf_contenthash')
+        result = upload_to_assignment_direct(file_path, req['learner_name'], int(req['learner_id']),
+                                             config.ASSIGNMENT_COURSEMODULE_ID, contenthash=contenthash)
+        if not result:
+            raise StageFailed('Moodle upload failed', 'moodle_upload_failed')
+
+        fields = {'uploaded_contenthash': result['contenthash']} if _store() else {}
+        note = ' (signature skipped)' if not signed else ''
+        if result['method'] == 'unchanged':
+            note += ' (unchanged, already in the submission)'
+        self._transition(req, 'uploaded', fields,
+                         'uploaded', f'Uploaded to Moodle{note} - File: {result.get("filename", "N/A")}')
+
+    # ----- Running -----
+
+    def step(self, req: Dict, stages: Iterable[str] = None, learner_data: Dict = None,
+             render: Callable = None, signed: bool = False, skip_signature: bool = None) -> Dict:
+        """
+        Run the request's next stage (if it is in ``stages``). ``learner_data``
+        and ``render`` are used by the render stage; ``signed`` tells
+        collect_signed the document is known to be signed (signature callback).
+        Returns {'stage', 'advanced', 'waiting', 'error'}; ``req`` is updated in place.
+        """
+        stage = self.next_stage(req, skip_signature)
+        outcome = {'stage': stage, 'advanced': False, 'waiting': False, 'error': None}
+        if stage is None or (stages is not None and stage not in stages):
+            return outcome
+
+        try:
+            if stage == 'render':
+                self._render(req, learner_data, render)
+            elif stage == 'send_signature':
+                self._send_signature(req)
+            elif stage == 'collect_signed':
+                if not self._collect_signed(req, signed):
+                    outcome['waiting'] = True
+                    return outcome
+            else:
+                self._upload(req)
+            outcome['advanced'] = True
+        except Exception as e:
+            failure = e if isinstance(e, StageFailed) else StageFailed(str(e), f'{stage}_error')
+            outcome['error'] = f"ID {req['id']}: {failure}"
+            if failure.fatal and req['status'] != 'failed':
+                dashboard_db.transition(req['id'], 'failed', {'error_message': str(failure)},
+                                        failure.action, str(failure), 'error')
+                req['status'] = 'failed'
+            else:
+                dashboard_db.update_sor_request(req['id'], {'error_message': str(failure)})
+                dashboard_db.log_action(req['id'], failure.action, str(failure), 'error')
+        return outcome
+
+    def run(self, req: Dict, stages: Iterable[str] = None, learner_data: Dict = None,
+            signed: bool = False, skip_signature: bool = None) -> Dict:
+        """
+        Advance one request stage by stage until it is done, waiting on the
+        learner's signature, or a stage fails. Returns
+        {'sor_id', 'status', 'completed': [stages], 'waiting': stage or None, 'error'}.
+        """
+        result = {'sor_id': req['id'], 'status': req['status'], 'completed': [], 'waiting': None, 'error': None}
+        if not self._claim(req['id']):
+            result['error'] = f"ID {req['id']}: Already being processed"
+            return result
+        try:
+            while True:
+                outcome = self.step(req, stages, learner_data=learner_data, signed=signed, skip_signature=skip_signature)
+                if outcome['advanced']:
+                    result['completed'].append(outcome['stage'])
+                    continue
+                if outcome['waiting']:
+                    result['waiting'] = outcome['stage']
+                result['error'] = outcome['error']
+                break
+        finally:
+            self._release(req['id'])
+            dashboard_db.flush_audit()
+        result['status'] = req['status']
+        return result
+
+    def prepare_rerender(self, req: Dict):
+        """
+        Send a pdf_generated or failed request back to pending so the render
+        stage runs again. The new PDF replaces the old document, so a
+        signature request or signed copy for the old one is dropped.
+        """
+        if req['status'] not in RERENDER_STATUSES:
+            raise InvalidTransition(f"ID {req['id']}: cannot regenerate the PDF while the request is {req['status']}")
+        if req['status'] != 'pending':
+            self._transition(req, 'pending', {'signature_request_id': None, 'signed_pdf_path': None},
+                             'pdf_regeneration_requested', f"PDF will be regenerated (was {req['status']})")
+
+    def run_id(self, sor_id: int, **kwargs) -> Dict:
+        req = dashboard_db.get_sor_request(sor_id)
+        if not req:
+            return {'sor_id': sor_id, 'status': None, 'completed': [], 'waiting': None, 'error': f"ID {sor_id}: Request not found"}
+        return self.run(req, **kwargs)
+
+    def resume(self, sor_id: int, **kwargs) -> Dict:
+        """Move a failed or stuck request back to its last valid checkpoint and run it from there"""
+        req = dashboard_db.get_sor_request(sor_id)
+        if not req:
+            return {'sor_id': sor_id, 'status': None, 'completed': [], 'waiting': None, 'error': f"ID {sor_id}: Request not found"}
+
+        checkpoint = self.checkpoint_status(req)
+        if checkpoint != req['status']:
+            if checkpoint not in TRANSITIONS.get(req['status'], ()):
+                raise InvalidTransition(f"ID {sor_id}: cannot resume {req['status']} from {checkpoint}")
+            self._transition(req, checkpoint, {}, 'pipeline_resumed', f"Resumed at {checkpoint} (was {req['status']})")
+        return self.run(req, **kwargs)
+
+    def run_batch(self, reqs: List[Dict], stages: Iterable[str] = STAGES, workers: int = 1,
+                  render_processes: int = None, learner_data: Dict = None, signed: bool = False) -> Dict:
+        """
+        Run many requests stage by stage: every request due for a stage goes
+        through it together (learner data for the render stage is fetched in
+        one pass), then on to the next stage.
+
+        With workers > 1 each stage runs requests on a thread pool and renders
+        on a process pool of render_processes. learner_data, if given, is keyed
+        like fetch_all_learner_data_bulk's result (Moodle user ID, or the name
+        for requests without one).
+        Returns {'outcomes': {sor_id: run()-style result}, 'timings': {...}}.
+        """
+        stages = tuple(stages)
+        timings = {stage: 0.0 for stage in ('fetch',) + STAGES}
+        outcomes = {req['id']: {'sor_id': req['id'], 'status': req['status'], 'completed': [], 'waiting': None, 'error': None}
+                    for req in reqs}
+        claimed = []
+        for req in reqs:
+            if self._claim(req['id']):
+                claimed.append(req)
+            else:
+                outcomes[req['id']]['error'] = f"ID {req['id']}: Already being processed"
+
+        render_pool = lane_pool = None
+        try:
+            if workers > 1:
+                from .pdf_generator import generate_sor_pdf, init_render_worker
+                lane_pool = ThreadPoolExecutor(max_workers=workers)
+                if 'render' in stages:
+                    render_pool = ProcessPoolExecutor(max_workers=render_processes or config.RENDER_PROCESSES,
+                                                      initializer=init_render_worker,
+                                                      initargs=(config.LOGO_PATH_VALID, config.STAMP_PATH_VALID, config.COVER_PATH_VALID))
+
+            for stage in STAGES:
+                if stage not in stages:
+                    continue
+                due = [req for req in claimed if self.next_stage(req) == stage and not outcomes[req['id']]['error']]
+                if not due:
+                    continue
+
+                render = None
+                if stage == 'render':
+                    if learner_data is None:
+                        from .database import db
+                        started = time.perf_counter()
+                        learner_data = db.fetch_all_learner_data_bulk([_learner_key(r) for r in due])
+                        timings['fetch'] += time.perf_counter() - started
+                    if render_pool:
+                        render = lambda *args: render_pool.submit(generate_sor_pdf, *args).result()
+
+                def run_one(req):
+                    data = learner_data.get(_learner_key(req)) if stage == 'render' else None
+                    return self.step(req, (stage,), learner_data=data, render=render, signed=signed)
+
+                started = time.perf_counter()
+                if lane_pool:
+                    results = list(zip(due, lane_pool.map(run_one, due)))
+                else:
+                    results = [(req, run_one(req)) for req in due]
+                timings[stage] += time.perf_counter() - started
+
+                dashboard_db.flush_audit()
+                for req, outcome in results:
+                    result = outcomes[req['id']]
+                    if outcome['advanced']:
+                        result['completed'].append(stage)
+                    result['waiting'] = stage if outcome['waiting'] else None
+                    result['error'] = outcome['error']
+        finally:
+            if lane_pool:
+                lane_pool.shutdown()
+            if render_pool:
+                render_pool.shutdown()
+            for req in claimed:
+                outcomes[req['id']]['status'] = req['status']
+                self._release(req['id'])
+
+        return {'outcomes': outcomes, 'timings': {stage: round(seconds, 3) for stage, seconds in timings.items()}}
+
+    def _claim(self, sor_id: int) -> bool:
+        with self._lock:
+            if sor_id in self._in_flight:
+                return False
+            self._in_flight.add(sor_id)
+            return True
+
+    def _release(self, sor_id: int):
+        with self._lock:
+            self._in_flight.discard(sor_id)
+
+
+# Create shared pipeline instance
+pipeline = Pipeline()
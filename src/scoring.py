@@ -0,0 +1,328 @@
+"""
+Scoring module for SOR Automation System
+Single source of truth for per-quiz achievement, weights, EISA scores and
+overall competency. The overall score is the sum of EISA scores divided by
+the total weight of all configured quizzes, as printed on the SOR.
+"""
+from array import array
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from .config import config
+
+try:
+    import numpy as np
+except ImportError:  # score_many falls back to per-learner scoring
+    np = None
+
+COMPETENT_THRESHOLD = 70
+COMPETENT = "Competent"
+NOT_YET_COMPETENT = "Not Yet Competent"
+
+
+def round2(value: float) -> float:
+    """Round to 2 decimals the way numpy/pandas .round(2) does (scale, round half to even, unscale)"""
+    return round(value * 100.0) / 100.0
+
+
+def pairwise_sum(values: List[float]) -> float:
+    """
+    Sum floats in the same order numpy's pairwise summation uses, so totals
+    match pandas' Series.sum() to the last bit.
+    """
+    n = len(values)
+    if n < 8:
+        total = -0.0
+        for v in values:
+            total += v
+        return total
+    if n <= 128:
+        r = list(values[:8])
+        i = 8
+        while i < n - (n % 8):
+            for j in range(8):
+                r[j] += values[i + j]
+            i += 8
+        total = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+        while i < n:
+            total += values[i]
+            i += 1
+        return total
+    half = n // 2
+    half -= half % 8
+    return pairwise_sum(values[:half]) + pairwise_sum(values[half:])
+
+
+def _to_number(value) -> float:
+    try:
+        return float(value) if value is not None else 0.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def overall_status(overall_score: float) -> str:
+    return COMPETENT if overall_score >= COMPETENT_THRESHOLD else NOT_YET_COMPETENT
+
+
+def score_results(results: List[Dict], quiz_section_map: Dict) -> Tuple[List[Dict], float, str]:
+    """
+    Score one learner's quiz rows.
+
+    Returns (rows, overall_score, overall_status). Each row is the input row
+    plus the columns the SOR results table shows: Section, Module, Credits,
+    Weight (%), Achievement: Percentage and Final EISA Achievement Score.
+    """
+    if not results:
+        return [], 0.00, NOT_YET_COMPETENT
+
+    raw_weights = config.QUIZ_WEIGHTS
+    credits_map = config.QUIZ_CREDITS
+    total_raw_weight = sum(raw_weights.values())
+
+    rows = []
+    for result in results:
+        quiz_id = result.get('quiz_id')
+        learner_score = _to_number(result.get('learner_score'))
+        total_marks = _to_number(result.get('total_marks'))
+        weight = raw_weights.get(quiz_id, 0)
+        section = quiz_section_map.get(quiz_id, {}).get('section_name', 'Unknown Module')
+
+        achievement = round2(learner_score / total_marks * 100) if total_marks else 0.0
+
+        row = dict(result)
+        row.update({
+            'learner_score': learner_score,
+            'total_marks': total_marks,
+            'Section': section,
+            'Module': section,
+            'module_raw_weight': weight,
+            'Credits': int(credits_map.get(quiz_id, 0)),
+            'Achievement: Percentage': achievement,
+            'Final EISA Achievement Score': round2(achievement * weight),
+            'Weight (%)': round2(weight * 100),
+        })
+        rows.append(row)
+
+    overall_score = round2(pairwise_sum([r['Final EISA Achievement Score'] for r in rows]) / total_raw_weight)
+    return rows, overall_score, overall_status(overall_score)
+
+
+def score_one(results: List[Dict]) -> float:
+    """Overall score for one learner's quiz rows"""
+    return score_results(results, {})[1]
+
+
+def _weight_table():
+    """Dense lookup array: index = quiz id, value = raw weight (0 for unweighted quizzes)"""
+    table = np.zeros(max(config.QUIZ_WEIGHTS) + 1)
+    for quiz_id, weight in config.QUIZ_WEIGHTS.items():
+        table[quiz_id] = weight
+    return table
+
+
+def score_many(results_by_learner: Dict[Any, List[Dict]]) -> Dict[Any, float]:
+    """
+    Overall scores for a whole cohort in one pass.
+
+    Takes {learner key: quiz rows} and returns {learner key: overall score},
+    identical to score_one per learner. With NumPy the per-row maths runs
+    vectorized over every row of the cohort at once.
+    """
+    if np is None:
+        return {key: score_one(rows) for key, rows in results_by_learner.items()}
+
+    keys = list(results_by_learner)
+    counts = [len(results_by_learner[k]) for k in keys]
+    flat = [row for k in keys for row in results_by_learner[k]]
+    if not flat:
+        return {key: 0.00 for key in keys}
+
+    quiz_ids = np.fromiter((int(r.get('quiz_id') or 0) for r in flat), dtype=np.int64, count=len(flat))
+    scores = np.fromiter((_to_number(r.get('learner_score')) for r in flat), dtype=np.float64, count=len(flat))
+    totals = np.fromiter((_to_number(r.get('total_marks')) for r in flat), dtype=np.float64, count=len(flat))
+
+    table = _weight_table()
+    known = (quiz_ids >= 0) & (quiz_ids < len(table))
+    weights = np.where(known, table[np.where(known, quiz_ids, 0)], 0.0)
+
+    has_marks = totals != 0
+    achievement = np.where(has_marks, np.round(scores / np.where(has_marks, totals, 1.0) * 100, 2), 0.0)
+    eisa = np.round(achievement * weights, 2)
+
+    total_raw_weight = sum(config.QUIZ_WEIGHTS.values())
+    overall = {}
+    start = 0
+    for key, count in zip(keys, counts):
+        if count == 0:
+            overall[key] = 0.00
+        else:
+            # np.add.reduce on a contiguous slice uses the same pairwise order as score_results
+            overall[key] = round2(float(np.add.reduce(eisa[start:start + count])) / total_raw_weight)
+        start += count
+    return overall
+
+
+# ===== Cohort results matrix =====
+
+# mdl_quiz_attempts.sumgrades / mdl_quiz.sumgrades are DECIMAL(10,5)
+MARK_DECIMALS = 5
+
+
+@dataclass
+class ResultsMatrix:
+    """
+    Learners x quizzes results: row i is learner_ids[i], column j is
+    quiz_ids[j] (ascending quiz id). scores and totals are float32 and 0
+    where the learner has no counted attempt; attempted marks the cells that
+    came from an attempt.
+    """
+    scores: Any
+    totals: Any
+    attempted: Any
+    learner_ids: Any
+    quiz_ids: Any
+    learner_index: Dict[int, int]
+    quiz_index: Dict[int, int]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.scores.shape
+
+    def row(self, learner_id: int) -> Optional[int]:
+        return self.learner_index.get(int(learner_id))
+
+
+def build_results_matrix(rows: Iterable[Tuple], quiz_ids: List[int] = None) -> ResultsMatrix:
+    """
+    Dense matrix from streamed (userid, quiz_id, score, total) rows, one per
+    learner and quiz. Rows are packed into typed arrays as they arrive and
+    scattered into the matrix in one step, so memory stays close to the
+    final float32 arrays.
+    """
+    if np is None:
+        raise ImportError("numpy is required for the results matrix")
+    # Columns in quiz id order, the order results_sql returns a learner's rows in
+    quiz_ids = sorted(config.QUIZ_WEIGHTS if quiz_ids is None else quiz_ids)
+    quiz_index = {quiz_id: j for j, quiz_id in enumerate(quiz_ids)}
+
+    users, cols, scores, totals = array('q'), array('q'), array('f'), array('f')
+    for userid, quiz_id, score, total in rows:
+        col = quiz_index.get(quiz_id)
+        if col is None:
+            continue
+        users.append(userid)
+        cols.append(col)
+        scores.append(score or 0.0)
+        totals.append(total or 0.0)
+
+    learner_ids, row_idx = np.unique(np.frombuffer(users, dtype=np.int64), return_inverse=True)
+    col_idx = np.frombuffer(cols, dtype=np.int64)
+    shape = (len(learner_ids), len(quiz_ids))
+
+    score_m = np.zeros(shape, dtype=np.float32)
+    total_m = np.zeros(shape, dtype=np.float32)
+    attempted = np.zeros(shape, dtype=bool)
+    score_m[row_idx, col_idx] = np.frombuffer(scores, dtype=np.float32)
+    total_m[row_idx, col_idx] = np.frombuffer(totals, dtype=np.float32)
+    attempted[row_idx, col_idx] = True
+
+    return ResultsMatrix(score_m, total_m, attempted, learner_ids, np.array(quiz_ids, dtype=np.int64),
+                         {int(uid): i for i, uid in enumerate(learner_ids)}, quiz_index)
+
+
+def _pairwise_rows(values):
+    """pairwise_sum applied to every row of a 2-D array whose rows all have the same length"""
+    n = values.shape[1]
+    if n < 8:
+        total = np.full(values.shape[0], -0.0)
+        for j in range(n):
+            total = total + values[:, j]
+        return total
+    if n <= 128:
+        r = [values[:, j].copy() for j in range(8)]
+        i = 8
+        while i < n - (n % 8):
+            for j in range(8):
+                r[j] += values[:, i + j]
+            i += 8
+        total = ((r[0] + r[1]) + (r[2] + r[3])) + ((r[4] + r[5]) + (r[6] + r[7]))
+        while i < n:
+            total = total + values[:, i]
+            i += 1
+        return total
+    half = n // 2
+    half -= half % 8
+    return _pairwise_rows(values[:, :half]) + _pairwise_rows(values[:, half:])
+
+
+def score_matrix(matrix: ResultsMatrix):
+    """
+    Overall score per learner (float64 array, matrix row order) for the whole
+    cohort at once, identical to score_one on the learner's rows in quiz order.
+
+    Marks are snapped back to sumgrades' 5 decimals first, which restores
+    them exactly when they fit float32's ~7 significant digits (any mark
+    with 2 decimals does); longer marks may come out 0.01 off.
+    """
+    weights = np.array([config.QUIZ_WEIGHTS.get(int(q), 0) for q in matrix.quiz_ids], dtype=np.float64)
+    scores = np.round(matrix.scores.astype(np.float64), MARK_DECIMALS)
+    totals = np.round(matrix.totals.astype(np.float64), MARK_DECIMALS)
+
+    has_marks = totals != 0
+    achievement = np.where(has_marks, np.round(scores / np.where(has_marks, totals, 1.0) * 100, 2), 0.0)
+    eisa = np.round(achievement * weights, 2)
+
+    # score_one sums only the quizzes a learner attempted, in numpy's pairwise order, so pack
+    # each row's attempted cells to the left and sum rows with the same count together
+    counts = matrix.attempted.sum(axis=1)
+    packed = np.take_along_axis(eisa, np.argsort(~matrix.attempted, axis=1, kind='stable'), axis=1)
+    sums = np.zeros(len(counts))
+    for n in np.unique(counts):
+        if n:
+            rows = counts == n
+            sums[rows] = _pairwise_rows(packed[rows, :n])
+    return np.round(sums / sum(config.QUIZ_WEIGHTS.values()), 2)
+
+
+def competent_mask(overall_scores):
+    """Boolean array: True where the overall score reaches COMPETENT_THRESHOLD"""
+    return np.asarray(overall_scores) >= COMPETENT_THRESHOLD
+
+
+def score_stats(overall_scores, bins: int = 10) -> Dict:
+    """Cohort summary of overall scores: spread, competency rate and a 0-100 histogram"""
+    overall = np.asarray(overall_scores, dtype=np.float64)
+    counts, edges = np.histogram(overall, bins=bins, range=(0, 100))
+    if overall.size == 0:
+        return {'learners': 0, 'competent': 0, 'competent_rate': None, 'mean': None, 'median': None,
+                'p10': None, 'p90': None, 'histogram': {'counts': counts.tolist(), 'edges': edges.tolist()}}
+    competent = int(competent_mask(overall).sum())
+    p10, median, p90 = np.percentile(overall, [10, 50, 90])
+    return {
+        'learners': int(overall.size),
+        'competent': competent,
+        'competent_rate': round(competent / overall.size, 4),
+        'mean': round(float(overall.mean()), 2),
+        'median': round(float(median), 2),
+        'p10': round(float(p10), 2),
+        'p90': round(float(p90), 2),
+        'histogram': {'counts': counts.tolist(), 'edges': edges.tolist()},
+    }
+
+
+def group_by_section(rows: List[Dict]) -> List[Tuple[str, List[Dict]]]:
+    """Rows grouped by Section, sections in order of first appearance"""
+    sections = {}
+    for row in rows:
+        sections.setdefault(row['Section'], []).append(row)
+    return list(sections.items())
+
+
+def print_results_table(rows: List[Dict], overall_score: float, status: str, limit: int = 10):
+    """Console summary of the per-quiz results"""
+    print("\n--- Per-quiz results ---")
+    print(f"{'Section':<28} {'Topic':<32} {'Score':>7} {'Total':>7} {'Ach %':>7} {'Wt %':>7} {'EISA':>8}")
+    for row in rows[:limit]:
+        print(f"{str(row['Section'])[:28]:<28} {str(row.get('topic_name', ''))[:32]:<32} "
+              f"{row['learner_score']:>7.2f} {row['total_marks']:>7.2f} {row['Achievement: Percentage']:>7.2f} "
+              f"{row['Weight (%)']:>7.2f} {row['Final EISA Achievement Score']:>8.2f}")
+    print(f"\nOverall Score: {overall_score:.2f}% - {status}\n")
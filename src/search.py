@@ -0,0 +1,175 @@
+"""
+Search module for SOR Automation System
+Learner name/email search over sor_requests: SQL clause builder for the
+FULLTEXT (ngram) index and an optional in-memory trigram index for typeahead
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from datetime import datetime
+import heapq
+import threading
+
+# Terms shorter than the server's ngram_token_size (default 2) can't use the
+# FULLTEXT index, so they take the prefix path on the B-tree indexes instead
+MIN_FULLTEXT_TERM = 2
+
+
+def normalize(term: str) -> str:
+    return (term or '').strip().lower()
+
+
+def search_clause(term: str, fulltext: bool = True) -> Tuple[str, List]:
+    """
+    WHERE fragment and params matching learner_name/learner_email against term.
+
+    - short terms: prefix LIKE 'term%' (range scan on idx_learner_name/idx_learner_email)
+    - otherwise with fulltext: ngram phrase match on ft_learner
+    - otherwise: LIKE '%term%' (full scan; used when the FULLTEXT index is missing)
+    """
+    term = term.strip()
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    if len(term) < MIN_FULLTEXT_TERM:
+        prefix = f"{escaped}%"
+        return "(learner_name LIKE %s OR learner_email LIKE %s)", [prefix, prefix]
+    if fulltext:
+        phrase = '"' + term.replace('"', ' ') + '"'
+        return "MATCH(learner_name, learner_email) AGAINST (%s IN BOOLEAN MODE)", [phrase]
+    contains = f"%{escaped}%"
+    return "(learner_name LIKE %s OR learner_email LIKE %s)", [contains, contains]
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class TrigramIndex:
+    """
+    In-memory trigram index over sor_requests learner names and emails.
+
+    Matches are case-insensitive substring matches, the same rows LIKE
+    '%term%' would return. Terms of three or more characters are answered
+    from trigram posting sets and verified, shorter ones by scanning. The
+    index is refreshed incrementally from rows changed since the last
+    refresh (by updated_at).
+    """
+
+    def __init__(self):
+        self._docs: Dict[int, Tuple[str, Dict]] = {}
+        self._postings: Dict[str, Set[int]] = {}
+        self._lock = threading.RLock()
+        self.last_refresh: Optional[datetime] = None
+        self.high_water: Optional[datetime] = None
+        self._order: Optional[List[int]] = None
+
+    def __len__(self):
+        return len(self._docs)
+
+    def _text(self, row: Dict) -> str:
+        return f"{row.get('learner_name') or ''}\n{row.get('learner_email') or ''}".lower()
+
+    def _unindex(self, row_id: int):
+        doc = self._docs.pop(row_id, None)
+        if doc is None:
+            return
+        for gram in _trigrams(doc[0]):
+            ids = self._postings.get(gram)
+            if ids is not None:
+                ids.discard(row_id)
+                if not ids:
+                    del self._postings[gram]
+
+    def upsert(self, rows: Iterable[Dict]):
+        """Add or replace rows (id, learner_name, learner_email, updated_at plus any display columns)"""
+        with self._lock:
+            self._order = None
+            for row in rows:
+                row_id = row['id']
+                text = self._text(row)
+                updated_at = row.get('updated_at')
+                if updated_at and (self.high_water is None or updated_at > self.high_water):
+                    self.high_water = updated_at
+
+                current = self._docs.get(row_id)
+                if current is None or current[0] != text:
+                    self._unindex(row_id)
+                    for gram in _trigrams(text):
+                        self._postings.setdefault(gram, set()).add(row_id)
+                self._docs[row_id] = (text, dict(row))
+
+    def remove(self, row_ids: Iterable[int]):
+        with self._lock:
+            self._order = None
+            for row_id in row_ids:
+                self._unindex(row_id)
+
+    def rebuild(self, rows: Iterable[Dict]):
+        with self._lock:
+            self._docs.clear()
+            self._postings.clear()
+            self.high_water = None
+            self.upsert(rows)
+            self.last_refresh = datetime.now()
+
+    def _rank(self, row_id: int):
+        return (self._docs[row_id][1].get('updated_at') or datetime.min, row_id)
+
+    def _ordered_ids(self) -> List[int]:
+        """All IDs newest updated_at first (re-sorted lazily after changes)"""
+        if self._order is None:
+            self._order = sorted(self._docs, key=self._rank, reverse=True)
+        return self._order
+
+    def search_ids(self, term: str, limit: Optional[int] = None) -> List[int]:
+        """IDs whose name or email contains term, newest updated_at first"""
+        term = normalize(term)
+        with self._lock:
+            order = self._ordered_ids()
+            if not term:
+                return order[:limit] if limit else list(order)
+
+            if len(term) >= 3:
+                postings = sorted((self._postings.get(g, set()) for g in _trigrams(term)), key=len)
+                if not postings[0]:
+                    return []
+                if len(postings[0]) * 16 < len(order):
+                    # Selective term: verify and rank just the candidates
+                    matches = [i for i in set.intersection(*postings) if term in self._docs[i][0]]
+                    return heapq.nlargest(limit, matches, key=self._rank) if limit else sorted(matches, key=self._rank, reverse=True)
+
+            # Broad or short term: walk newest-first and stop once the page is full
+            matches = []
+            for i in order:
+                if term in self._docs[i][0]:
+                    matches.append(i)
+                    if limit and len(matches) >= limit:
+                        break
+            return matches
+
+    def search(self, term: str, limit: Optional[int] = None) -> List[Dict]:
+        """Indexed rows whose name or email contains term, newest updated_at first"""
+        ids = self.search_ids(term, limit)
+        with self._lock:
+            return [self._docs[i][1] for i in ids if i in self._docs]
+
+    def is_stale(self, max_age_seconds: float) -> bool:
+        return self.last_refresh is None or (datetime.now() - self.last_refresh).total_seconds() >= max_age_seconds
+
+    def refresh(self, dashboard_db, full: bool = False):
+        """Pull rows changed since the last refresh (or everything when full)"""
+        since = None if full or self.high_water is None else self.high_water
+        rows = dashboard_db.get_search_rows(since)
+        if since is None:
+            self.rebuild(rows)
+        else:
+            with self._lock:
+                self.upsert(rows)
+                self.last_refresh = datetime.now()
+        return len(rows)
+
+    @property
+    def stats(self) -> Dict:
+        return {'documents': len(self._docs), 'trigrams': len(self._postings),
+                'high_water': self.high_water.isoformat() if self.high_water else None}
+
+
+# Create shared typeahead index instance (populated when SEARCH_INDEX_ENABLED)
+search_index = TrigramIndex()
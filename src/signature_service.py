@@ -2,11 +2,19 @@
 Signature service module for SOR Automation System
 Handles Dropbox Sign API interactions
 """
-from requests.auth import HTTPBasicAuth
-import requests
+import hashlib
+import hmac
 import time
 import os
 from .config import config
+from .http_client import http_client
+
+API_BASE_URL = "https://api.hellosign.com/v3"
+
+
+def _auth():
+    """Basic auth tuple (API key as username) accepted by both sync and async clients"""
+    return (config.DROPBOX_SIGN_API_KEY or '', '')
 
 def send_signature_request(pdf_path: str, learner_email: str, learner_name: str):
     """
@@ -15,8 +23,7 @@ def send_signature_request(pdf_path: str, learner_email: str, learner_name: str)
     """
     file_handle = None
     try:
-        url = "https://api.hellosign.com/v3/signature_request/send"
-        auth = HTTPBasicAuth(config.DROPBOX_SIGN_API_KEY, '')
+        url = f"{API_BASE_URL}/signature_request/send"
 
         file_handle = open(pdf_path, 'rb')
         files = {
@@ -36,7 +43,8 @@ def send_signature_request(pdf_path: str, learner_email: str, learner_name: str)
             'test_mode': 1,  # Set to 1 for test mode (free), 0 for production (requires paid account)
         }
 
-        response = requests.post(url, auth=auth, files=files, data=data)
+        # Never retried: a resend would create a second signature request
+        response = http_client.post(url, auth=_auth(), files=files, data=data, retries=0)
         response.raise_for_status()
         result = response.json()
 
@@ -74,11 +82,10 @@ def wait_for_signature(signature_request_id: str, max_wait_minutes: int = 60, ch
 
 def check_signature_status(signature_request_id: str):
     """Check if signature request has been completed"""
-    url = f"https://api.hellosign.com/v3/signature_request/{signature_request_id}"
-    auth = HTTPBasicAuth(config.DROPBOX_SIGN_API_KEY, '')
+    url = f"{API_BASE_URL}/signature_request/{signature_request_id}"
 
     try:
-        response = requests.get(url, auth=auth, timeout=15)
+        response = http_client.get(url, auth=_auth(), timeout=15)
         response.raise_for_status()
         result = response.json()
 
@@ -103,15 +110,14 @@ def check_signature_status(signature_request_id: str):
 
 def download_signed_document(signature_request_id: str, output_path: str, max_retries: int = 10, retry_delay: int = 15):
     """Download the signed PDF from Dropbox Sign"""
-    url = f"https://api.hellosign.com/v3/signature_request/files/{signature_request_id}"
-    auth = HTTPBasicAuth(config.DROPBOX_SIGN_API_KEY, '')
+    url = f"{API_BASE_URL}/signature_request/files/{signature_request_id}"
     params = {'file_type': 'pdf'}
 
     for attempt in range(max_retries):
         print(f"[DOWNLOAD] Attempt {attempt + 1}/{max_retries} to download signed document...")
 
         try:
-            response = requests.get(url, auth=auth, params=params, stream=True, timeout=30)
+            response = http_client.get(url, auth=_auth(), params=params, stream=True, timeout=30)
 
             if response.status_code == 409:
                 print("   [...] Document not ready yet. Waiting...")
@@ -136,6 +142,29 @@ def download_signed_document(signature_request_id: str, output_path: str, max_re
     print("[X] Failed to download signed document after all retries")
     return False
 
+def verify_callback_event(event: dict) -> bool:
+    """
+    Verify a Dropbox Sign callback event.
+    event_hash is HMAC-SHA256(key=API key, message=event_time + event_type).
+    Without an API key nothing verifies: an empty key would let anyone forge events.
+    """
+    if not config.DROPBOX_SIGN_API_KEY:
+        print("[X] DROPBOX_SIGN_API_KEY is not set; rejecting callback event")
+        return False
+    try:
+        event_time = str(event.get('event_time', ''))
+        event_type = str(event.get('event_type', ''))
+        event_hash = str(event.get('event_hash', ''))
+        expected = hmac.new(
+            config.DROPBOX_SIGN_API_KEY.encode(),
+            (event_time + event_type).encode(),
+            hashlib.sha256
+        ).hexdigest()
+        return bool(event_hash) and hmac.compare_digest(expected, event_hash)
+    except Exception as e:
+        print(f"[X] Failed to verify callback event: {e}")
+        return False
+
 
 class SignatureService:
     """Wrapper class for signature functions"""
@@ -0,0 +1,143 @@
+"""
+Background worker for SOR Automation System
+Claims jobs from sor_jobs and runs the handlers in src/jobs.py.
+
+Usage: python -m src.worker [--concurrency N] [--once]
+"""
+from typing import Optional
+import argparse
+import os
+import signal
+import socket
+import threading
+import time
+import traceback
+from .config import config
+from .dashboard_db import dashboard_db
+from .job_queue import job_queue, PermanentJobError, JOB_DEAD
+from .jobs import HANDLERS
+from .pdf_generator import validate_image_path
+
+
+class Worker:
+    """
+    Polls the queue and runs one job at a time per thread. While a job
+    runs, a heartbeat keeps its lease alive; if the process dies the lease
+    lapses and requeue_expired (run by any worker) puts the job back.
+    """
+
+    def __init__(self, concurrency: int = 1, poll_seconds: float = None):
+        self.concurrency = max(1, concurrency)
+        self.poll_seconds = config.JOB_POLL_SECONDS if poll_seconds is None else poll_seconds
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._stop = threading.Event()
+        self.stats = {'succeeded': 0, 'retried': 0, 'dead': 0}
+        self._stats_lock = threading.Lock()
+
+    def stop(self, *args):
+        if not self._stop.is_set():
+            print("\n[!] Stopping after current jobs finish...")
+        self._stop.set()
+
+    def _count(self, key: str):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def run_job(self, job, worker_id: str):
+        """Run one claimed job to completion, keeping its lease alive"""
+        job_id = job['id']
+        handler = HANDLERS.get(job['job_type'])
+        print(f"[>] Job {job_id} {job['job_type']} (attempt {job['attempts']}/{job['max_attempts']})")
+
+        done = threading.Event()
+
+        def keep_alive():
+            while not done.wait(config.JOB_LEASE_SECONDS / 3):
+                job_queue.heartbeat(job_id, worker_id)
+
+        def progress(message: str):
+            job_queue.heartbeat(job_id, worker_id, progress=message[:255])
+
+        heartbeat = threading.Thread(target=keep_alive, daemon=True)
+        heartbeat.start()
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler for job type '{job['job_type']}'")
+            result = handler(job['payload'] or {}, progress)
+            job_queue.complete(job_id, worker_id, result)
+            self._count('succeeded')
+            print(f"[OK] Job {job_id} succeeded")
+        except Exception as e:
+            permanent = isinstance(e, PermanentJobError)
+            error = str(e) if permanent else f"{type(e).__name__}: {e}"
+            status = job_queue.fail(job_id, worker_id, error, permanent=permanent)
+            if status == JOB_DEAD:
+                self._count('dead')
+                print(f"[X] Job {job_id} dead-lettered: {e}")
+                if not permanent:
+                    traceback.print_exc()
+            else:
+                self._count('retried')
+                print(f"[!] Job {job_id} failed, will retry: {e}")
+        finally:
+            done.set()
+            dashboard_db.flush_audit()
+
+    def _loop(self, slot: int, once: bool):
+        worker_id = f"{self.worker_id}:{slot}"
+        last_sweep = 0.0
+        while not self._stop.is_set():
+            try:
+                now = time.monotonic()
+                if slot == 0 and now - last_sweep >= config.JOB_LEASE_SECONDS / 3:
+                    requeued = job_queue.requeue_expired()
+                    if requeued:
+                        print(f"[!] Requeued {requeued} job(s) with expired leases")
+                    last_sweep = now
+
+                job = job_queue.claim(worker_id)
+                if job:
+                    self.run_job(job, worker_id)
+                    continue
+                if once:
+                    return
+            except Exception as e:
+                print(f"[X] Worker error: {e}")
+            self._stop.wait(self.poll_seconds)
+
+    def run(self, once: bool = False):
+        """Run until stopped (or, with once, until the queue is empty)"""
+        print("=" * 60)
+        print(f"SOR job worker {self.worker_id} ({self.concurrency} thread(s))")
+        print(f"Handlers: {', '.join(sorted(HANDLERS))}")
+        print("=" * 60)
+
+        threads = [threading.Thread(target=self._loop, args=(slot, once), daemon=True)
+                   for slot in range(self.concurrency)]
+        for t in threads:
+            t.start()
+        while any(t.is_alive() for t in threads):
+            for t in threads:
+                t.join(timeout=0.5)
+        print(f"Worker stopped: {self.stats}")
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description="Run the SOR background job worker")
+    parser.add_argument('--concurrency', type=int, default=config.JOB_WORKER_CONCURRENCY)
+    parser.add_argument('--once', action='store_true', help="exit when the queue is empty")
+    args = parser.parse_args(argv)
+
+    # PDFs rendered by jobs need the logo, stamp and cover resolved up front
+    config.LOGO_PATH_VALID = validate_image_path(config.LOGO_PATH, "LOGO")
+    config.STAMP_PATH_VALID = validate_image_path(config.STAMP_PATH, "STAMP")
+    config.COVER_PATH_VALID = validate_image_path(config.COVER_PATH, "COVER")
+
+    worker = Worker(concurrency=args.concurrency)
+    signal.signal(signal.SIGINT, worker.stop)
+    signal.signal(signal.SIGTERM, worker.stop)
+    worker.run(once=args.once)
+
+
+if __name__ == "__main__":
+    main()
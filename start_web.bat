@@ -17,6 +17,10 @@ if not exist "web\node_modules" (
 echo Starting Flask API on http://localhost:5000...
 start /min cmd /c "python api\app.py"
 
+:: Start background job worker (PDFs, signatures, uploads queued by the API)
+echo Starting background job worker...
+start /min cmd /c "python -m src.worker"
+
 :: Wait a moment for API to start
 timeout /t 3 /nobreak >nul
 
@@ -0,0 +1,91 @@
+"""
+Query plan regression test
+EXPLAINs the hot learner queries against the Moodle database and fails if
+any of them scans a whole table instead of using an index. Run after schema
+or query changes.
+
+Usage: python test_query_plans.py [learner_name]
+"""
+import sys
+from src.config import config
+from src.database import (db, name_match_clause, results_sql, results_matrix_sql, ATTEMPT_POLICIES,
+                          LEARNER_BY_ID_SQL, LEARNER_ID_BY_NAME_SQL)
+
+USER_INFO_SQL = ("SELECT fid.id AS field_id, fid.name AS fieldname, ud.data FROM mdl_user_info_data ud "
+                 "JOIN mdl_user_info_field fid ON ud.fieldid = fid.id WHERE ud.userid = %s")
+
+# What fetch_learner_by_name used to run, shown for comparison
+OLD_NAME_SQL = ("SELECT id, firstname, lastname, email FROM mdl_user "
+                "WHERE CONCAT(firstname, ' ', lastname) = %s LIMIT 1")
+
+
+def explain(cur, sql, params):
+    cur.execute("EXPLAIN " + sql, params)
+    return cur.fetchall()
+
+
+def full_scans(plan):
+    """Plan rows that read a base table without an index (derived tables are skipped)"""
+    return [row for row in plan
+            if row.get('table') and not row['table'].startswith('<')
+            and (row.get('type') == 'ALL' or (row.get('type') != 'const' and not row.get('key')))]
+
+
+def print_plan(label, plan):
+    print(f"\n{label}")
+    for row in plan:
+        print(f"   {row.get('table')}: type={row.get('type')} key={row.get('key')} rows={row.get('rows')}")
+
+
+def hot_queries(user_id, learner_name):
+    clause, params = name_match_clause([learner_name])
+    bulk_clause, bulk_params = name_match_clause([learner_name, 'Jane van der Merwe'])
+    return [
+        ('learner by id', LEARNER_BY_ID_SQL, (user_id,)),
+        *[(f'results by id ({policy})', results_sql("userid = %s", policy), (user_id,))
+          for policy in ATTEMPT_POLICIES],
+        ('results by ids (cohort, best)', results_sql("userid IN (%s, %s)", 'best', with_userid=True),
+         (user_id, user_id + 1)),
+        ('profile by id', USER_INFO_SQL, (user_id,)),
+        ('results matrix (course)', results_matrix_sql(list(config.QUIZ_WEIGHTS), 'best'), (config.COURSE_ID,)),
+        ('name -> id', LEARNER_ID_BY_NAME_SQL.format(clause=clause), params),
+        ('names -> learners (bulk)', f"SELECT id FROM mdl_user WHERE {bulk_clause} ORDER BY id", bulk_params),
+    ]
+
+
+def test_hot_queries_use_indexes(learner_name=None):
+    learner_name = learner_name or config.TEST_LEARNER_NAME
+    user_id = db.resolve_learner_id(learner_name)
+    if not user_id:
+        print(f"[!] Learner '{learner_name}' not found; plans use user ID 1")
+        user_id = 1
+
+    failures = []
+    with db.get_connection() as conn, conn.cursor() as cur:
+        print_plan("old CONCAT name match (expected to scan mdl_user)",
+                   explain(cur, OLD_NAME_SQL, (learner_name,)))
+        for label, sql, params in hot_queries(user_id, learner_name):
+            plan = explain(cur, sql, params)
+            print_plan(label, plan)
+            for row in full_scans(plan):
+                failures.append(f"{label}: full scan of {row.get('table')}")
+
+    print("\n" + "=" * 60)
+    if failures:
+        for failure in failures:
+            print(f"[X] {failure}")
+    else:
+        print("[OK] All hot queries use indexes")
+    assert not failures, failures
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("Query plan check")
+    print("=" * 60)
+    if not db.test_connection():
+        sys.exit(1)
+    try:
+        test_hot_queries_use_indexes(sys.argv[1] if len(sys.argv) > 1 else None)
+    except AssertionError:
+        sys.exit(1)
@@ -0,0 +1,107 @@
+"""
+Golden-output test for the scoring engine
+Checks scoring.score_results against the pandas process_results_data path
+"""
+import random
+from decimal import Decimal
+import pandas as pd
+from src.config import config
+from src.pdf_generator import process_results_data
+from src.scoring import build_results_matrix, score_many, score_matrix, score_results, score_stats
+
+COLUMNS = ["quiz_id", "Section", "Module", "Credits", "Weight (%)", "Achievement: Percentage", "Final EISA Achievement Score"]
+
+QUIZ_SECTION_MAP = {q: {'section_number': 1 if q < 17 else 2, 'section_name': 'Knowledge Modules' if q < 17 else 'Practical Skill Modules'}
+                    for q in config.QUIZ_WEIGHTS}
+
+
+def make_results(rng, quiz_ids):
+    rows = []
+    for quiz_id in quiz_ids:
+        total = rng.choice([10, 12.5, 20, 0, None, Decimal('15.00000')])
+        score = rng.choice([None, 0, Decimal(str(round(rng.uniform(0, 20), 5))), rng.uniform(0, 20)])
+        rows.append({'learner_name': 'Golden Learner', 'quiz_id': quiz_id, 'topic_name': f'Topic {quiz_id}',
+                     'learner_score': score, 'total_marks': total})
+    return rows
+
+
+def assert_same(results):
+    expected_df, expected_score, expected_status = process_results_data(pd.DataFrame(results), QUIZ_SECTION_MAP, "Knowledge Modules")
+    rows, score, status = score_results(results, QUIZ_SECTION_MAP)
+
+    assert score == expected_score, (score, expected_score)
+    assert status == expected_status, (status, expected_status)
+    assert len(rows) == len(expected_df)
+    for row, (_, expected) in zip(rows, expected_df.iterrows()):
+        for col in COLUMNS:
+            assert row[col] == expected[col], (col, row[col], expected[col])
+
+
+def test_full_set():
+    assert_same([{'learner_name': 'A', 'quiz_id': q, 'topic_name': f'T{q}', 'learner_score': Decimal('7.00000'),
+                  'total_marks': Decimal('10.00000')} for q in config.QUIZ_WEIGHTS])
+
+
+def test_empty():
+    rows, score, status = score_results([], QUIZ_SECTION_MAP)
+    assert (rows, score, status) == ([], 0.00, "Not Yet Competent")
+
+
+def test_unknown_quiz_and_zero_marks():
+    assert_same([
+        {'learner_name': 'A', 'quiz_id': 99, 'topic_name': 'Extra', 'learner_score': 5, 'total_marks': 10},
+        {'learner_name': 'A', 'quiz_id': 12, 'topic_name': 'T12', 'learner_score': 5, 'total_marks': 0},
+        {'learner_name': 'A', 'quiz_id': 13, 'topic_name': 'T13', 'learner_score': None, 'total_marks': None},
+    ])
+
+
+def test_randomised_cohort():
+    rng = random.Random(119458)
+    quiz_ids = list(config.QUIZ_WEIGHTS)
+    for _ in range(500):
+        # Includes duplicate attempts and partial quiz sets
+        picks = [rng.choice(quiz_ids) for _ in range(rng.randint(1, 20))]
+        assert_same(make_results(rng, picks))
+
+
+def test_score_many_matches_score_results():
+    rng = random.Random(20261017)
+    quiz_ids = list(config.QUIZ_WEIGHTS) + [99]
+    cohort = {f'Learner {i}': make_results(rng, [rng.choice(quiz_ids) for _ in range(rng.randint(0, 200))])
+              for i in range(300)}
+    scores = score_many(cohort)
+    assert list(scores) == list(cohort)
+    for key, results in cohort.items():
+        assert scores[key] == score_results(results, QUIZ_SECTION_MAP)[1], key
+
+
+def test_results_matrix_matches_score_many():
+    rng = random.Random(8)
+    quiz_ids = list(config.QUIZ_WEIGHTS)
+    cohort = {}
+    for user_id in rng.sample(range(1, 100000), 2000):
+        # One counted attempt per quiz, in quiz order as results_sql returns them
+        picked = sorted(rng.sample(quiz_ids, rng.randint(0, len(quiz_ids))))
+        cohort[user_id] = [{'quiz_id': q, 'learner_score': round(rng.uniform(0, 20), rng.choice([0, 2, 5])),
+                            'total_marks': rng.choice([20.0, 12.5, 0.0])} for q in picked]
+    streamed = [(uid, r['quiz_id'], r['learner_score'], r['total_marks']) for uid, rows in cohort.items() for r in rows]
+    streamed.append((1, 99, 5.0, 10.0))  # not a weighted quiz: ignored
+
+    matrix = build_results_matrix(iter(streamed))
+    assert matrix.shape == (len([u for u, rows in cohort.items() if rows]), len(quiz_ids))
+    overall = score_matrix(matrix)
+    expected = score_many(cohort)
+    for user_id, i in matrix.learner_index.items():
+        assert overall[i] == expected[user_id], (user_id, overall[i], expected[user_id])
+
+    stats = score_stats(overall)
+    assert stats['learners'] == matrix.shape[0]
+    assert sum(stats['histogram']['counts']) == matrix.shape[0]
+    assert stats['competent'] == sum(1 for s in overall if s >= 70)
+
+
+if __name__ == "__main__":
+    for test in [test_full_set, test_empty, test_unknown_quiz_and_zero_marks, test_randomised_cohort,
+                 test_score_many_matches_score_results, test_results_matrix_matches_score_many]:
+        test()
+        print(f"[OK] {test.__name__}")
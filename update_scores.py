@@ -3,7 +3,7 @@ Update existing SOR requests with scores from learner data
 """
 from src.dashboard_db import dashboard_db
 from src.database import db
-from src.pdf_generator import calculate_overall_score
+from src.scoring import score_many
 
 def update_all_scores():
     """Update all SOR requests with their actual scores"""
@@ -21,6 +21,10 @@ def update_all_scores():
     print(f"\nFound {len(requests)} SOR requests")
     print("\nUpdating scores...")
 
+    # One bulk results query for the whole cohort, then one scoring pass
+    results_by_learner = db.fetch_results_by_names([r['learner_name'] for r in requests])
+    scores = score_many(results_by_learner)
+
     updated = 0
     skipped = 0
 
@@ -29,18 +33,15 @@ def update_all_scores():
         learner_name = request['learner_name']
         current_score = request.get('overall_score')
 
-        # Fetch learner data from database
-        learner_data = db.fetch_all_learner_data(learner_name)
-
-        if not learner_data:
+        if learner_name not in scores:
             print(f"[X] ID {sor_id}: Could not find learner data for '{learner_name}'")
             skipped += 1
             continue
 
-        # Calculate the overall score from quiz results
-        overall_score = calculate_overall_score(learner_data)
+        overall_score = scores[learner_name]
 
-        if current_score == overall_score:
+        # overall_score comes back from MySQL as a Decimal
+        if current_score is not None and round(float(current_score), 2) == overall_score:
             print(f"[SKIP] ID {sor_id}: {learner_name} - Score already correct ({overall_score:.2f}%)")
             skipped += 1
         else:
@@ -0,0 +1,68 @@
+"""
+Watch live events
+Connects to the API's Server-Sent Events stream and prints each request
+status transition and stats delta as it arrives. Open several to check
+that they share one watcher (GET /api/events/stats).
+
+Usage: python watch_events.py [api_url] [last_event_id]
+"""
+import json
+import sys
+import requests
+
+
+def read_events(response):
+    """Yield (event_id, event, data) for each frame of an SSE response"""
+    event_id, event, data = None, 'message', []
+    for line in response.iter_lines(decode_unicode=True):
+        if line is None:
+            continue
+        if line == '':
+            if data:
+                yield event_id, event, json.loads('\n'.join(data))
+            event, data = 'message', []
+        elif line.startswith(':'):
+            continue
+        else:
+            field, _, value = line.partition(':')
+            value = value[1:] if value.startswith(' ') else value
+            if field == 'id':
+                event_id = value
+            elif field == 'event':
+                event = value
+            elif field == 'data':
+                data.append(value)
+
+
+def watch(api_url: str = 'http://localhost:5000', last_event_id: str = None):
+    headers = {'Accept': 'text/event-stream'}
+    if last_event_id:
+        headers['Last-Event-ID'] = last_event_id
+
+    with requests.get(f"{api_url}/api/events", headers=headers, stream=True, timeout=(10, None)) as response:
+        response.raise_for_status()
+        print(f"Connected ({response.headers.get('Content-Type')}), waiting for events...")
+        for event_id, event, data in read_events(response):
+            if event == 'status':
+                req = data['request']
+                print(f"[{event_id}] #{req['id']} {req['learner_name']}: "
+                      f"{data['previous_status'] or 'new'} -> {req['status']}")
+            elif event == 'stats':
+                print(f"[{event_id or 'snapshot'}] stats {data['delta'] or data['stats']}")
+            elif event == 'request':
+                print(f"[{event_id}] #{data['request']['id']} updated ({data['request']['status']})")
+            else:
+                print(f"[{event_id}] {event}: {data}")
+
+
+if __name__ == "__main__":
+    api_url = sys.argv[1] if len(sys.argv) > 1 else 'http://localhost:5000'
+    last_event_id = sys.argv[2] if len(sys.argv) > 2 else None
+
+    print("=" * 60)
+    print(f"Watching {api_url}/api/events (Ctrl+C to stop)")
+    print("=" * 60)
+    try:
+        watch(api_url, last_event_id)
+    except KeyboardInterrupt:
+        print("\nStopped")
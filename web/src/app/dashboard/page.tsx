@@ -6,6 +6,8 @@ import { RefreshCw, Play, FileDown, Search } from 'lucide-react';
 import StatsCards from '@/components/StatsCards';
 import RequestsTable from '@/components/RequestsTable';
 import { api } from '@/lib/api';
+import { applyChanges, useChangeFeed } from '@/lib/changes';
+import { useLiveEvents } from '@/lib/events';
 
 interface Stats {
   total: number;
@@ -53,6 +55,7 @@ export default function DashboardPage() {
   const [exporting, setExporting] = useState(false);
   const [searchTerm, setSearchTerm] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
+  const [changesCursor, setChangesCursor] = useState<string | null>(null);
 
   // Filter requests based on search and status
   const filteredRequests = useMemo(() => {
@@ -91,6 +94,7 @@ export default function DashboardPage() {
       }
       if (requestsRes.success) {
         setRequests(requestsRes.data);
+        setChangesCursor(requestsRes.changes_cursor);
       }
     } catch (error) {
       console.error('Failed to load data:', error);
@@ -103,6 +107,31 @@ export default function DashboardPage() {
     loadData();
   }, [loadData]);
 
+  // Live updates: rows and counts arrive over the event stream, without re-querying
+  const live = useLiveEvents((type, data) => {
+    if (type === 'status' || type === 'request') {
+      setRequests((prev) => applyChanges(prev, [data.request as Request]));
+    } else if (type === 'stats') {
+      setStats((prev) => ({ ...prev, ...data.stats }));
+    } else if (type === 'resync') {
+      Promise.all([api.getStats(), api.getRequests()]).then(([statsRes, requestsRes]) => {
+        if (statsRes.success) setStats(statsRes.data);
+        if (requestsRes.success) setRequests(requestsRes.data);
+      }).catch((error) => console.error('Failed to resync:', error));
+    }
+  });
+
+  // While the stream is down, poll the change feed and refresh the counts only when something changed
+  useChangeFeed<Request>(live ? null : changesCursor, async (changes) => {
+    setRequests((prev) => applyChanges(prev, changes));
+    try {
+      const statsRes = await api.getStats();
+      if (statsRes.success) setStats(statsRes.data);
+    } catch (error) {
+      console.error('Failed to refresh stats:', error);
+    }
+  });
+
   const handleAction = async (action: string, requestId: number) => {
     if (action === 'view') {
       router.push(`/dashboard/requests/${requestId}`);
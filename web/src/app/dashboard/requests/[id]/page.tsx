@@ -102,6 +102,9 @@ export default function RequestDetailPage() {
         case 'upload-moodle':
           result = await api.uploadToMoodle(Number(params.id));
           break;
+        case 'resume':
+          result = await api.resumeRequest(Number(params.id));
+          break;
         case 'sync-grade':
           result = await api.syncGrade(Number(params.id), parseFloat(grade), feedback);
           break;
@@ -281,6 +284,17 @@ export default function RequestDetailPage() {
                 </button>
               )}
 
+              {request.status === 'failed' && (
+                <button
+                  onClick={() => handleAction('resume')}
+                  disabled={processing}
+                  className="w-full flex items-center justify-center gap-2 px-4 py-3 bg-gray-700 text-white rounded-lg hover:bg-gray-800 transition-colors disabled:opacity-50"
+                >
+                  <RefreshCw size={18} />
+                  Resume
+                </button>
+              )}
+
               {request.status === 'uploaded' && (
                 <div className="flex items-center gap-2 text-green-600 justify-center py-3">
                   <CheckCircle size={18} />
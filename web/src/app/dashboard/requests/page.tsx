@@ -4,6 +4,8 @@ import { useState, useEffect, useCallback } from 'react';
 import { RefreshCw, Search, Filter } from 'lucide-react';
 import RequestsTable from '@/components/RequestsTable';
 import { api } from '@/lib/api';
+import { applyChanges, useChangeFeed } from '@/lib/changes';
+import { useLiveEvents } from '@/lib/events';
 
 interface Request {
   id: number;
@@ -25,12 +27,17 @@ const statusOptions = [
   { value: 'failed', label: 'Failed' },
 ];
 
+const PAGE_SIZE = 100;
+
 export default function RequestsPage() {
   const [requests, setRequests] = useState<Request[]>([]);
   const [loading, setLoading] = useState(true);
   const [search, setSearch] = useState('');
   const [statusFilter, setStatusFilter] = useState('all');
   const [processing, setProcessing] = useState(false);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  const [changesCursor, setChangesCursor] = useState<string | null>(null);
 
   const loadData = useCallback(async () => {
     try {
@@ -38,10 +45,13 @@ export default function RequestsPage() {
       const result = await api.getRequests({
         status: statusFilter !== 'all' ? statusFilter : undefined,
         search: search || undefined,
+        limit: PAGE_SIZE,
       });
 
       if (result.success) {
         setRequests(result.data);
+        setNextCursor(result.next_cursor);
+        setChangesCursor(result.changes_cursor);
       }
     } catch (error) {
       console.error('Failed to load data:', error);
@@ -50,10 +60,52 @@ export default function RequestsPage() {
     }
   }, [search, statusFilter]);
 
+  const loadMore = async () => {
+    if (!nextCursor) return;
+    try {
+      setLoadingMore(true);
+      const result = await api.getRequests({
+        status: statusFilter !== 'all' ? statusFilter : undefined,
+        search: search || undefined,
+        limit: PAGE_SIZE,
+        cursor: nextCursor,
+      });
+
+      if (result.success) {
+        setRequests((prev) => [...prev, ...result.data]);
+        setNextCursor(result.next_cursor);
+      }
+    } catch (error) {
+      console.error('Failed to load more:', error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   useEffect(() => {
     loadData();
   }, [loadData]);
 
+  // Patch changed rows in place instead of reloading the list
+  const belongs = useCallback((row: Request) => {
+    const term = search.toLowerCase();
+    return (statusFilter === 'all' || row.status === statusFilter) &&
+      (!term || row.learner_name.toLowerCase().includes(term) || (row.learner_email || '').toLowerCase().includes(term));
+  }, [search, statusFilter]);
+
+  const live = useLiveEvents((type, data) => {
+    if (type === 'status' || type === 'request') {
+      setRequests((prev) => applyChanges(prev, [data.request as Request], belongs));
+    } else if (type === 'resync') {
+      loadData();
+    }
+  });
+
+  // Poll the change feed only while the event stream is down
+  useChangeFeed<Request>(live ? null : changesCursor, (changes) => {
+    setRequests((prev) => applyChanges(prev, changes, belongs));
+  });
+
   // Debounce search
   useEffect(() => {
     const timer = setTimeout(() => {
@@ -146,7 +198,7 @@ export default function RequestsPage() {
 
       {/* Results count */}
       <p className="text-sm text-gray-500">
-        Showing {requests.length} request{requests.length !== 1 ? 's' : ''}
+        Showing {requests.length}{nextCursor ? '+' : ''} request{requests.length !== 1 ? 's' : ''}
       </p>
 
       {/* Table */}
@@ -154,6 +206,9 @@ export default function RequestsPage() {
         requests={requests}
         onAction={handleAction}
         loading={loading}
+        hasMore={!!nextCursor}
+        loadingMore={loadingMore}
+        onLoadMore={loadMore}
       />
     </div>
   );
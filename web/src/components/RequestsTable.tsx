@@ -17,6 +17,9 @@ interface RequestsTableProps {
   requests: Request[];
   onAction: (action: string, requestId: number) => void;
   loading?: boolean;
+  hasMore?: boolean;
+  loadingMore?: boolean;
+  onLoadMore?: () => void;
 }
 
 const statusLabels: Record<string, string> = {
@@ -97,8 +100,16 @@ function getActionButton(status: string, onAction: (action: string) => void) {
   }
 }
 
-export default function RequestsTable({ requests, onAction, loading }: RequestsTableProps) {
+export default function RequestsTable({
+  requests,
+  onAction,
+  loading,
+  hasMore,
+  loadingMore,
+  onLoadMore,
+}: RequestsTableProps) {
   return (
+    <>
     <table className="w-full border-collapse">
       <thead className="bg-gray-100 sticky top-0 z-10 border-b-2 border-gray-300">
         <tr>
@@ -186,5 +197,17 @@ export default function RequestsTable({ requests, onAction, loading }: RequestsT
         )}
       </tbody>
     </table>
+    {hasMore && !loading && onLoadMore && (
+      <div className="flex justify-center py-4">
+        <button
+          onClick={onLoadMore}
+          disabled={loadingMore}
+          className="px-4 py-2 bg-white border border-gray-200 rounded-lg text-sm text-gray-700 hover:bg-gray-50 transition-colors disabled:opacity-50"
+        >
+          {loadingMore ? 'Loading...' : 'Load more'}
+        </button>
+      </div>
+    )}
+    </>
   );
 }
@@ -1,6 +1,7 @@
 'use client';
 
 import { createContext, useContext, useState, ReactNode } from 'react';
+import { useLiveEvents } from '@/lib/events';
 
 export interface Notification {
   id: number;
@@ -33,6 +34,16 @@ const initialNotifications: Notification[] = [
   { id: 8, title: 'New Request', message: 'New SOR request submitted for Lisa Anderson', time: '8:15 AM', date: 'Yesterday', read: true, type: 'info' },
 ];
 
+// Notification for a status transition pushed over the event stream
+const statusNotifications: Record<string, (name: string) => Omit<Notification, 'id' | 'time' | 'date' | 'read'>> = {
+  pending: (name) => ({ title: 'New Request', message: `New SOR request submitted for ${name}`, type: 'info' }),
+  pdf_generated: (name) => ({ title: 'SOR Generated', message: `SOR for ${name} has been generated successfully`, type: 'success' }),
+  signature_sent: (name) => ({ title: 'Signature Pending', message: `Waiting for signature from ${name}`, type: 'warning' }),
+  signed: (name) => ({ title: 'Signature Completed', message: `Document signed by ${name}`, type: 'success' }),
+  uploaded: (name) => ({ title: 'Upload Complete', message: `SOR uploaded to Moodle for ${name}`, type: 'success' }),
+  failed: (name) => ({ title: 'Processing Error', message: `Processing failed for ${name}`, type: 'warning' }),
+};
+
 const NotificationContext = createContext<NotificationContextType | undefined>(undefined);
 
 export function NotificationProvider({ children }: { children: ReactNode }) {
@@ -41,10 +52,24 @@ export function NotificationProvider({ children }: { children: ReactNode }) {
   const unreadCount = notifications.filter(n => !n.read).length;
 
   const addNotification = (notification: Omit<Notification, 'id'>) => {
-    const newId = Math.max(...notifications.map(n => n.id), 0) + 1;
-    setNotifications([{ ...notification, id: newId }, ...notifications]);
+    setNotifications(prev => {
+      const newId = Math.max(...prev.map(n => n.id), 0) + 1;
+      return [{ ...notification, id: newId }, ...prev];
+    });
   };
 
+  useLiveEvents((type, data) => {
+    if (type !== 'status') return;
+    const build = statusNotifications[data.request.status];
+    if (!build) return;
+    addNotification({
+      ...build(data.request.learner_name),
+      time: new Date().toLocaleTimeString([], { hour: 'numeric', minute: '2-digit' }),
+      date: 'Today',
+      read: false,
+    });
+  });
+
   const markAsRead = (id: number) => {
     setNotifications(notifications.map(n =>
       n.id === id ? { ...n, read: true } : n
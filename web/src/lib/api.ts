@@ -1,4 +1,4 @@
-const API_BASE = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api';
+export const API_BASE = process.env.NEXT_PUBLIC_API_URL || 'http://localhost:5000/api';
 
 async function fetchApi(endpoint: string, options?: RequestInit) {
   const response = await fetch(`${API_BASE}${endpoint}`, {
@@ -18,26 +18,75 @@ async function fetchApi(endpoint: string, options?: RequestInit) {
   return data;
 }
 
+const JOB_POLL_MS = 1000;
+const JOB_TIMEOUT_MS = 10 * 60 * 1000;
+
+// Long-running actions are queued on the server (202 + job_id); follow the job until it settles
+async function waitForJob(jobId: number) {
+  const deadline = Date.now() + JOB_TIMEOUT_MS;
+  while (Date.now() < deadline) {
+    const { data: job } = await fetchApi(`/jobs/${jobId}`);
+    if (job.status === 'succeeded') return job;
+    if (job.status === 'dead') throw new Error(job.error || 'Job failed');
+    if (job.status === 'queued' && job.attempts > 0 && job.error) {
+      throw new Error(`${job.error} (will retry in the background)`);
+    }
+    await new Promise((resolve) => setTimeout(resolve, JOB_POLL_MS));
+  }
+  throw new Error('Timed out waiting for the job to finish');
+}
+
+async function runJob(endpoint: string, options?: RequestInit) {
+  const queued = await fetchApi(endpoint, options);
+  if (!queued.job_id) return queued;
+  const job = await waitForJob(queued.job_id);
+  return { success: true, job_id: queued.job_id, ...job.result };
+}
+
 export const api = {
   // Stats
   getStats: () => fetchApi('/stats'),
 
   // Requests
-  getRequests: (params?: { status?: string; search?: string }) => {
+  getRequests: (params?: {
+    status?: string;
+    search?: string;
+    createdFrom?: string;
+    createdTo?: string;
+    sort?: 'updated_at' | 'created_at';
+    limit?: number;
+    cursor?: string | null;
+  }) => {
     const searchParams = new URLSearchParams();
     if (params?.status) searchParams.set('status', params.status);
     if (params?.search) searchParams.set('search', params.search);
+    if (params?.createdFrom) searchParams.set('created_from', params.createdFrom);
+    if (params?.createdTo) searchParams.set('created_to', params.createdTo);
+    if (params?.sort) searchParams.set('sort', params.sort);
+    if (params?.limit) searchParams.set('limit', String(params.limit));
+    if (params?.cursor) searchParams.set('cursor', params.cursor);
     const query = searchParams.toString();
     return fetchApi(`/requests${query ? `?${query}` : ''}`);
   },
 
+  // Rows changed since a changes_cursor (from getRequests or the previous call)
+  getChanges: (cursor: string, limit = 500) =>
+    fetchApi(`/requests/changes?${new URLSearchParams({ cursor, limit: String(limit) })}`),
+
+  searchRequests: (q: string, limit = 20) =>
+    fetchApi(`/requests/search?${new URLSearchParams({ q, limit: String(limit) })}`),
+
   getRequest: (id: number) => fetchApi(`/requests/${id}`),
 
-  createRequest: (data: { learner_name: string; learner_email: string; learner_id: number }) =>
-    fetchApi('/requests', {
+  createRequest: async (data: { learner_name: string; learner_email: string; learner_id: number }) => {
+    const queued = await fetchApi('/requests', {
       method: 'POST',
       body: JSON.stringify(data),
-    }),
+    });
+    if (!queued.job_id) return queued;
+    const job = await waitForJob(queued.job_id);
+    return { ...queued, data: { ...queued.data, ...job.result } };
+  },
 
   getLearnerGrades: (learnerId: number, learnerName?: string) => {
     const params = learnerName ? `?name=${encodeURIComponent(learnerName)}` : '';
@@ -46,13 +95,16 @@ export const api = {
 
   // Actions
   generatePdf: (id: number) =>
-    fetchApi(`/requests/${id}/generate-pdf`, { method: 'POST' }),
+    runJob(`/requests/${id}/generate-pdf`, { method: 'POST' }),
 
   sendForSignature: (id: number) =>
-    fetchApi(`/requests/${id}/send-signature`, { method: 'POST' }),
+    runJob(`/requests/${id}/send-signature`, { method: 'POST' }),
 
   uploadToMoodle: (id: number) =>
-    fetchApi(`/requests/${id}/upload-moodle`, { method: 'POST' }),
+    runJob(`/requests/${id}/upload-moodle`, { method: 'POST' }),
+
+  resumeRequest: (id: number) =>
+    runJob(`/requests/${id}/resume`, { method: 'POST' }),
 
   syncGrade: (id: number, grade?: number, feedback?: string) =>
     fetchApi(`/requests/${id}/sync-grade`, {
@@ -62,13 +114,17 @@ export const api = {
 
   // Bulk actions
   processAllPending: () =>
-    fetchApi('/process-pending', { method: 'POST' }),
+    runJob('/process-pending', { method: 'POST' }),
 
   checkSignatures: () =>
-    fetchApi('/check-signatures', { method: 'POST' }),
+    runJob('/check-signatures', { method: 'POST' }),
 
   bulkSyncGrades: () =>
-    fetchApi('/bulk-sync-grades', { method: 'POST' }),
+    runJob('/bulk-sync-grades', { method: 'POST' }),
+
+  // Background jobs
+  getJob: (id: number) => fetchApi(`/jobs/${id}`),
+  retryJob: (id: number) => fetchApi(`/jobs/${id}/retry`, { method: 'POST' }),
 
   // System
   healthCheck: () => fetchApi('/health'),
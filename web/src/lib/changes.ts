@@ -0,0 +1,70 @@
+import { useEffect, useRef } from 'react';
+import { api } from '@/lib/api';
+
+export const CHANGES_POLL_MS = 10000;
+
+interface ChangedRow {
+  id: number;
+  updated_at: string;
+}
+
+// Patch a newest-first list with change-feed rows: changed rows move to the top,
+// rows that no longer belong (e.g. left the status filter) drop out, and new rows
+// are added when they belong.
+export function applyChanges<T extends ChangedRow>(
+  rows: T[],
+  changes: T[],
+  belongs: (row: T) => boolean = () => true,
+): T[] {
+  if (changes.length === 0) return rows;
+  const changed = new Map(changes.map((row) => [row.id, row]));
+  const updated = Array.from(changed.values())
+    .filter(belongs)
+    .sort((a, b) => b.updated_at.localeCompare(a.updated_at) || b.id - a.id);
+  return [...updated, ...rows.filter((row) => !changed.has(row.id))];
+}
+
+// Poll /api/requests/changes from `cursor` and hand each batch of changed rows to
+// onChanges. A new cursor (after a full reload) restarts the feed from there.
+export function useChangeFeed<T>(
+  cursor: string | null,
+  onChanges: (rows: T[]) => void,
+  intervalMs = CHANGES_POLL_MS,
+) {
+  const cursorRef = useRef(cursor);
+  const onChangesRef = useRef(onChanges);
+  onChangesRef.current = onChanges;
+
+  useEffect(() => {
+    cursorRef.current = cursor;
+    if (!cursor) return;
+
+    let cancelled = false;
+    let polling = false;
+    const poll = async () => {
+      if (polling) return;
+      polling = true;
+      try {
+        const rows: T[] = [];
+        let hasMore = true;
+        while (hasMore && cursorRef.current && !cancelled) {
+          const result = await api.getChanges(cursorRef.current);
+          rows.push(...result.data);
+          cursorRef.current = result.cursor;
+          hasMore = result.has_more;
+        }
+        if (!cancelled && rows.length > 0) onChangesRef.current(rows);
+      } catch (error) {
+        console.error('Failed to fetch changes:', error);
+      } finally {
+        polling = false;
+      }
+    };
+
+    const timer = setInterval(poll, intervalMs);
+    return () => {
+      cancelled = true;
+      clearInterval(timer);
+    };
+  }, [cursor, intervalMs]);
+}
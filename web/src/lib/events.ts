@@ -0,0 +1,67 @@
+import { useEffect, useRef, useState } from 'react';
+import { API_BASE } from '@/lib/api';
+
+// Events pushed by GET /api/events (see src/events.py)
+export type LiveEventType = 'status' | 'request' | 'stats' | 'resync';
+type Listener = (type: LiveEventType, data: any) => void;
+
+const EVENT_TYPES: LiveEventType[] = ['status', 'request', 'stats', 'resync'];
+
+// One EventSource per tab, shared by every component using useLiveEvents
+const listeners = new Set<Listener>();
+const connectionListeners = new Set<(connected: boolean) => void>();
+let source: EventSource | null = null;
+let connected = false;
+
+function setConnected(value: boolean) {
+  connected = value;
+  connectionListeners.forEach((listener) => listener(value));
+}
+
+function openStream() {
+  if (source || typeof EventSource === 'undefined') return;
+  const stream = new EventSource(`${API_BASE}/events`);
+  stream.onopen = () => setConnected(true);
+  stream.onerror = () => {
+    // EventSource reconnects by itself (sending Last-Event-ID) unless the server refused the stream
+    setConnected(false);
+    if (stream.readyState === EventSource.CLOSED && source === stream) source = null;
+  };
+  EVENT_TYPES.forEach((type) => {
+    stream.addEventListener(type, (event) => {
+      const data = JSON.parse((event as MessageEvent).data);
+      listeners.forEach((listener) => listener(type, data));
+    });
+  });
+  source = stream;
+}
+
+function closeStream() {
+  if (listeners.size > 0 || !source) return;
+  source.close();
+  source = null;
+  setConnected(false);
+}
+
+// Subscribe to live request events; returns whether the stream is currently connected,
+// so callers can fall back to polling while it isn't.
+export function useLiveEvents(onEvent: Listener): boolean {
+  const onEventRef = useRef(onEvent);
+  onEventRef.current = onEvent;
+  const [isConnected, setIsConnected] = useState(connected);
+
+  useEffect(() => {
+    const listener: Listener = (type, data) => onEventRef.current(type, data);
+    listeners.add(listener);
+    connectionListeners.add(setIsConnected);
+    openStream();
+    setIsConnected(connected);
+    return () => {
+      listeners.delete(listener);
+      connectionListeners.delete(setIsConnected);
+      closeStream();
+    };
+  }, []);
+
+  return isConnected;
+}